@@ -4,220 +4,875 @@ Enhanced XFOIL batch runner for NACA airfoil identification
 Gathers comprehensive aerodynamic data for comparison with experimental results
 """
 
+import argparse
+import hashlib
+import os
 import shutil
 import subprocess
 from pathlib import Path
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Pool, Process, cpu_count
+from multiprocessing.util import Finalize
 import math
 import sys
+import asyncio
 import signal
-import csv
+import re
+import queue
+import tempfile
+from functools import lru_cache, partial
+from itertools import islice
+
+from polar_cache import PolarCache, cache_key
+from xfoil_session import XfoilSession, AsyncXfoilSession, XfoilSessionError
+from sweep_checkpoint import SweepCheckpoint, ResultsWriter, drop_unfinished_rows
+from sweep_cluster import JobCoordinator, work
+from polar_database import merge_from_csv
+from polar_io import parse_polar_text, parse_console_polar, format_polar_text
+# Naca5, Naca6, CoordinateFiles and frange are imported for use in DESIGN_SPACE below
+from design_space import (Naca4, Naca5, Naca6, CoordinateFiles, frange,  # noqa: F401
+                          load_commands, geometry_digest, section_params)
 
 # ---------- user-configurable ----------
-RE = 121000
-MACH = 0.03
+# (Reynolds, Mach) conditions to sweep; every foil is run at each of them.
+# Re = rho*V*c/mu and M = V/a for the ~10.2 m/s and ~15.2 m/s tunnel runs in intial_LabData.csv
+CONDITIONS = [
+    (121000, 0.03),
+    (181000, 0.044),
+]
 ALPHA_START = -4.0
 ALPHA_END = 20.0
 ALPHA_STEP = 4.0
+# Adaptive mode: after the coarse ALPHA_STEP pass, bisect intervals where the CL/CM slope
+# changes sharply or XFOIL failed to converge (the stall region), down to REFINE_MIN_STEP
+ADAPTIVE_ALPHA = True
+REFINE_LEVELS = 2
+REFINE_MIN_STEP = 1.0
+CL_SLOPE_TOL = 0.04   # change in dCL/dalpha (per degree) that marks a refinement interval
+CM_SLOPE_TOL = 0.01   # change in dCM/dalpha (per degree)
 ITER = 80
-TIMEOUT = 120
+NCRIT = 9.0
+TIMEOUT = 120         # hard limit (s) for one XFOIL pass
+STALL_TIMEOUT = 20    # kill a pass that prints nothing for this long (s)
+MAX_CONVERGENCE_FAILURES = 4  # abort a pass after this many consecutive non-converged points
+# Fallbacks tried in order until every target angle has converged
+RETRY_STRATEGIES = ["more_iter", "repanel", "fine_step", "outward"]
+RETRY_ITER_FACTOR = 3  # "more_iter": ITER multiplier
+DEFAULT_PANEL_NODES = 160  # XFOIL's own default
+REPANEL_NODES = 200    # "repanel": PPAR panel count
+ALLOW_MISSING_TARGETS = 1  # keep foils missing at most this many target angles after all retries
 NUM_WORKERS = min(4, cpu_count())
+# Jobs per pool dispatch. XFOIL passes take seconds, so IPC overhead is negligible and 1 keeps
+# the cost ordering exact; larger chunks only pay off for very cheap runs (e.g. fake_xfoil.py)
+CHUNKSIZE = 1
+PENDING_CHUNKS_PER_WORKER = 2  # chunks queued ahead per worker; bounds memory for huge design spaces
+SCHEDULE_WINDOW = 2000  # foils read from DESIGN_SPACE at a time and sorted longest-job-first
+# "pool": NUM_WORKERS Python processes, each blocking on its own XFOIL session
+# "asyncio": one process driving ASYNC_CONCURRENCY XFOIL sessions from a single event loop
+# "cluster": serve jobs on CLUSTER_ADDRESS to workers started on any host with
+#            python NACA_data_extractor.py --worker COORDINATOR_HOST:PORT [--slots N]
+ORCHESTRATOR = "pool"
+ASYNC_CONCURRENCY = cpu_count()
+CLUSTER_ADDRESS = ("127.0.0.1", 8765)  # use ("0.0.0.0", 8765) to serve other hosts; that needs CLUSTER_TOKEN
+CLUSTER_TOKEN = os.environ.get("XFOIL_CLUSTER_TOKEN")  # shared secret workers must present, if set
+LEASE_TIMEOUT = 120       # reissue a job whose worker has not renewed its lease for this long (s)
+CLUSTER_QUEUE_DEPTH = 256  # jobs handed to the coordinator ahead of their results
+PERSISTENT_SESSIONS = True  # keep one XFOIL process open per worker instead of one per foil
+# How polars get from XFOIL to the extractor:
+#   "file"   - PACC writes each polar to POLAR_DIR, which is re-read (and kept)
+#   "shm"    - PACC writes to a scratch file on tmpfs (SCRATCH_DIR), read and deleted at once
+#   "stdout" - no polar file at all; points are parsed from the console output on the pipe
+# With "shm"/"stdout" nothing is written per foil: polars reach the cache in batches of
+# CACHE_BATCH from the main process and the database at the end of the sweep.
+POLAR_TRANSPORT = "file"
+SCRATCH_DIR = Path("/dev/shm") if os.path.isdir("/dev/shm") else Path(tempfile.gettempdir())
+CACHE_BATCH = 50
 
-XF_PATH = shutil.which("xfoil") or shutil.which("xfoil.exe")
+# XFOIL_EXECUTABLE overrides the PATH lookup (e.g. to point at fake_xfoil.py for benchmarks)
+XF_PATH = os.environ.get("XFOIL_EXECUTABLE") or shutil.which("xfoil") or shutil.which("xfoil.exe")
 
 OUTDIR = Path("xfoil_comprehensive_outputs")
 POLAR_DIR = OUTDIR / "polars"
 RESULTS_CSV = OUTDIR / "airfoil_data.csv"
-FAILED_FILE = OUTDIR / "failed_runs.txt"
+FAILED_FILE = OUTDIR / "failed_runs.jsonl"  # one JSON failure report per line
+CHECKPOINT_FILE = OUTDIR / "checkpoint.jsonl"
+POLAR_DB_DIR = OUTDIR / "polar_db"  # memory-mapped copy of RESULTS_CSV read by NACA_matching
+COORD_GEN_DIR = OUTDIR / "coordinates"  # generated coordinates for fractional 4-digit foils
+RESUME = True       # skip jobs already recorded in CHECKPOINT_FILE; False starts a fresh sweep
+MAX_ATTEMPTS = 2    # failed jobs are retried on resume until they have failed this often
+
+USE_CACHE = True
+CACHE_DIR = OUTDIR / "polar_cache"
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # evict least recently used polars beyond this
 # ---------------------------------------
 
 # Target angles from your experimental data
 TARGET_ANGLES = [-4.0, 0.0, 4.0, 8.0, 12.0, 16.0, 20.0]
 
-if XF_PATH is None:
-    raise SystemExit("xfoil executable not found in PATH.")
-
 M_RANGE = range(2, 7)  # 2 to 6
 P_RANGE = range(2, 7)  # 2 to 6
 TT_RANGE = range(11, 17)  # 11 to 16
 
-OUTDIR.mkdir(parents=True, exist_ok=True)
-POLAR_DIR.mkdir(parents=True, exist_ok=True)
+# Candidate foils, streamed lazily (see design_space.py). Spaces add together, e.g.
+#   Naca4(frange(0, 6, 0.5), range(2, 7), frange(10, 18, 0.5)) + Naca5(range(1, 6), [12, 15, 18])
+#   + Naca6([3, 4, 5], [2, 4], [12, 15]) + CoordinateFiles()
+DESIGN_SPACE = Naca4(M_RANGE, P_RANGE, TT_RANGE)
+
+# Inviscid panel-method pre-filter (panel_method.py, needs no XFOIL): before any job is scheduled,
+# every foil's CL/CM is estimated at NACA_matching's experimental angles up to PREFILTER_ALPHA_MAX
+# (the attached range) and only the best PREFILTER_KEEP share by combined RMSE is run.
+# Sections the panel method cannot build (6-series, custom) are always run
+PANEL_PREFILTER = False
+PREFILTER_ALPHA_MAX = 8.0
+PREFILTER_KEEP = 0.25
+
+# Per-process XFOIL session, set up by start_worker_session when PERSISTENT_SESSIONS is on
+SESSION = None
+
+@lru_cache(maxsize=1)
+def xfoil_version():
+    """Return the version string from the XFOIL banner (part of every cache key)."""
+    try:
+        proc = subprocess.run([XF_PATH], input="quit\n", text=True, capture_output=True, timeout=10)
+    except (subprocess.TimeoutExpired, OSError):
+        return "unknown"
+    match = re.search(r"Version\s+([\w.]+)", proc.stdout)
+    return match.group(1) if match else "unknown"
+
+def polar_cache_key(foil_code: str, re_num, mach):
+    """Cache key covering every input that changes the polar XFOIL produces."""
+    sweep = [ALPHA_START, ALPHA_END, ALPHA_STEP]
+    if ADAPTIVE_ALPHA:
+        sweep += [REFINE_LEVELS, REFINE_MIN_STEP, CL_SLOPE_TOL, CM_SLOPE_TOL]
+    # Retries merge extra points into the polar, so they change what gets cached
+    sweep += [len(RETRY_STRATEGIES), RETRY_ITER_FACTOR, REPANEL_NODES, ALLOW_MISSING_TARGETS]
+    return cache_key(foil_code, re_num, mach, NCRIT, ITER, sweep, xfoil_version(),
+                     geometry_digest(foil_code, COORD_GEN_DIR))
+
+def missing_targets(polar):
+    return [alpha for alpha in TARGET_ANGLES if alpha not in polar]
+
+def complete_polar(foil_code, text):
+    """Return the parsed polar (all alphas), or None if too many target angles are missing."""
+    polar = parse_polar_text(text)
+    missing = missing_targets(polar)
+
+    # Check if we got data for (nearly) all target angles
+    if len(missing) > ALLOW_MISSING_TARGETS:
+        found = len(TARGET_ANGLES) - len(missing)
+        print(f"Warning: {foil_code} only has data for {found}/{len(TARGET_ANGLES)} target angles")
+        return None
+    return polar
+
+def coarse_alphas():
+    """Alphas requested by the coarse ASEQ pass."""
+    n = int(round((ALPHA_END - ALPHA_START) / ALPHA_STEP))
+    return [round(ALPHA_START + i * ALPHA_STEP, 3) for i in range(n + 1)]
+
+def refinement_alphas(polar, attempted):
+    """Pick new alphas that bisect intervals around stall or non-converged points.
+
+    An interval is refined when the CL or CM slope changes by more than the
+    tolerances across it, or when one of its ends was requested but did not
+    converge. Intervals narrower than 2 * REFINE_MIN_STEP are left alone.
+    """
+    grid = sorted(set(polar) | set(attempted))
+    flagged = set()
+    for lo, hi in zip(grid, grid[1:]):
+        if lo not in polar or hi not in polar:
+            flagged.add((lo, hi))
+
+    converged = sorted(polar)
+    for a0, a1, a2 in zip(converged, converged[1:], converged[2:]):
+        c0, c1, c2 = polar[a0], polar[a1], polar[a2]
+        d_cl = (c2['CL'] - c1['CL']) / (a2 - a1) - (c1['CL'] - c0['CL']) / (a1 - a0)
+        d_cm = (c2['CM'] - c1['CM']) / (a2 - a1) - (c1['CM'] - c0['CM']) / (a1 - a0)
+        if abs(d_cl) > CL_SLOPE_TOL or abs(d_cm) > CM_SLOPE_TOL:
+            flagged.update({(a0, a1), (a1, a2)})
 
-if FAILED_FILE.exists():
-    FAILED_FILE.unlink()
+    new = set()
+    for lo, hi in flagged:
+        if hi - lo >= 2 * REFINE_MIN_STEP - 1e-9:
+            new.add(round((lo + hi) / 2, 3))
+    return sorted(new - set(attempted))
 
-def run_single(foil_code: str):
-    """Run XFOIL for one foil and return comprehensive aerodynamic data at target angles."""
-    polar_file = POLAR_DIR / f"{foil_code}_Re{RE}_polar.txt"
-    
-    cmds = [
-        f"naca {foil_code}",
+def start_worker_session():
+    """Pool initializer: open this worker's long-lived XFOIL session."""
+    global SESSION
+    SESSION = XfoilSession(XF_PATH)
+    # Pool workers skip atexit, but multiprocessing finalizers still run on exit
+    Finalize(SESSION, SESSION.close, exitpriority=10)
+    if POLAR_TRANSPORT == "shm":
+        # Scratch files are deleted as they are read; this catches those left by aborted passes
+        Finalize(None, shutil.rmtree, args=(scratch_dir(), True), exitpriority=5)
+
+def xfoil_commands(foil_code: str, re_num, mach, polar_file, reuse_session=False, alpha_cmds=None,
+                   iters=ITER, panels=None):
+    """XFOIL command block for one foil, ending back at the top-level menu.
+
+    alpha_cmds defaults to the coarse ASEQ sweep; refinement passes send explicit ALFA commands.
+    panels sets the PPAR node count before PANE.
+
+    In a reused session viscous mode is already on (VISC would toggle it off),
+    so the Reynolds number is changed with RE and the boundary layer re-initialised.
+    The panel count also persists in a session, so it is reset to the default there.
+    """
+    cmds = load_commands(foil_code, COORD_GEN_DIR)
+    if panels or reuse_session:
+        cmds += ["ppar", f"n {panels or DEFAULT_PANEL_NODES}", "", ""]
+    cmds += [
         "pane",
         "oper",
-        f"visc {RE}",
-        f"mach {MACH}",
-        f"iter {ITER}",
+        f"re {re_num}" if reuse_session else f"visc {re_num}",
+        f"mach {mach}",
+        f"iter {iters}",
+        "vpar",
+        f"n {NCRIT}",
+        "",
+    ]
+    if reuse_session:
+        cmds.append("init")
+    cmds += [
         "pacc",
         str(polar_file),
         "",
-        f"aseq {ALPHA_START} {ALPHA_END} {ALPHA_STEP}",
+    ]
+    cmds += alpha_cmds or [f"aseq {ALPHA_START} {ALPHA_END} {ALPHA_STEP}"]
+    cmds += [
         "pacc",
         "",
-        "quit"
     ]
-    input_data = "\n".join(cmds) + "\n"
+    return cmds
 
-    try:
-        proc = subprocess.run([XF_PATH], input=input_data, text=True, capture_output=True, timeout=TIMEOUT)
-    except subprocess.TimeoutExpired:
-        return (foil_code, None)
+def convergence_watch():
+    """Line watcher that aborts a pass after MAX_CONVERGENCE_FAILURES non-converged points in a row."""
+    failures = 0
+
+    def watch(line):
+        nonlocal failures
+        if "Convergence failed" in line:
+            failures += 1
+            if failures >= MAX_CONVERGENCE_FAILURES:
+                return "diverged"
+        elif "Point added" in line:
+            failures = 0
+        return None
+
+    return watch
+
+def scratch_dir():
+    return SCRATCH_DIR / f"naca_xfoil_{os.getpid()}"
+
+def scratch_polar_file(polar_file):
+    """Per-process tmpfs path standing in for polar_file when POLAR_TRANSPORT is "shm"."""
+    scratch = scratch_dir()
+    scratch.mkdir(parents=True, exist_ok=True)
+    return scratch / Path(polar_file).name
+
+def polar_pass(foil_code: str, re_num, mach, polar_file, alpha_cmds=None, iters=ITER, panels=None):
+    """One XFOIL pass for polar_file, as job steps (see run_steps).
+
+    Yields the pass's command block and receives (console output, failure reason or None);
+    returns (polar text or None, failure reason or None).
+    """
+    if POLAR_TRANSPORT == "shm":
+        polar_file = scratch_polar_file(polar_file)
+    # A blank PACC filename keeps the polar in XFOIL's memory; the points are read off stdout
+    target = "" if POLAR_TRANSPORT == "stdout" else polar_file
+    # XFOIL appends to an existing polar file, so start from a clean one
+    if target and polar_file.exists():
+        polar_file.unlink()
+
+    output, reason = yield partial(xfoil_commands, foil_code, re_num, mach, target,
+                                   alpha_cmds=alpha_cmds, iters=iters, panels=panels)
 
+    # A pass aborted part-way may still have produced the points that converged
+    if POLAR_TRANSPORT == "stdout":
+        polar = parse_console_polar(output)
+        if not polar:
+            return None, reason or "no_polar"
+        return format_polar_text(polar), reason
     if not polar_file.exists() or polar_file.stat().st_size == 0:
-        return (foil_code, None)
+        return None, reason or "no_polar"
+    text = polar_file.read_text(encoding="utf-8", errors="ignore")
+    if POLAR_TRANSPORT == "shm":
+        polar_file.unlink()
+    return text, reason
+
+def run_steps(steps):
+    """Drive job steps with this process's XFOIL session and return the steps' result.
+
+    Steps yield command block builders taking reuse_session (in a reused session
+    viscous mode is already on) and receive (console output, failure reason or None).
+    Without persistent sessions each pass gets a throwaway session, so both
+    modes share the same stall detection and early abort.
+    """
+    try:
+        block = next(steps)
+        while True:
+            session = SESSION or XfoilSession(XF_PATH)
+            try:
+                result = session.run(block(reuse_session=session.runs > 0), TIMEOUT, STALL_TIMEOUT,
+                                     convergence_watch()), None
+            except XfoilSessionError as e:
+                result = e.output, e.reason
+            finally:
+                if session is not SESSION:
+                    session.close()
+            block = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+async def run_steps_async(steps, session=None):
+    """run_steps counterpart for one event loop, using an AsyncXfoilSession (None: one per pass)."""
+    try:
+        block = next(steps)
+        while True:
+            current = session or AsyncXfoilSession(XF_PATH)
+            try:
+                result = await current.run(block(reuse_session=current.runs > 0), TIMEOUT, STALL_TIMEOUT,
+                                           convergence_watch()), None
+            except XfoilSessionError as e:
+                result = e.output, e.reason
+            finally:
+                if current is not session:
+                    await current.close()
+            block = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+def strategy_options(strategy):
+    """polar_pass keyword arguments for one retry strategy."""
+    half = ALPHA_STEP / 2
+    if strategy == "more_iter":
+        return {'iters': ITER * RETRY_ITER_FACTOR}
+    if strategy == "repanel":
+        return {'panels': REPANEL_NODES}
+    if strategy == "fine_step":
+        return {'alpha_cmds': [f"aseq {ALPHA_START} {ALPHA_END} {half}"], 'iters': ITER * RETRY_ITER_FACTOR}
+    if strategy == "outward":
+        # Sweep up and down from 0 deg so each point starts from a nearby converged solution
+        return {'alpha_cmds': ["alfa 0", f"aseq {half} {ALPHA_END} {half}",
+                               "init", "alfa 0", f"aseq {-half} {ALPHA_START} {-half}"],
+                'iters': ITER * RETRY_ITER_FACTOR}
+    return {}
+
+def run_with_retries(foil_code: str, re_num, mach, polar_file):
+    """Job steps running the coarse sweep, escalating through RETRY_STRATEGIES until all target angles converge.
+
+    Returns (merged polar, list of attempt records); earlier attempts win for alphas seen twice.
+    """
+    polar, attempts = {}, []
+    for strategy in ["base"] + RETRY_STRATEGIES:
+        text, reason = yield from polar_pass(foil_code, re_num, mach, polar_file, **strategy_options(strategy))
+        points = parse_polar_text(text) if text is not None else {}
+        for alpha, values in points.items():
+            polar.setdefault(alpha, values)
+        missing = missing_targets(polar)
+        attempts.append({'strategy': strategy, 'outcome': reason or ("ok" if not missing else "missing_angles"),
+                         'points': len(points)})
+        if not missing:
+            break
+        # A foil that hangs the solver twice in a row will not be rescued by further strategies
+        if len(attempts) >= 2 and not points and reason in ("timeout", "stalled") \
+                and attempts[-2]['outcome'] == reason:
+            break
+    return polar, attempts
+
+def classify_failure(polar, attempts):
+    """Single failure class for a job that produced no usable polar."""
+    if polar:
+        return "missing_angles"
+    reasons = [a['outcome'] for a in attempts]
+    for reason in ("crashed", "timeout", "stalled", "diverged"):
+        if reason in reasons:
+            return reason
+    return "no_polar"
+
+def refine_polar(foil_code: str, re_num, mach, polar_file, text):
+    """Job steps adding refinement passes to a coarse polar; returns the merged, non-uniform polar text."""
+    polar = parse_polar_text(text)
+    attempted = set(coarse_alphas())
+    pass_file = polar_file.with_name(polar_file.stem + "_refine.txt")
+
+    for _ in range(REFINE_LEVELS):
+        new = refinement_alphas(polar, attempted)
+        if not new:
+            break
+        attempted.update(new)
+        # Warm start from the closest converged point below the first new alpha
+        below = [a for a in polar if a < new[0]]
+        sequence = ([max(below)] if below else []) + new
+        refined, _ = yield from polar_pass(foil_code, re_num, mach, pass_file, [f"alfa {a}" for a in sequence])
+        if refined is None:
+            break
+        polar.update(parse_polar_text(refined))
+
+    if pass_file.exists():
+        pass_file.unlink()
+    merged = format_polar_text(polar, foil_code, re_num, mach)
+    if POLAR_TRANSPORT == "file":
+        polar_file.write_text(merged, encoding="utf-8")
+    return merged
+
+def job_steps(foil_code: str, re_num, mach):
+    """Job steps for one foil at one condition, returning comprehensive aerodynamic data at target angles.
+
+    Returns (foil, re, mach, polar or None, report); report lists every attempt and,
+    for failures, the failure class written to FAILED_FILE.
+    """
+    polar_file = POLAR_DIR / f"{foil_code}_Re{re_num}_M{mach:g}_polar.txt"
+    if POLAR_TRANSPORT == "file":
+        POLAR_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        load_commands(foil_code, COORD_GEN_DIR)
+    except FileNotFoundError as e:
+        print(f"Warning: {e}")
+        return (foil_code, re_num, mach, None,
+                {'attempts': [], 'missing': list(TARGET_ANGLES), 'reason': "no_geometry"})
+
+    polar, attempts = yield from run_with_retries(foil_code, re_num, mach, polar_file)
+    report = {'attempts': attempts, 'missing': missing_targets(polar)}
+    if not polar or len(report['missing']) > ALLOW_MISSING_TARGETS:
+        report['reason'] = classify_failure(polar, attempts)
+        return (foil_code, re_num, mach, None, report)
 
     # Parse polar file and extract data at target angles
-    airfoil_data = {}
-    
     try:
-        with open(polar_file, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-            
-        # Find the start of data table (after header)
-        start_idx = 0
-        for i, line in enumerate(lines):
-            if line.strip().startswith("---"):
-                start_idx = i + 1
-                break
-        
-        # Parse data lines
-        for line in lines[start_idx:]:
-            parts = line.split()
-            if len(parts) >= 7:
-                try:
-                    alpha = float(parts[0])
-                    # Only store data for our target angles
-                    if alpha in TARGET_ANGLES:
-                        airfoil_data[alpha] = {
-                            'CL': float(parts[1]),
-                            'CD': float(parts[2]),
-                            'CDp': float(parts[3]),
-                            'CM': float(parts[4]),
-                            'Top_Xtr': float(parts[5]),
-                            'Bot_Xtr': float(parts[6])
-                        }
-                except (ValueError, IndexError):
-                    continue
-                    
+        text = format_polar_text(polar, foil_code, re_num, mach)
+        if POLAR_TRANSPORT == "file":
+            polar_file.write_text(text, encoding="utf-8")
+        if ADAPTIVE_ALPHA:
+            text = yield from refine_polar(foil_code, re_num, mach, polar_file, text)
+        airfoil_data = complete_polar(foil_code, text)
     except Exception as e:
         print(f"Error parsing {foil_code}: {e}")
-        return (foil_code, None)
-
-    # Check if we got data for all target angles
-    if len(airfoil_data) != len(TARGET_ANGLES):
-        print(f"Warning: {foil_code} only has data for {len(airfoil_data)}/{len(TARGET_ANGLES)} target angles")
-        return (foil_code, None)
-
-    return (foil_code, airfoil_data)
-
-def task_from_tuple(t):
-    m, p, tt = t
-    foil = f"{m}{p}{tt:02d}"
-    return run_single(foil)
-
-def write_results_to_csv(results):
-    """Write all airfoil data to a CSV file for analysis"""
-    with open(RESULTS_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['Airfoil', 'Alpha', 'CL', 'CD', 'CDp', 'CM', 'Top_Xtr', 'Bot_Xtr']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        rows_written = 0
-        for foil_code, data in results:
-            if data is not None:
-                for alpha in TARGET_ANGLES:
-                    if alpha in data:
-                        row_data = data[alpha].copy()
-                        row_data['Airfoil'] = foil_code
-                        row_data['Alpha'] = alpha
-                        writer.writerow(row_data)
-                        rows_written += 1
-        
-        return rows_written
+        report['reason'] = "parse_error"
+        return (foil_code, re_num, mach, None, report)
+
+    if airfoil_data is None:
+        report['reason'] = "missing_angles"
+        return (foil_code, re_num, mach, None, report)
+
+    # In-memory transports leave caching to the main process (see CacheBatch)
+    if USE_CACHE and POLAR_TRANSPORT == "file":
+        try:
+            PolarCache(CACHE_DIR, CACHE_MAX_BYTES).put(polar_cache_key(foil_code, re_num, mach), text)
+        except OSError as e:
+            print(f"Warning: could not cache {foil_code}: {e}")
+
+    return (foil_code, re_num, mach, airfoil_data, report)
+
+def run_single(foil_code: str, re_num, mach):
+    """Run XFOIL for one foil at one condition in this process; see job_steps."""
+    return run_steps(job_steps(foil_code, re_num, mach))
+
+def screening_steps(foil_code: str, re_num, mach, alphas, iters):
+    """Job steps for one cheap pass at just alphas with iters viscous iterations (see progressive_search.py).
+
+    No retries, refinement or caching. Returns job_steps' tuple; the polar holds whatever
+    points converged and is None only if none did.
+    """
+    polar_file = POLAR_DIR / f"{foil_code}_Re{re_num}_M{mach:g}_screen.txt"
+    if POLAR_TRANSPORT == "file":
+        POLAR_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        load_commands(foil_code, COORD_GEN_DIR)
+    except FileNotFoundError as e:
+        print(f"Warning: {e}")
+        return (foil_code, re_num, mach, None,
+                {'attempts': [], 'missing': list(alphas), 'reason': "no_geometry"})
+
+    text, reason = yield from polar_pass(foil_code, re_num, mach, polar_file, [f"alfa {a}" for a in alphas], iters)
+    if polar_file.exists():
+        polar_file.unlink()
+    polar = parse_polar_text(text) if text is not None else {}
+    report = {'attempts': [{'strategy': "screen", 'outcome': reason or "ok", 'points': len(polar)}],
+              'missing': [alpha for alpha in alphas if alpha not in polar]}
+    if not polar:
+        report['reason'] = reason or "no_polar"
+        return (foil_code, re_num, mach, None, report)
+    return (foil_code, re_num, mach, polar, report)
+
+def run_screening(foil_code: str, re_num, mach, alphas, iters):
+    """Run one screening pass in this process; see screening_steps."""
+    return run_steps(screening_steps(foil_code, re_num, mach, alphas, iters))
+
+def expected_cost(task):
+    """Relative XFOIL run time estimate used to schedule the longest jobs first.
+
+    Thick and highly cambered sections separate earlier and need more viscous
+    iterations per point, especially at the top of the alpha sweep; low Reynolds
+    numbers converge more slowly than high ones.
+    """
+    foil, re_num, mach = task
+    m, t = section_params(foil)
+    high_alpha = max(ALPHA_END - 10.0, 0.0) / 10.0
+    return (1.0 + 0.08 * t / 12.0 + 0.15 * m / 6.0) * (1.0 + high_alpha * (m + t / 4.0) / 10.0) \
+        * (1.0 + 0.2 * math.log10(200000 / min(re_num, 200000)))
+
+def candidate_space():
+    """DESIGN_SPACE, narrowed to the foils worth running XFOIL on when PANEL_PREFILTER is set."""
+    if not PANEL_PREFILTER:
+        return DESIGN_SPACE
+    from NACA_matching import EXPERIMENTAL_DATA, COMBINED_WEIGHTS
+    from panel_method import prefilter
+
+    return prefilter(DESIGN_SPACE, EXPERIMENTAL_DATA, COMBINED_WEIGHTS, PREFILTER_KEEP, PREFILTER_ALPHA_MAX)
+
+def build_tasks(space=None):
+    """Stream space (default DESIGN_SPACE) x CONDITIONS jobs, longest expected jobs first within each window.
+
+    Only SCHEDULE_WINDOW foils are held at a time, so the design space is never listed in full.
+    """
+    foils = iter(DESIGN_SPACE if space is None else space)
+    while True:
+        window = list(islice(foils, SCHEDULE_WINDOW))
+        if not window:
+            return
+        tasks = [(foil, re_num, mach) for foil in window for re_num, mach in CONDITIONS]
+        # Longest-processing-time-first keeps every core busy until the end of each window
+        tasks.sort(key=expected_cost, reverse=True)
+        yield from tasks
+
+def cached_result(task, cache):
+    """run_single-style result for a task whose polar is already cached, or None."""
+    foil, re_num, mach = task
+    text = cache.get(polar_cache_key(foil, re_num, mach))
+    data = complete_polar(foil, text) if text is not None else None
+    if data is None:
+        return None
+    return (foil, re_num, mach, data, {'attempts': [], 'missing': missing_targets(data), 'cached': True})
+
+def task_from_tuple(t, job=run_single):
+    return job(*t)
+
+def run_chunk(chunk, job=run_single):
+    return [task_from_tuple(t, job) for t in chunk]
+
+def iter_results(tasks, num_workers=NUM_WORKERS, chunksize=CHUNKSIZE, cache=None, job=run_single):
+    """Run tasks through the pool (or serially) and yield job results as they complete.
+
+    job runs one task in a worker (run_single, or e.g. a partial of run_screening).
+    tasks may be a lazy iterator: it is consumed only PENDING_CHUNKS_PER_WORKER chunks
+    ahead of the results, in order, so the cost ordering of tasks is kept. With a cache,
+    hits (full polars, whatever the job) are yielded straight away without a pool
+    round-trip. If the consumer stops early (Ctrl-C, error) the pool is terminated
+    rather than drained.
+    """
+    if num_workers <= 1:
+        # serial fallback
+        if PERSISTENT_SESSIONS and SESSION is None:
+            start_worker_session()
+        for t in tasks:
+            res = cached_result(t, cache) if cache is not None else None
+            yield res if res is not None else task_from_tuple(t, job)
+        return
+
+    pool = None
+    done = queue.Queue()
+    in_flight = 0
+
+    def submit(chunk):
+        nonlocal pool, in_flight
+        if pool is None:
+            # Started on the first cache miss, so fully cached sweeps never launch XFOIL
+            pool = Pool(num_workers, initializer=start_worker_session if PERSISTENT_SESSIONS else None)
+        pool.apply_async(run_chunk, (chunk, job), callback=done.put, error_callback=done.put)
+        in_flight += 1
+
+    def collect(block):
+        nonlocal in_flight
+        while in_flight and (block or not done.empty()):
+            out = done.get()
+            in_flight -= 1
+            if isinstance(out, BaseException):
+                raise out
+            yield from out
+            block = False
+
+    try:
+        chunk = []
+        for t in tasks:
+            res = cached_result(t, cache) if cache is not None else None
+            if res is not None:
+                yield res
+                continue
+            chunk.append(t)
+            if len(chunk) >= chunksize:
+                submit(chunk)
+                chunk = []
+                yield from collect(block=in_flight >= num_workers * PENDING_CHUNKS_PER_WORKER)
+        if chunk:
+            submit(chunk)
+        while in_flight:
+            yield from collect(block=True)
+        if pool is not None:
+            pool.close()
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+
+async def aiter_results(tasks, concurrency=ASYNC_CONCURRENCY, cache=None):
+    """asyncio counterpart of iter_results: run up to concurrency jobs in this process's event loop.
+
+    Each job borrows an idle AsyncXfoilSession for its whole run, so there are at most
+    concurrency XFOIL processes and no Python process per slot. tasks is consumed only
+    as slots free up; on cancellation (SIGINT) or early exit the running jobs are
+    cancelled and every solver is killed.
+    """
+    sessions = [AsyncXfoilSession(XF_PATH) if PERSISTENT_SESSIONS else None for _ in range(concurrency)]
+    idle = list(sessions)
+    running = set()
+
+    async def run(task):
+        session = idle.pop()
+        try:
+            return await run_steps_async(job_steps(*task), session)
+        finally:
+            idle.append(session)
+
+    try:
+        for t in tasks:
+            res = cached_result(t, cache) if cache is not None else None
+            if res is not None:
+                yield res
+                continue
+            if len(running) >= concurrency:
+                finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for job in finished:
+                    yield job.result()
+            running.add(asyncio.ensure_future(run(t)))
+        while running:
+            finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for job in finished:
+                yield job.result()
+    finally:
+        for job in running:
+            job.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for session in sessions:
+            if session is not None:
+                await session.close(graceful=not running)
+
+def cluster_fingerprint():
+    """Digest of the settings that must match between coordinator and workers."""
+    return hashlib.sha256(f"{polar_cache_key('', 0, 0)}|{TARGET_ANGLES}".encode()).hexdigest()
+
+def iter_results_cluster(tasks, address=CLUSTER_ADDRESS, cache=None):
+    """Serve tasks to --worker processes and yield their results as they come back.
+
+    Like iter_results, tasks is consumed lazily (CLUSTER_QUEUE_DEPTH jobs ahead) and
+    cache hits are yielded without leaving this process. Jobs whose worker stops
+    renewing its lease are reissued after LEASE_TIMEOUT.
+    """
+    try:
+        coordinator = JobCoordinator(address, cluster_fingerprint(), LEASE_TIMEOUT, CLUSTER_TOKEN).start()
+    except ValueError as e:
+        raise SystemExit(f"Coordinator not started: {e} (set XFOIL_CLUSTER_TOKEN)")
+    host, port = coordinator.address
+    print(f"Coordinator listening on {host}:{port}")
+    try:
+        for t in tasks:
+            res = cached_result(t, cache) if cache is not None else None
+            if res is not None:
+                yield res
+                continue
+            coordinator.add(t)
+            while coordinator.pending() >= CLUSTER_QUEUE_DEPTH:
+                yield coordinator.next_result()
+            while not coordinator.results.empty():
+                yield coordinator.next_result()
+        coordinator.close()
+        while coordinator.pending() or not coordinator.results.empty():
+            yield coordinator.next_result()
+    finally:
+        if coordinator.reissued:
+            print(f"Reissued {coordinator.reissued} jobs from expired leases")
+        coordinator.shutdown()
+
+def cluster_worker(address):
+    """Run jobs for the coordinator at address in this process until the sweep is done."""
+    start_worker_session()
+    try:
+        ran = work(address, lambda t: run_single(*t), cluster_fingerprint(), CLUSTER_TOKEN)
+    except (ConnectionError, OSError) as e:
+        raise SystemExit(f"Worker stopped: {e}")
+    print(f"Worker {os.getpid()} finished after {ran} jobs")
+
+def run_workers(coordinator, slots=1):
+    """--worker entry point: run slots worker processes against HOST:PORT."""
+    host, _, port = coordinator.rpartition(":")
+    address = (host, int(port))
+    if slots <= 1:
+        cluster_worker(address)
+        return
+    procs = [Process(target=cluster_worker, args=(address,)) for _ in range(slots)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+class CacheBatch:
+    """Collects polars computed in memory and writes them to the cache CACHE_BATCH at a time."""
+
+    def __init__(self, cache, size=CACHE_BATCH):
+        self.cache = cache
+        self.size = size
+        self.pending = []
+
+    def add(self, foil_code, re_num, mach, polar):
+        self.pending.append((foil_code, re_num, mach, polar))
+        if len(self.pending) >= self.size:
+            self.flush()
+
+    def flush(self):
+        for foil_code, re_num, mach, polar in self.pending:
+            try:
+                self.cache.put(polar_cache_key(foil_code, re_num, mach),
+                               format_polar_text(polar, foil_code, re_num, mach))
+            except OSError as e:
+                print(f"Warning: could not cache {foil_code}: {e}")
+        self.pending = []
+
+def record_result(res, writer, checkpoint, cache_batch=None):
+    """Stream one finished job to the results store and checkpoint; return True on success."""
+    foil, re_num, mach, data, report = res
+    if data is None:
+        writer.write_failure(foil, re_num, mach, report)
+        checkpoint.mark(foil, re_num, mach, "failed")
+        return False
+    writer.write_result(foil, re_num, mach, data)
+    checkpoint.mark(foil, re_num, mach, "done")
+    if cache_batch is not None and not report.get('cached'):
+        cache_batch.add(foil, re_num, mach, data)
+    note = f", missing {report['missing']}" if report['missing'] else ""
+    retries = len(report['attempts']) - 1
+    note += f", {retries} retries" if retries > 0 else ""
+    print(f"✓ {foil} @ Re {re_num}: Success ({len(data)} angles{note})")
+    return True
+
+async def record_results_async(tasks, writer, checkpoint, cache=None, cache_batch=None):
+    """Consume aiter_results in one event loop; return the number of successes.
+
+    SIGINT cancels the loop's work and is re-raised as KeyboardInterrupt once every
+    solver has been shut down.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, asyncio.current_task().cancel)
+        handled = True
+    except (NotImplementedError, RuntimeError):
+        handled = False  # e.g. Windows: sigint_handler raises KeyboardInterrupt instead
+    results = aiter_results(tasks, cache=cache)
+    succ = 0
+    try:
+        async for res in results:
+            succ += record_result(res, writer, checkpoint, cache_batch)
+    except asyncio.CancelledError:
+        raise KeyboardInterrupt
+    finally:
+        await results.aclose()
+        if handled:
+            loop.remove_signal_handler(signal.SIGINT)
+    return succ
 
 def sigint_handler(signum, frame):
     raise KeyboardInterrupt
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch XFOIL runner for NACA airfoil identification.")
+    parser.add_argument("--worker", metavar="HOST:PORT",
+                        help="run jobs for a coordinator (ORCHESTRATOR = \"cluster\") instead of sweeping")
+    parser.add_argument("--slots", type=int, default=1, help="worker processes to start with --worker")
+    args = parser.parse_args()
+    if XF_PATH is None:
+        raise SystemExit("xfoil executable not found in PATH (or set XFOIL_EXECUTABLE).")
+    if args.worker:
+        run_workers(args.worker, args.slots)
+        sys.exit(0)
     signal.signal(signal.SIGINT, sigint_handler)
-    tasks = [(m, p, tt) for m in M_RANGE for p in P_RANGE for tt in TT_RANGE]
-    pool = Pool(NUM_WORKERS) if NUM_WORKERS > 1 else None
-    results = []
-    succ = 0
-    total = len(tasks)
+    checkpoint = SweepCheckpoint(CHECKPOINT_FILE, MAX_ATTEMPTS)
+    if RESUME:
+        dropped = drop_unfinished_rows(RESULTS_CSV, checkpoint)
+        if dropped:
+            print(f"Dropped {dropped} result rows not recorded in the checkpoint")
+    else:
+        checkpoint.reset()
+        for stale in (RESULTS_CSV, FAILED_FILE):
+            if stale.exists():
+                stale.unlink()
+
+    space = candidate_space()
+    total = len(space) * len(CONDITIONS)
+    tasks = (t for t in build_tasks(space) if not checkpoint.should_skip(*t))
+    succ = len(checkpoint.done)
+    writer = ResultsWriter(RESULTS_CSV, FAILED_FILE)
+    cache = PolarCache(CACHE_DIR, CACHE_MAX_BYTES) if USE_CACHE else None
+    # Polars computed in memory or on other hosts are cached here rather than by the workers
+    remote = POLAR_TRANSPORT != "file" or ORCHESTRATOR == "cluster"
+    cache_batch = CacheBatch(cache) if cache is not None and remote else None
 
-    print(f"Running XFOIL analysis for {total} airfoils...")
+    if PANEL_PREFILTER:
+        print(f"Panel pre-filter: {len(space)} of {len(DESIGN_SPACE)} airfoils kept")
+    print(f"Running XFOIL analysis for {len(space)} airfoils x {len(CONDITIONS)} conditions...")
     print(f"Target angles: {TARGET_ANGLES}")
-    print(f"Reynolds: {RE}, Mach: {MACH}")
+    print("Conditions: " + ", ".join(f"Re {re_num} / Mach {mach}" for re_num, mach in CONDITIONS))
+    skipped = len(checkpoint.done) + sum(n >= MAX_ATTEMPTS for n in checkpoint.failures.values())
+    if skipped:
+        print(f"Resuming: {skipped} jobs already completed or permanently failed")
+    if cache is not None:
+        print(f"Cache: {CACHE_DIR} (XFOIL {xfoil_version()})")
 
     try:
-        if pool:
-            it = pool.imap_unordered(task_from_tuple, tasks)
-            for res in it:
-                if res is None:
-                    continue
-                foil, data = res
-                if data is None:
-                    with open(FAILED_FILE, "a") as f:
-                        f.write(f"{foil}\n")
-                    continue
-                succ += 1
-                print(f"✓ {foil}: Success ({len(data)} angles)")
-                results.append((foil, data))
+        if ORCHESTRATOR == "asyncio":
+            succ += asyncio.run(record_results_async(tasks, writer, checkpoint, cache, cache_batch))
         else:
-            # serial fallback
-            for t in tasks:
-                res = task_from_tuple(t)
-                foil, data = res
-                if data is None:
-                    with open(FAILED_FILE, "a") as f:
-                        f.write(f"{foil}\n")
-                    continue
-                succ += 1
-                print(f"✓ {foil}: Success ({len(data)} angles)")
-                results.append((foil, data))
-                
+            results = iter_results_cluster(tasks, cache=cache) if ORCHESTRATOR == "cluster" \
+                else iter_results(tasks, cache=cache)
+            for res in results:
+                succ += record_result(res, writer, checkpoint, cache_batch)
+
     except KeyboardInterrupt:
-        print("\nInterrupted by user. Terminating workers.", file=sys.stderr)
-        if pool:
-            pool.terminate()
-            pool.join()
+        print("\nInterrupted by user. Terminating workers. Re-run to resume.", file=sys.stderr)
         sys.exit(1)
+    except PermissionError:
+        print(f"\nError: Permission denied when writing to {RESULTS_CSV}")
+        sys.exit(3)
+    except OSError as e:
+        print(f"\nError writing results: {e}")
+        sys.exit(4)
     except Exception as e:
         print(f"\nUnexpected error: {e}", file=sys.stderr)
-        if pool:
-            pool.terminate()
-            pool.join()
         sys.exit(2)
     finally:
-        if pool:
-            pool.close()
-            pool.join()
+        writer.close()
+        checkpoint.close()
+        if cache_batch is not None:
+            cache_batch.flush()
 
-    # Write results to CSV
-    if results:
+    if cache is not None:
+        print(f"\nCache: {cache.hits} hits, {cache.misses} misses this run")
+        evicted = cache.evict()
+        totals = cache.record_stats()
+        print(f"Cache totals: {totals['hits']} hits, {totals['misses']} misses, "
+              f"{evicted} evicted, {cache.size_bytes() / 1e6:.1f} MB on disk")
+
+    print(f"\nResults written to: {RESULTS_CSV} ({writer.rows_written} new rows)")
+    if writer.failure_counts:
+        summary = ", ".join(f"{reason}: {n}" for reason, n in writer.failure_counts.most_common())
+        print(f"Failures by class ({FAILED_FILE}): {summary}")
+    if writer.rows_written:
         try:
-            RESULTS_CSV.parent.mkdir(parents=True, exist_ok=True)
-            write_results_to_csv(results)
-            print(f"\nResults written to: {RESULTS_CSV}")
-        except PermissionError:
-            print(f"\nError: Permission denied when writing to {RESULTS_CSV}")
-            sys.exit(3)
+            # Only this run's polars: older CSV rows must not replace polars ingested or verified since
+            shape = merge_from_csv(RESULTS_CSV, POLAR_DB_DIR, writer.written)
+            print(f"Polar database written to: {POLAR_DB_DIR} "
+                  f"({shape[0]} foils x {shape[1]} conditions x {shape[2]} alphas)")
         except OSError as e:
-            print(f"\nError writing results to CSV: {e}")
+            print(f"\nError writing polar database: {e}")
             sys.exit(4)
-    else:
-        print("\nNo results to write to CSV file.")
-
     print(f"\nCompleted. Successful: {succ}/{total}")
     print(f"Output directory: {OUTDIR.resolve()}")
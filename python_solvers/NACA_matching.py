@@ -5,11 +5,18 @@ Keeps only combined RMSE (CL+CM) and CL-only RMSE rankings.
 Excludes 20° angle due to stall effects.
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
 
+from polar_database import PolarDatabase, csv_reynolds_numbers, read_csv_polars
+from polar_index import SignatureIndex
+from polar_interp import interpolate
+from match_uncertainty import ranking_uncertainty
+from match_search import bounded_top_k
+
 # Experimental data - EXCLUDING 20° due to XFOIL returning unreliable data during stall effects
 EXPERIMENTAL_DATA = {
     'Alpha': [-4.0, 0.0, 4.0, 8.0, 12.0, 16.0],
@@ -17,99 +24,157 @@ EXPERIMENTAL_DATA = {
     'CM': [-0.08732, -0.08745, -0.05629, -0.08361, -0.08517, -0.08836],
 }
 
-def interp_values_for_alphas(exp_alphas, sim_df, columns):
-    """Return list(s) of interpolated simulation values for each column at exp_alphas."""
-    results = {col: [] for col in columns}
-
-    for alpha in exp_alphas:
-        match = sim_df[sim_df['Alpha'] == alpha]
-        if len(match) > 0:
-            for col in columns:
-                results[col].append(match.iloc[0][col])
-        else:
-            closest = sim_df.iloc[(sim_df['Alpha'] - alpha).abs().argsort()[:2]]
-            if len(closest) == 2:
-                x1, x2 = closest['Alpha'].values
-                for col in columns:
-                    y1, y2 = closest[col].values
-                    interp = y1 + (y2 - y1) * (alpha - x1) / (x2 - x1)
-                    results[col].append(interp)
-            else:
-                # cannot interpolate reliably
-                return None
-    return results
-
-# Function to calculate RMSEs
-def calculate_combined_rmse(exp_data, sim_data):
-    """Return rmse_cl, rmse_cm and combined_rmse for a single airfoil simulation DataFrame."""
-    aligned = interp_values_for_alphas(exp_data['Alpha'], sim_data, ['CL', 'CM'])
-    if aligned is None:
-        return None
-
-    exp_cl = np.array(exp_data['CL'])
-    exp_cm = np.array(exp_data['CM'])
-    sim_cl = np.array(aligned['CL'])
-    sim_cm = np.array(aligned['CM'])
-
-    rmse_cl = np.sqrt(np.mean((exp_cl - sim_cl) ** 2))
-    rmse_cm = np.sqrt(np.mean((exp_cm - sim_cm) ** 2))
-    combined_rmse = 0.6 * rmse_cl + 0.4 * rmse_cm
+# Reynolds number of the experiment above (Experiment 1, ~10.2 m/s); picks the polar slice when
+# the simulation CSV holds several conditions
+EXPERIMENTAL_RE = 121000
 
-    return {'rmse_cl': rmse_cl, 'rmse_cm': rmse_cm, 'combined_rmse': combined_rmse}
+SIMULATION_CSV = Path("xfoil_comprehensive_outputs/airfoil_data.csv")
+POLAR_DB_DIR = Path("xfoil_comprehensive_outputs/polar_db")
 
-# Function to calculate CL-only RMSE
-def calculate_cl_rmse(exp_data, sim_data):
-    """Return rmse_cl only for a single airfoil simulation DataFrame."""
-    aligned = interp_values_for_alphas(exp_data['Alpha'], sim_data, ['CL'])
-    if aligned is None:
-        return None
+# How candidate polars are evaluated at the experimental angles (see polar_interp.interpolate);
+# "linear" extrapolation extends a polar that stops short of an angle along its end segment
+INTERP_METHOD = "linear"
+INTERP_EXTRAPOLATE = "linear"
 
-    exp_cl = np.array(exp_data['CL'])
-    sim_cl = np.array(aligned['CL'])
-    rmse_cl = np.sqrt(np.mean((exp_cl - sim_cl) ** 2))
-    return {'rmse_cl': rmse_cl}
+COMBINED_WEIGHTS = (0.6, 0.4)  # CL and CM shares of the combined RMSE
+TOP_N = 10
 
-# Main function - reads the CSV, processes airfoils and then calculates RMSEs from above functions for all airfoils
-def main():
-    SIMULATION_CSV = Path("xfoil_comprehensive_outputs/airfoil_data.csv")
+# Find the top matches through the signature index kept next to the polar database (polar_index.py)
+# instead of scoring every polar; the index is (re)built when missing or out of date
+USE_SIGNATURE_INDEX = True
+
+# Without the index, find the top matches by branch and bound over the experimental angles
+# (match_search.py) rather than scoring every polar at every angle
+USE_BRANCH_AND_BOUND = True
+
+def align_to_experiment(exp_data, alpha_grid, values):
+    """Candidate values (n_foils, n_angles, n_coefficients) at the experimental angles."""
+    return interpolate(alpha_grid, values, exp_data['Alpha'], INTERP_METHOD, INTERP_EXTRAPOLATE, axis=1)
+
+def calculate_rmse(exp_data, alpha_grid, values):
+    """Return rmse_cl, rmse_cm and combined_rmse arrays (one entry per candidate).
+
+    values holds CL and CM in that order on its last axis; a candidate that cannot be
+    evaluated at every experimental angle (fewer than two points) gets NaN for that RMSE.
+    """
+    aligned = align_to_experiment(exp_data, alpha_grid, values)
+    exp = np.stack([exp_data['CL'], exp_data['CM']], axis=-1)
+    rmse = np.sqrt(np.mean((aligned - exp[None]) ** 2, axis=1))
+    rmse_cl, rmse_cm = rmse[:, 0], rmse[:, 1]
+    combined_rmse = COMBINED_WEIGHTS[0] * rmse_cl + COMBINED_WEIGHTS[1] * rmse_cm
+    return {'rmse_cl': rmse_cl, 'rmse_cm': rmse_cm, 'combined_rmse': combined_rmse}
+
+def top_matches(airfoils, scores, by, columns, n=TOP_N):
+    """DataFrame of the n candidates with the smallest scores[by], ties in database order."""
+    order = np.argsort(scores[by], kind='stable')
+    order = order[~np.isnan(scores[by][order])][:n]
+    table = pd.DataFrame({col: scores[col][order] for col in columns})
+    table.insert(0, 'Airfoil', np.asarray(airfoils, dtype=object)[order])
+    return table
+
+def open_polar_database():
+    """Return the polar database and its condition closest to EXPERIMENTAL_RE, or (None, None) without one."""
+    if not PolarDatabase.exists(POLAR_DB_DIR):
+        return None, None
+    db = PolarDatabase(POLAR_DB_DIR)
+    condition = db.condition_index(EXPERIMENTAL_RE)
+    print(f"Using XFOIL polars at Re {db.conditions[condition][0]:g} from {POLAR_DB_DIR} "
+          f"(experiment Re ~{EXPERIMENTAL_RE})")
+    return db, condition
+
+def load_indexed_candidates(db, condition):
+    """Return (airfoils, alpha_grid, values) for only the foils that make either top-N list.
+
+    Both rankings are looked up in the signature index; the candidates come back in
+    database order so that ties rank as they would over the full database.
+    """
+    index = SignatureIndex.open(POLAR_DB_DIR, EXPERIMENTAL_DATA['Alpha'], ('CL', 'CM'),
+                                INTERP_METHOD, INTERP_EXTRAPOLATE)
+    target = np.stack([EXPERIMENTAL_DATA['CL'], EXPERIMENTAL_DATA['CM']], axis=-1)
+    combined, _, _ = index.query(target, TOP_N, COMBINED_WEIGHTS, condition)
+    cl_only, _, _ = index.query(target, TOP_N, (1.0, 0.0), condition)
+    rows = np.union1d(combined, cl_only)
+    values = np.asarray(db.condition_slice(condition, ('CL', 'CM'), foils=rows), dtype=np.float64)
+    return [db.foils[i] for i in rows], db.alphas, values
+
+def bounded_candidates(airfoils, alpha_grid, values):
+    """Narrow (airfoils, values) to the foils that make either top-N list, found by branch and bound.
+
+    The survivors keep their database order, so ties rank as they would over every foil.
+    """
+    target = np.stack([EXPERIMENTAL_DATA['CL'], EXPERIMENTAL_DATA['CM']], axis=-1)
+    combined, _ = bounded_top_k(alpha_grid, values, EXPERIMENTAL_DATA['Alpha'], target, TOP_N, COMBINED_WEIGHTS,
+                                INTERP_METHOD, INTERP_EXTRAPOLATE)
+    cl_only, _ = bounded_top_k(alpha_grid, values, EXPERIMENTAL_DATA['Alpha'], target, TOP_N, (1.0, 0.0),
+                               INTERP_METHOD, INTERP_EXTRAPOLATE)
+    rows = np.union1d(combined, cl_only)
+    return [airfoils[i] for i in rows], values[rows]
+
+def load_simulation_data(db=None, condition=None):
+    """Return (airfoils, alpha_grid, values[n_foils, n_alphas, 2]) of CL/CM at the condition closest to EXPERIMENTAL_RE.
+
+    Reads the given polar database condition (only the CL/CM columns); without
+    one, falls back to streaming the CSV export, keeping only the rows at that Re
+    and within the experimental angles.
+    """
+    if db is not None:
+        values = np.asarray(db.condition_slice(condition, ('CL', 'CM')), dtype=np.float64)
+        return db.foils, db.alphas, values
 
     if not SIMULATION_CSV.exists():
         print("Error: Run the data gathering script first!")
         sys.exit(1)
 
-    sim_df = pd.read_csv(SIMULATION_CSV)
-    airfoils = sim_df['Airfoil'].unique()
+    re_range = None
+    available = csv_reynolds_numbers(SIMULATION_CSV)
+    if len(available):
+        match_re = available[np.abs(available - EXPERIMENTAL_RE).argmin()]
+        re_range = (match_re, match_re)
+        print(f"Using XFOIL polars at Re {match_re:g} (experiment Re ~{EXPERIMENTAL_RE})")
+    alpha_range = (min(EXPERIMENTAL_DATA['Alpha']), max(EXPERIMENTAL_DATA['Alpha']))
+    airfoils, _, alpha_grid, values = read_csv_polars(SIMULATION_CSV, ('CL', 'CM'), re_range, alpha_range)
+    if not airfoils:
+        return [], alpha_grid, np.zeros((0, len(alpha_grid), 2))
+    # One condition per Re in files written by the extractor; a file without Re/Mach columns has only one
+    return airfoils, alpha_grid, np.asarray(values[:, 0], dtype=np.float64)
+
+# Main function - loads the polars, processes airfoils and then calculates RMSEs from above functions for all airfoils
+def parse_args():
+    parser = argparse.ArgumentParser(description="Identify the NACA profile closest to the experimental CL/CM.")
+    parser.add_argument("--bootstrap", type=int, metavar="N",
+                        help="also report rank stability over N bootstrap resamples of the experimental points")
+    parser.add_argument("--jackknife", action="store_true",
+                        help="also report rank stability over leave-one-out resamples of the experimental points")
+    parser.add_argument("--noise-cl", type=float, default=0.0, metavar="SIGMA",
+                        help="standard deviation of Gaussian noise added to the experimental CL in each resample")
+    parser.add_argument("--noise-cm", type=float, default=0.0, metavar="SIGMA",
+                        help="standard deviation of Gaussian noise added to the experimental CM in each resample")
+    parser.add_argument("--workers", type=int, default=None, help="processes for resampling (default: all cores)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    resampling = bool(args.bootstrap) or args.jackknife
+    db, condition = open_polar_database()
+    # Resampling re-ranks every candidate, so it needs the full condition rather than the index
+    if db is not None and USE_SIGNATURE_INDEX and not resampling:
+        airfoils, alpha_grid, values = load_indexed_candidates(db, condition)
+    else:
+        airfoils, alpha_grid, values = load_simulation_data(db, condition)
+        if USE_BRANCH_AND_BOUND and not resampling:
+            airfoils, values = bounded_candidates(airfoils, alpha_grid, values)
 
     print("Evaluating airfoils (combined RMSE and CL-only RMSE)...")
     print(f"Using angles: {EXPERIMENTAL_DATA['Alpha']} (20° excluded due to stall effects)")
 
-    combined_results = []
-    cl_only_results = []
-
-    # Calculate both RMSE calculations for each airfoil
-    for airfoil in airfoils:
-        airfoil_data = sim_df[sim_df['Airfoil'] == airfoil].reset_index(drop=True)
-
-        combined = calculate_combined_rmse(EXPERIMENTAL_DATA, airfoil_data)
-        if combined is not None:
-            row = {'Airfoil': airfoil}
-            row.update(combined)
-            combined_results.append(row)
-
-        cl_only = calculate_cl_rmse(EXPERIMENTAL_DATA, airfoil_data)
-        if cl_only is not None:
-            row = {'Airfoil': airfoil}
-            row.update(cl_only)
-            cl_only_results.append(row)
-
-    combined_df = pd.DataFrame(combined_results)
-    cl_only_df = pd.DataFrame(cl_only_results)
+    # Both rankings for every candidate airfoil in one vectorized pass
+    scores = calculate_rmse(EXPERIMENTAL_DATA, alpha_grid, values)
 
     #OUTPUT: COMBINED RMSE (CL + CM)
     print("\n")
     print("COMBINED ANALYSIS (CL + CM) - TOP MATCHES BY COMBINED RMSE")
-    if not combined_df.empty:
-        rmse_rank = combined_df.nsmallest(10, 'combined_rmse')[['Airfoil', 'combined_rmse', 'rmse_cl', 'rmse_cm']]
+    rmse_rank = top_matches(airfoils, scores, 'combined_rmse', ['combined_rmse', 'rmse_cl', 'rmse_cm'])
+    if not rmse_rank.empty:
         print(rmse_rank.to_string(index=False))
     else:
         print("No combined results available.")
@@ -117,13 +182,26 @@ def main():
     #OUTPUT: CL-ONLY RMSE
     print("\n")
     print("CL-ONLY ANALYSIS")
-    if not cl_only_df.empty:
-        cl_rmse_rank = cl_only_df.nsmallest(10, 'rmse_cl')[['Airfoil', 'rmse_cl']]
+    cl_rmse_rank = top_matches(airfoils, scores, 'rmse_cl', ['rmse_cl'])
+    if not cl_rmse_rank.empty:
         print("\nTOP MATCHES BY CL RMSE")
         print("-" * 30)
         print(cl_rmse_rank.to_string(index=False))
     else:
         print("No CL-only results available.")
 
+    #OUTPUT: RANK STABILITY UNDER RESAMPLING
+    if resampling:
+        method = "jackknife" if args.jackknife else "bootstrap"
+        target = np.stack([EXPERIMENTAL_DATA['CL'], EXPERIMENTAL_DATA['CM']], axis=-1)
+        stability = ranking_uncertainty(align_to_experiment(EXPERIMENTAL_DATA, alpha_grid, values), target, airfoils,
+                                        COMBINED_WEIGHTS, args.bootstrap or 0, method,
+                                        (args.noise_cl, args.noise_cm), TOP_N, args.workers)
+        print("\n")
+        print(f"RANK STABILITY OF THE TOP {TOP_N} COMBINED MATCHES ({method.upper()}"
+              + (f", {args.bootstrap} resamples" if method == "bootstrap" else "") + ")")
+        print("score_lo/hi and rank_lo/hi: 95 % intervals; p_best/p_top: share of resamples ranked first / in the top list")
+        print(stability.to_string(index=False))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Batch NACA matching of every experiment
+Matches all wind tunnel experiments at once - the runs in intial_LabData.csv (reduced to
+coefficients) and the coefficient datasets of linear_regression_solver.py - each against
+the polar slice at its own Reynolds number
+
+Experiments are laid out on the union of their angles, and the experiments sharing a
+condition and a set of used angles are scored together on those angles against every
+candidate with one matrix product per coefficient (see match_uncertainty.batch_scores),
+giving an experiments x candidates RMSE table. A candidate missing an angle one experiment
+uses only fails that experiment, not every experiment at the condition.
+With --interpolate-re each experiment is matched against polars interpolated to its exact
+Re (see polar_query.py) instead of the stored condition nearest it.
+
+Usage:
+    python batch_matching.py [--source all|lab|regression] [--weights 0.6 0.4]
+                             [--alpha-min A] [--alpha-max 16] [--exclude-alpha A ...] [--top N]
+                             [--interpolate-re [--run-missing]]
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from polar_database import PolarDatabase
+from polar_interp import interpolate
+from polar_query import fill_brackets, interpolate_re
+from match_uncertainty import batch_scores
+from NACA_matching import COMBINED_WEIGHTS, INTERP_METHOD, INTERP_EXTRAPOLATE, POLAR_DB_DIR, TOP_N
+
+LAB_DATA_CSV = Path("supporting_CSVs/intial_LabData.csv")
+
+# Tunnel and wing constants (README, "Key Constants and Parameters")
+AIR_DENSITY = 1.227     # kg/m^3
+AIR_VISCOSITY = 1.807e-5  # N s/m^2
+CHORD = 0.175           # m
+WING_AREA = 0.12425     # m^2
+
+# Default angle mask: as in NACA_matching.py, the post-stall points above 16 degrees are left out
+ALPHA_MAX = 16.0
+
+
+def experiment_number(name):
+    """The N of an 'Experiment_N ...' name, or None."""
+    match = re.match(r"Experiment_(\d+)", name)
+    return int(match.group(1)) if match else None
+
+
+def load_lab_experiments(csv_path=LAB_DATA_CSV):
+    """{name: {'Alpha', 'CL', 'CM', 'Re'}} of every run in the raw lab data, in file order.
+
+    Lift and pitching moment are reduced with the dynamic pressure of each reading
+    (q = rho V^2 / 2), the wing area and the chord; Re is the run's mean rho V c / mu.
+    """
+    df = pd.read_csv(csv_path)
+    velocity = df['Velocity of Flow (m/s) (Derived)'].to_numpy(dtype=float)
+    force = 0.5 * AIR_DENSITY * velocity ** 2 * WING_AREA
+    df = df.assign(CL=df['Lift (N)'] / force, CM=df['Pitching Moment'] / (force * CHORD),
+                   Re=AIR_DENSITY * velocity * CHORD / AIR_VISCOSITY)
+    experiments = {}
+    for name, run in df.groupby('Experiment', sort=False):
+        experiments[name] = {
+            'Alpha': run['Angle of Attack (°)'].to_numpy(dtype=float),
+            'CL': run['CL'].to_numpy(),
+            'CM': run['CM'].to_numpy(),
+            'Re': float(run['Re'].mean()),
+        }
+    return experiments
+
+
+def regression_experiments(lab_experiments):
+    """linear_regression_solver's datasets as {name: {'Alpha', 'CL', 'CM', 'Re'}}.
+
+    The datasets carry no flow conditions, so each takes the Re of the lab run with the
+    same experiment number; datasets without one are left out.
+    """
+    from linear_regression_solver import datasets
+
+    lab_re = {experiment_number(name): exp['Re'] for name, exp in lab_experiments.items()}
+    experiments = {}
+    for name, data in datasets.items():
+        re_num = lab_re.get(experiment_number(name))
+        if re_num is None:
+            print(f"Skipping {name}: no lab run to take its Reynolds number from")
+            continue
+        experiments[name] = {
+            'Alpha': np.asarray(data['angles'], dtype=float),
+            'CL': np.asarray(data['Cl'], dtype=float),
+            'CM': np.asarray(data['Cm'], dtype=float),
+            'Re': re_num,
+        }
+    return experiments
+
+
+def alpha_mask(alphas, alpha_min=None, alpha_max=ALPHA_MAX, exclude=()):
+    """Boolean mask of the angles used for matching."""
+    alphas = np.asarray(alphas, dtype=float)
+    mask = ~np.isin(alphas, np.asarray(exclude, dtype=float))
+    if alpha_min is not None:
+        mask &= alphas >= alpha_min
+    if alpha_max is not None:
+        mask &= alphas <= alpha_max
+    return mask
+
+
+def batch_match(db, experiments, masks=None, weights=COMBINED_WEIGHTS, re_interpolation=False):
+    """Score every foil of db against every experiment at the experiment's own condition.
+
+    experiments is a list of {'Alpha', 'CL', 'CM', 'Re'} dicts and masks an optional list of
+    boolean arrays (one per experiment, over its 'Alpha') of the angles to use. Polars are
+    those of the stored condition nearest each experiment's Re, or with re_interpolation
+    interpolated to that Re (polar_query.interpolate_re). Returns (combined[n_experiments,
+    n_foils], rmse[n_experiments, n_foils, 2] of CL and CM, Re of the polars per experiment);
+    foils that cannot be evaluated score NaN.
+    """
+    if masks is None:
+        masks = [np.ones(len(exp['Alpha']), dtype=bool) for exp in experiments]
+    alphas = np.unique(np.concatenate([np.asarray(exp['Alpha'], dtype=float)[m]
+                                       for exp, m in zip(experiments, masks)]))
+    # Every experiment on the union of angles; unused angles get a zero weight (and a zero target),
+    # and are left out of its scoring group below
+    point_weights = np.zeros((len(experiments), len(alphas)))
+    targets = np.zeros((len(experiments), len(alphas), 2))
+    for e, (exp, m) in enumerate(zip(experiments, masks)):
+        cols = np.searchsorted(alphas, np.asarray(exp['Alpha'], dtype=float)[m])
+        point_weights[e, cols] = 1.0
+        targets[e, cols] = np.stack([np.asarray(exp['CL'])[m], np.asarray(exp['CM'])[m]], axis=-1)
+    if (point_weights.sum(axis=1) == 0).any():
+        raise ValueError("every experiment needs at least one angle left after masking")
+
+    if re_interpolation:
+        polar_re = np.array([float(exp['Re']) for exp in experiments])
+    else:
+        polar_re = np.array([db.conditions[db.condition_index(exp['Re'])][0] for exp in experiments])
+    rmse = np.full((len(experiments), len(db.foils), 2), np.nan)
+    for re_num in np.unique(polar_re):
+        rows = np.flatnonzero(polar_re == re_num)
+        if re_interpolation:
+            values = interpolate_re(db, re_num, ('CL', 'CM'))[0]
+        else:
+            values = np.asarray(db.condition_slice(db.condition_index(re_num), ('CL', 'CM')), dtype=np.float64)
+        aligned = interpolate(db.alphas, values, alphas, INTERP_METHOD, INTERP_EXTRAPOLATE, axis=1)
+        # A NaN at an angle an experiment does not use must not reach its sum (0 x NaN is NaN)
+        patterns, group = np.unique(point_weights[rows] > 0, axis=0, return_inverse=True)
+        for g, used in enumerate(patterns):
+            members = rows[group.ravel() == g]
+            for c, unit in enumerate(np.eye(2)):
+                rmse[members, :, c] = batch_scores(aligned[:, used], targets[members][:, used],
+                                                   point_weights[members][:, used], unit)
+    combined = rmse @ np.asarray(weights, dtype=float)
+    return combined, rmse, polar_re
+
+
+def ranked(airfoils, combined, rmse, n=TOP_N):
+    """Top n of one experiment's scores as a DataFrame, ties in database order."""
+    order = np.argsort(combined, kind='stable')
+    order = order[~np.isnan(combined[order])][:n]
+    return pd.DataFrame({'Airfoil': np.asarray(airfoils, dtype=object)[order], 'combined_rmse': combined[order],
+                         'rmse_cl': rmse[order, 0], 'rmse_cm': rmse[order, 1]})
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Match every experiment against the polar database at its own Re.")
+    parser.add_argument("--source", choices=("all", "lab", "regression"), default="all",
+                        help="experiments to match: the raw lab runs, linear_regression_solver's datasets, or both")
+    parser.add_argument("--lab-data", type=Path, default=LAB_DATA_CSV, help="raw lab data CSV")
+    parser.add_argument("--db", type=Path, default=POLAR_DB_DIR, help="polar database directory")
+    parser.add_argument("--weights", type=float, nargs=2, default=COMBINED_WEIGHTS, metavar=("CL", "CM"),
+                        help="CL and CM shares of the combined RMSE")
+    parser.add_argument("--alpha-min", type=float, default=None, help="leave out angles below this")
+    parser.add_argument("--alpha-max", type=float, default=ALPHA_MAX, help="leave out angles above this")
+    parser.add_argument("--exclude-alpha", type=float, nargs="+", default=(), metavar="A",
+                        help="leave out these angles")
+    parser.add_argument("--top", type=int, default=TOP_N, help="matches listed per experiment")
+    parser.add_argument("--interpolate-re", action="store_true",
+                        help="interpolate polars to each experiment's Re instead of the nearest stored condition")
+    parser.add_argument("--run-missing", action="store_true",
+                        help="with --interpolate-re, run XFOIL for foils without bracketing polars first")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not PolarDatabase.exists(args.db):
+        print(f"Error: no polar database at {args.db}; run the data gathering script first!")
+        sys.exit(1)
+    if not args.lab_data.exists():
+        print(f"Error: no lab data at {args.lab_data}")
+        sys.exit(1)
+    lab = load_lab_experiments(args.lab_data)
+    experiments = {}
+    if args.source in ("all", "lab"):
+        experiments.update(lab)
+    if args.source in ("all", "regression"):
+        experiments.update(regression_experiments(lab))
+    names = list(experiments)
+    exps = list(experiments.values())
+    masks = [alpha_mask(exp['Alpha'], args.alpha_min, args.alpha_max, args.exclude_alpha) for exp in exps]
+    empty = [name for name, m in zip(names, masks) if not m.any()]
+    if empty:
+        print(f"Error: no angles left to match for {', '.join(empty)}")
+        sys.exit(1)
+
+    if args.interpolate_re and args.run_missing:
+        added = fill_brackets(args.db, PolarDatabase(args.db).foils, sorted({exp['Re'] for exp in exps}))
+        if added:
+            print(f"Added {added} polars to {args.db}")
+    db = PolarDatabase(args.db)
+    combined, rmse, polar_re = batch_match(db, exps, masks, args.weights, args.interpolate_re)
+    print(f"Matched {len(exps)} experiments against {len(db.foils)} foils from {args.db} "
+          f"(weights CL {args.weights[0]:g} / CM {args.weights[1]:g})")
+
+    summary = []
+    for e, name in enumerate(names):
+        table = ranked(db.foils, combined[e], rmse[e], args.top)
+        used = np.asarray(exps[e]['Alpha'])[masks[e]]
+        print("\n")
+        source = "interpolated" if args.interpolate_re else f"at Re {polar_re[e]:g}"
+        print(f"{name} - Re {exps[e]['Re']:.0f} (polars {source}), "
+              f"angles {', '.join(f'{a:g}' for a in used)}")
+        print(table.to_string(index=False) if not table.empty else "No results available.")
+        best = table.iloc[0] if not table.empty else None
+        summary.append({'Experiment': name, 'Re': round(exps[e]['Re']),
+                        'Polar Re': round(polar_re[e]) if args.interpolate_re else polar_re[e], 'Points': len(used),
+                        'Best match': best['Airfoil'] if best is not None else None,
+                        'combined_rmse': best['combined_rmse'] if best is not None else np.nan})
+
+    print("\n")
+    print("BEST MATCH PER EXPERIMENT")
+    print(pd.DataFrame(summary).to_string(index=False))
+
+    # A foil explaining every experiment: mean combined RMSE over all of them
+    print("\n")
+    print("ALL EXPERIMENTS - TOP MATCHES BY MEAN COMBINED RMSE")
+    mean = combined.mean(axis=0)
+    print(ranked(db.foils, mean, rmse.mean(axis=0), args.top).rename(columns={
+        'combined_rmse': 'mean_combined_rmse', 'rmse_cl': 'mean_rmse_cl', 'rmse_cm': 'mean_rmse_cm'}).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for NACA_data_extractor using the fake XFOIL stand-in
+Measures foils/second against orchestrator, worker count, chunk size and polar cache state
+
+Usage:
+    python benchmark_extractor.py                       # print the table
+    python benchmark_extractor.py --save bench.json     # record a baseline
+    python benchmark_extractor.py --baseline bench.json # fail if any scenario got >20% slower
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from itertools import islice, product
+from pathlib import Path
+
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+
+# ---------- benchmark settings ----------
+ORCHESTRATORS = ["pool", "asyncio"]
+WORKER_COUNTS = [1, 2, 4]   # pool processes, or concurrent sessions for asyncio
+CHUNK_SIZES = [1, 4]        # pool only; asyncio has no dispatch chunks
+CACHE_STATES = ["cold", "warm"]
+BENCH_FOILS = 40            # jobs per scenario (foil x condition pairs)
+FAKE_LATENCY = 0.002        # fake solver seconds per alpha point
+FAKE_FAILURE_RATE = 0.02    # fake per-point non-convergence probability
+REGRESSION_TOLERANCE = 0.2  # allowed fractional drop in foils/s against a baseline
+MIN_COMPARABLE_SECONDS = 0.1  # faster scenarios (e.g. warm cache) are too noisy to compare
+# ----------------------------------------
+
+# The extractor reads these at import time, so set them before importing it
+os.environ.setdefault("XFOIL_EXECUTABLE", str(HERE / "fake_xfoil.py"))
+os.environ.setdefault("FAKE_XFOIL_LATENCY", str(FAKE_LATENCY))
+os.environ.setdefault("FAKE_XFOIL_FAILURE_RATE", str(FAKE_FAILURE_RATE))
+
+import NACA_data_extractor as extractor  # noqa: E402
+from polar_cache import PolarCache  # noqa: E402
+
+
+async def count_async(tasks, workers, cache):
+    succ = 0
+    async for res in extractor.aiter_results(tasks, workers, cache):
+        succ += res[3] is not None
+    return succ
+
+
+def run_scenario(tasks, orchestrator, workers, chunksize):
+    """Run one pass over tasks in the current directory; return (seconds, successes)."""
+    start = time.perf_counter()
+    cache = PolarCache(extractor.CACHE_DIR, extractor.CACHE_MAX_BYTES)
+    if orchestrator == "asyncio":
+        succ = asyncio.run(count_async(tasks, workers, cache))
+    else:
+        succ = 0
+        for res in extractor.iter_results(tasks, workers, chunksize, cache):
+            succ += res[3] is not None
+    return time.perf_counter() - start, succ
+
+
+def benchmark(n_jobs=BENCH_FOILS):
+    tasks = list(islice(extractor.build_tasks(), n_jobs))
+    rows = []
+    origin = Path.cwd()
+    for orchestrator, workers, chunksize, cache_state in product(ORCHESTRATORS, WORKER_COUNTS, CHUNK_SIZES,
+                                                                 CACHE_STATES):
+        if orchestrator == "asyncio" and chunksize != CHUNK_SIZES[0]:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            # All extractor output paths are relative, so each scenario gets a clean tree
+            os.chdir(tmp)
+            try:
+                extractor.USE_CACHE = True
+                if cache_state == "warm":
+                    run_scenario(tasks, orchestrator, workers, chunksize)
+                seconds, succ = run_scenario(tasks, orchestrator, workers, chunksize)
+            finally:
+                os.chdir(origin)
+        rows.append({
+            'Orchestrator': orchestrator,
+            'Workers': workers,
+            'Chunk size': chunksize,
+            'Cache': cache_state,
+            'Jobs': len(tasks),
+            'Succeeded': succ,
+            'Seconds': seconds,
+            'Foils/s': len(tasks) / seconds,
+        })
+        print(f"{orchestrator} workers={workers} chunksize={chunksize} cache={cache_state}: {len(tasks) / seconds:.1f} foils/s")
+    return pd.DataFrame(rows)
+
+
+def compare_to_baseline(results, baseline_file):
+    """Return scenarios whose throughput dropped by more than REGRESSION_TOLERANCE."""
+    baseline = pd.DataFrame(json.loads(Path(baseline_file).read_text()))
+    if 'Orchestrator' not in baseline:
+        baseline['Orchestrator'] = "pool"  # baselines saved before the asyncio runner existed
+    keys = ['Orchestrator', 'Workers', 'Chunk size', 'Cache']
+    merged = results.merge(baseline[keys + ['Foils/s']], on=keys, suffixes=('', ' (baseline)'))
+    merged['Change'] = merged['Foils/s'] / merged['Foils/s (baseline)'] - 1.0
+    comparable = merged['Jobs'] / merged['Foils/s (baseline)'] >= MIN_COMPARABLE_SECONDS
+    return merged[comparable & (merged['Change'] < -REGRESSION_TOLERANCE)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark extractor throughput against the fake XFOIL.")
+    parser.add_argument("--jobs", type=int, default=BENCH_FOILS, help="foil/condition jobs per scenario")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--baseline", help="compare against a saved baseline and fail on regressions")
+    args = parser.parse_args()
+
+    results = benchmark(args.jobs)
+    print("\n" + "=" * 80)
+    print("EXTRACTOR THROUGHPUT (fake XFOIL, "
+          f"{os.environ['FAKE_XFOIL_LATENCY']} s/point, failure rate {os.environ['FAKE_XFOIL_FAILURE_RATE']})")
+    print("=" * 80)
+    print(results.to_string(index=False, float_format=lambda x: f'{x:.3f}'))
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results.to_dict(orient='records'), indent=2))
+        print(f"\nBaseline written to {args.save}")
+    if args.baseline:
+        slower = compare_to_baseline(results, args.baseline)
+        if not slower.empty:
+            print(f"\nThroughput regressions (> {REGRESSION_TOLERANCE:.0%} slower than baseline):")
+            print(slower.to_string(index=False, float_format=lambda x: f'{x:.3f}'))
+            sys.exit(1)
+        print("\nNo throughput regressions against baseline.")
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Lazily generated airfoil design spaces for the XFOIL extractor
+Spaces stream foil codes one at a time, know their size without listing it,
+and can be added together: Naca4(...) + Naca5(...) + CoordinateFiles()
+
+Foil codes:
+    "2412"          NACA 4-digit, loaded with XFOIL's NACA command
+    "2.5-4-12.5"    NACA 4-digit with fractional parameters (camber %, position in tenths,
+                    thickness %); coordinates are generated and loaded with LOAD
+    "23012"         NACA 5-digit, loaded with XFOIL's NACA command
+    "63-412"        NACA 6-series (series-, design CL in tenths, thickness %)
+    anything else   a custom section
+6-series and custom sections are read from COORD_DIR/<code>.dat, since XFOIL
+cannot generate them itself.
+"""
+
+import hashlib
+import math
+import os
+import re
+from itertools import product
+from pathlib import Path
+
+COORD_DIR = Path("airfoil_coordinates")  # user-supplied coordinate files, <foil code>.dat
+COORD_POINTS = 81  # points per surface for generated coordinates
+
+_NACA4_FRACTIONAL = re.compile(r"(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)")
+_NACA6 = re.compile(r"6(\d)-(\d)(\d\d)")
+
+
+def frange(start, stop, step):
+    """Inclusive float range, e.g. frange(11, 13, 0.5) -> [11.0, 11.5, 12.0, 12.5, 13.0]."""
+    n = int(round((stop - start) / step))
+    return [round(start + i * step, 6) for i in range(n + 1)]
+
+
+def naca4_code(m, p, t):
+    """Foil code for a 4-digit section; fractional parameters use the dashed form."""
+    if all(float(v).is_integer() for v in (m, p, t)):
+        return f"{int(m)}{int(p)}{int(t):02d}"
+    return f"{m:g}-{p:g}-{t:g}"
+
+
+def naca4_params(code):
+    """(max camber %, camber position in tenths, thickness %) of a 4-digit code, or None for other sections."""
+    if re.fullmatch(r"\d{4}", code):
+        return float(code[0]), float(code[1]), float(code[2:])
+    match = _NACA4_FRACTIONAL.fullmatch(code)
+    if match:
+        return tuple(float(g) for g in match.groups())
+    return None
+
+
+def section_params(code):
+    """Approximate (max camber %, thickness %) of a foil code, for run-time estimates.
+
+    5-digit and 6-series camber follows from the design lift coefficient; custom
+    sections are assumed to be moderate (2 % camber, 12 % thickness).
+    """
+    if re.fullmatch(r"\d{4}", code):
+        return float(code[0]), float(code[2:])
+    if re.fullmatch(r"\d{5}", code):
+        return 0.92 * int(code[0]), float(code[3:])
+    match = _NACA4_FRACTIONAL.fullmatch(code)
+    if match:
+        return float(match.group(1)), float(match.group(3))
+    match = _NACA6.fullmatch(code)
+    if match:
+        return 0.55 * int(match.group(2)), float(match.group(3))
+    return 2.0, 12.0
+
+
+def naca4_coordinates(m, p, t, n=COORD_POINTS):
+    """Selig-ordered (x, y) points of a 4-digit section with cosine spacing.
+
+    m and t are percent of chord, p is tenths of chord. Uses the open trailing
+    edge thickness coefficient, as XFOIL's own NACA command does.
+    """
+    m, p, t = m / 100.0, p / 10.0, t / 100.0
+    upper, lower = [], []
+    for i in range(n):
+        x = 0.5 * (1.0 - math.cos(math.pi * i / (n - 1)))
+        yt = 5.0 * t * (0.2969 * math.sqrt(x) - 0.1260 * x - 0.3516 * x ** 2
+                        + 0.2843 * x ** 3 - 0.1015 * x ** 4)
+        if m == 0.0 or p == 0.0:
+            yc, dyc = 0.0, 0.0
+        elif x < p:
+            yc, dyc = m / p ** 2 * (2 * p * x - x ** 2), 2 * m / p ** 2 * (p - x)
+        else:
+            yc = m / (1 - p) ** 2 * (1 - 2 * p + 2 * p * x - x ** 2)
+            dyc = 2 * m / (1 - p) ** 2 * (p - x)
+        theta = math.atan(dyc)
+        upper.append((x - yt * math.sin(theta), yc + yt * math.cos(theta)))
+        lower.append((x + yt * math.sin(theta), yc - yt * math.cos(theta)))
+    return upper[::-1] + lower[1:]
+
+
+def write_coordinates(path, name, points):
+    """Write a labelled XFOIL coordinate file (atomic, so pool workers can share it)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(f"{name}\n")
+        for x, y in points:
+            f.write(f" {x:10.6f} {y:10.6f}\n")
+    os.replace(tmp, path)
+
+
+def _is_labelled(path):
+    """True if the first line of a coordinate file is a name rather than a coordinate pair."""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        first = f.readline().split()
+    try:
+        [float(v) for v in first]
+    except ValueError:
+        return True
+    return False
+
+
+def coordinate_file(code, generated_dir):
+    """Coordinate file XFOIL should LOAD for code, generating it if needed; None if NACA can build it."""
+    if re.fullmatch(r"\d{4,5}", code):
+        return None
+    match = _NACA4_FRACTIONAL.fullmatch(code)
+    if match:
+        path = Path(generated_dir) / f"{code}.dat"
+        if not path.exists():
+            m, p, t = (float(g) for g in match.groups())
+            write_coordinates(path, f"NACA {code}", naca4_coordinates(m, p, t))
+        return path
+    return COORD_DIR / f"{code}.dat"
+
+
+def load_commands(code, generated_dir):
+    """XFOIL commands that make code the current airfoil.
+
+    Raises FileNotFoundError when a 6-series or custom section has no coordinate file.
+    """
+    path = coordinate_file(code, generated_dir)
+    if path is None:
+        return [f"naca {code}"]
+    if not path.exists():
+        raise FileNotFoundError(f"no coordinate file {path} for foil {code}")
+    # Unlabelled (plain x y) files make LOAD ask for an airfoil name
+    return [f"load {path}"] + ([] if _is_labelled(path) else [code])
+
+
+def geometry_digest(code, generated_dir):
+    """Hash of a user-supplied coordinate file, so editing it invalidates cached polars; else ''."""
+    if re.fullmatch(r"\d{4,5}", code) or _NACA4_FRACTIONAL.fullmatch(code):
+        return ""
+    path = coordinate_file(code, generated_dir)
+    if not path.exists():
+        return ""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class DesignSpace:
+    """Re-iterable, sized stream of foil codes; spaces combine with +."""
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __add__(self, other):
+        return Chain(self, other)
+
+
+class Chain(DesignSpace):
+    def __init__(self, *spaces):
+        self.spaces = spaces
+
+    def __iter__(self):
+        for space in self.spaces:
+            yield from space
+
+    def __len__(self):
+        return sum(len(space) for space in self.spaces)
+
+
+class Subset(DesignSpace):
+    """The foils of space whose position in it is set in keep (a boolean array as long as space)."""
+
+    def __init__(self, space, keep):
+        self.space = space
+        self.keep = keep
+
+    def __iter__(self):
+        for code, kept in zip(self.space, self.keep):
+            if kept:
+                yield code
+
+    def __len__(self):
+        return int(self.keep.sum())
+
+
+class _Grid(DesignSpace):
+    """Cross-product of parameter sequences mapped to foil codes."""
+
+    def __init__(self, *axes):
+        self.axes = [list(axis) for axis in axes]
+
+    def code(self, *params):
+        raise NotImplementedError
+
+    def __iter__(self):
+        for params in product(*self.axes):
+            yield self.code(*params)
+
+    def __len__(self):
+        return math.prod(len(axis) for axis in self.axes)
+
+
+class Naca4(_Grid):
+    """4-digit sections: max camber (%), camber position (tenths) and thickness (%).
+
+    Any of the axes may hold fractional values, e.g. thickness=frange(10, 16, 0.5).
+    """
+
+    def __init__(self, camber, position, thickness):
+        super().__init__(camber, position, thickness)
+
+    def code(self, m, p, t):
+        return naca4_code(m, p, t)
+
+
+class Naca5(_Grid):
+    """5-digit sections: design-CL digit, camber-position digit and thickness (%).
+
+    XFOIL's NACA command only knows the standard (non-reflexed) 210-250 mean lines,
+    so the design-CL digit defaults to 2.
+    """
+
+    def __init__(self, position, thickness, design_cl=(2,)):
+        super().__init__(design_cl, position, thickness)
+
+    def code(self, l, p, t):
+        return f"{l}{p}0{int(t):02d}"
+
+
+class Naca6(_Grid):
+    """6-series sections, e.g. Naca6([3, 4, 5], [2, 4], [12, 15]) -> 63-212, ...
+
+    Coordinates are read from COORD_DIR/<code>.dat; jobs without one fail with 'no_geometry'.
+    """
+
+    def __init__(self, series, design_cl, thickness):
+        super().__init__(series, design_cl, thickness)
+
+    def code(self, s, cl, t):
+        return f"6{s}-{cl}{int(t):02d}"
+
+
+class CoordinateFiles(DesignSpace):
+    """Every coordinate file in COORD_DIR matching pattern, named after its file stem."""
+
+    def __init__(self, pattern="*.dat"):
+        self.pattern = pattern
+
+    def __iter__(self):
+        for path in sorted(COORD_DIR.glob(self.pattern)):
+            yield path.stem
+
+    def __len__(self):
+        return sum(1 for _ in COORD_DIR.glob(self.pattern))
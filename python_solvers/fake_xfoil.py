@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+XFOIL stand-in for exercising and benchmarking the extractor without the real solver
+Speaks enough of XFOIL's command language (NACA, LOAD, PANE, PPAR, OPER, VISC/RE, MACH, ITER,
+VPAR, INIT, PACC, ASEQ, ALFA, QUIT) and writes synthetic polars in XFOIL's format
+
+Behaviour is configured through environment variables:
+    FAKE_XFOIL_LATENCY       seconds spent per alpha point (default 0.0)
+    FAKE_XFOIL_STARTUP       seconds spent starting up (default 0.0)
+    FAKE_XFOIL_FAILURE_RATE  probability a point does not converge (default 0.0)
+    FAKE_XFOIL_HANG_RATE     probability a foil hangs the solver (default 0.0)
+    FAKE_XFOIL_CRASH_RATE    probability a foil crashes the solver (default 0.0)
+    FAKE_XFOIL_SEED          seed for the random outcomes above (default 0)
+Outcomes are derived from (seed, foil, Re, alpha), so reruns are reproducible.
+"""
+
+import hashlib
+import math
+import os
+import sys
+import time
+
+VERSION = "6.99"
+
+LATENCY = float(os.environ.get("FAKE_XFOIL_LATENCY", "0"))
+STARTUP = float(os.environ.get("FAKE_XFOIL_STARTUP", "0"))
+FAILURE_RATE = float(os.environ.get("FAKE_XFOIL_FAILURE_RATE", "0"))
+HANG_RATE = float(os.environ.get("FAKE_XFOIL_HANG_RATE", "0"))
+CRASH_RATE = float(os.environ.get("FAKE_XFOIL_CRASH_RATE", "0"))
+SEED = os.environ.get("FAKE_XFOIL_SEED", "0")
+
+
+def chance(*parts):
+    """Deterministic pseudo-random number in [0, 1) for the given identifiers."""
+    digest = hashlib.sha256("|".join(map(str, (SEED,) + parts)).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def naca_parameters(code):
+    """(max camber, camber position, thickness) as chord fractions for a NACA code.
+
+    Understands 4- and 5-digit codes, fractional 4-digit codes ("2.5-4-12.5") and
+    6-series codes ("63-412"); anything else is treated as a symmetric 12% section.
+    """
+    code = code.upper().replace("NACA", "").strip()
+    parts = code.split("-")
+    if len(parts) == 3:
+        m, p, t = map(float, parts)
+        return m / 100, p / 10, t / 100
+    if len(parts) == 2 and len(parts[1]) == 3 and parts[1].isdigit():
+        return 0.0055 * int(parts[1][0]), 0.5, int(parts[1][1:]) / 100
+    digits = "".join(ch for ch in code if ch.isdigit())
+    if len(digits) == 4:
+        return int(digits[0]) / 100, int(digits[1]) / 10, int(digits[2:]) / 100
+    if len(digits) == 5:
+        return 0.009 * int(digits[0]), int(digits[1]) / 20, int(digits[3:]) / 100
+    return 0.0, 0.0, 0.12
+
+
+def synthetic_point(code, re_num, alpha):
+    """Plausible (CL, CD, CDp, CM, Top_Xtr, Bot_Xtr) from thin-aerofoil theory plus a stall model."""
+    m, p, t = naca_parameters(code)
+    alpha_l0 = -105.0 * m  # deg; about -4 deg for 4% camber
+    alpha_stall = 10.0 + 40.0 * t + 1.5 * math.log10(max(re_num, 1e4) / 1e5)
+    cl_lin = 0.105 * (alpha - alpha_l0)
+    over = max(alpha - alpha_stall, 0.0)
+    cl = cl_lin - 0.012 * over ** 2
+    cd = 0.006 + 0.04 * t ** 2 + 0.0001 * alpha ** 2 + 0.004 * over ** 1.5
+    cdp = 0.4 * cd + 0.003 * over
+    cm = -2.5 * m * (1.0 - 0.5 * p) - 0.003 * over
+    top_xtr = min(1.0, max(0.02, 0.75 - 0.05 * alpha))
+    bot_xtr = min(1.0, max(0.05, 0.9 + 0.05 * alpha))
+    return cl, cd, cdp, cm, top_xtr, bot_xtr
+
+
+class FakeXfoil:
+    def __init__(self, lines):
+        self.lines = lines
+        self.menu = []  # stack of open sub-menus; empty means top level
+        self.foil = None
+        self.viscous = False
+        self.re_num = 0.0
+        self.mach = 0.0
+        self.iters = 20
+        self.polar_file = None
+        self.accumulating = False
+        self.points = []
+
+    def say(self, text=""):
+        sys.stdout.write(text + "\n")
+        sys.stdout.flush()
+
+    def next_line(self):
+        try:
+            return next(self.lines).rstrip("\n")
+        except StopIteration:
+            sys.exit(0)
+
+    def load_foil(self, code):
+        self.foil = code
+        if chance("crash", code) < CRASH_RATE:
+            self.say(" Segmentation fault")
+            sys.exit(139)
+        if chance("hang", code) < HANG_RATE:
+            while True:
+                time.sleep(3600)
+        self.say(f" Buffer airfoil set using {len(code) * 40} points")
+
+    def load_file(self, path):
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                first = f.readline().strip()
+        except OSError:
+            self.say(f" File OPEN error:  {path}")
+            return
+        try:
+            [float(v) for v in first.split()]
+            name = self.next_line().strip()  # plain coordinate file: XFOIL asks for a name
+        except ValueError:
+            name = first
+        self.load_foil(name or os.path.splitext(os.path.basename(path))[0])
+
+    def solve(self, alpha):
+        time.sleep(LATENCY)
+        if self.foil is None:
+            self.say(" ***  No airfoil available  ***")
+            return
+        if self.viscous:
+            # Harder cases (high alpha, few iterations) fail more often
+            difficulty = 1.0 + max(alpha - 10.0, 0.0) / 5.0
+            odds = FAILURE_RATE * difficulty * (80.0 / max(self.iters, 1))
+            if chance("conv", self.foil, self.re_num, round(alpha, 3), self.iters) < odds:
+                self.say(" VISCAL:  Convergence failed")
+                return
+        cl, cd, cdp, cm, top_xtr, bot_xtr = synthetic_point(self.foil, self.re_num if self.viscous else 1e7, alpha)
+        self.say(f" Side 1  free  transition at x/c = {top_xtr:7.4f}   35")
+        self.say(f" Side 2  free  transition at x/c = {bot_xtr:7.4f}  112")
+        self.say(f"       a = {alpha:7.3f}      CL = {cl:8.4f}")
+        self.say(f"      Cm = {cm:8.4f}     CD = {cd:9.5f}   =>   CDf = {cd - cdp:9.5f}    CDp = {cdp:9.5f}")
+        if self.accumulating:
+            self.points.append((alpha, cl, cd, cdp, cm, top_xtr, bot_xtr))
+            self.say(f" Point added to stored polar  {len(self.points)}")
+
+    def write_polar(self):
+        with open(self.polar_file, "w", encoding="utf-8") as f:
+            f.write(f"\n       XFOIL         Version {VERSION}\n\n")
+            f.write(f" Calculated polar for: NACA {self.foil}\n\n")
+            f.write(" 1 1 Reynolds number fixed          Mach number fixed\n\n")
+            f.write(" xtrf =   1.000 (top)        1.000 (bottom)\n")
+            f.write(f" Mach = {self.mach:7.3f}     Re = {self.re_num / 1e6:9.3f} e 6     Ncrit =   9.000\n\n")
+            f.write("   alpha    CL        CD       CDp       CM     Top_Xtr  Bot_Xtr\n")
+            f.write("  ------ -------- --------- --------- -------- -------- --------\n")
+            for row in sorted(self.points):
+                f.write("%8.3f %8.4f %9.5f %9.5f %8.4f %8.4f %8.4f\n" % row)
+
+    def toggle_pacc(self):
+        if not self.accumulating:
+            # A blank save filename accumulates in memory only, as in XFOIL
+            self.polar_file = self.next_line().strip() or None
+            self.next_line()  # polar dump filename
+            self.accumulating = True
+            self.points = []
+            self.say(" Polar accumulation enabled")
+        else:
+            if self.polar_file is not None:
+                self.write_polar()
+            self.polar_file = None
+            self.accumulating = False
+            self.say(" Polar accumulation disabled")
+
+    def oper(self, cmd, args):
+        if cmd == "VISC":
+            self.viscous = not self.viscous
+            if args:
+                self.re_num = float(args[0])
+        elif cmd == "RE" and args:
+            self.re_num = float(args[0])
+        elif cmd == "MACH" and args:
+            self.mach = float(args[0])
+        elif cmd == "ITER" and args:
+            self.iters = int(float(args[0]))
+        elif cmd == "VPAR":
+            self.menu.append("VPAR")
+        elif cmd == "INIT":
+            self.say(" BL initialization set")
+        elif cmd == "PACC":
+            self.toggle_pacc()
+        elif cmd == "ALFA" and args:
+            self.solve(float(args[0]))
+        elif cmd == "ASEQ" and len(args) >= 3:
+            start, end, step = map(float, args[:3])
+            n = int(round((end - start) / step)) if step else 0
+            for i in range(n + 1):
+                self.solve(start + i * step)
+        else:
+            self.say(f" {cmd[:4]} command not recognized.  Type a \"?\" for list")
+
+    def top(self, cmd, args):
+        if cmd == "NACA" and args:
+            self.load_foil(args[0])
+        elif cmd == "LOAD" and args:
+            self.load_file(args[0])
+        elif cmd == "PANE":
+            self.say(" Paneling done")
+        elif cmd == "PPAR":
+            self.menu.append("PPAR")
+        elif cmd == "OPER":
+            self.menu.append("OPER")
+        elif cmd == "QUIT":
+            sys.exit(0)
+        else:
+            self.say(f" {cmd[:4]} command not recognized.  Type a \"?\" for list")
+
+    def run(self):
+        time.sleep(STARTUP)
+        self.say(f"\n       XFOIL         Version {VERSION}\n")
+        while True:
+            parts = self.next_line().split()
+            if not parts:
+                if self.menu:
+                    self.menu.pop()
+                continue
+            cmd, args = parts[0].upper(), parts[1:]
+            level = self.menu[-1] if self.menu else None
+            if level == "OPER":
+                self.oper(cmd, args)
+            elif level in ("VPAR", "PPAR"):
+                pass  # parameters such as N only matter to the real solver
+            else:
+                self.top(cmd, args)
+
+
+if __name__ == "__main__":
+    FakeXfoil(iter(sys.stdin)).run()
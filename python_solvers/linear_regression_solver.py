@@ -1,9 +1,6 @@
 import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-
-os.makedirs('regression_plots', exist_ok=True)
 
 # compact datasets definition
 datasets = {
@@ -66,112 +63,122 @@ def regression_stats(Cl, Cm, angles, aoa_cut=16):
     return sums, mask
 
 
-summary_rows = []
-computation_rows = []
-detail_rows = []
-final_rows = []
-
-for exp_name, data in datasets.items():
-    Cl = data['Cl']
-    Cm = data['Cm']
-    angles = data['angles']
-
-    stats, mask = regression_stats(Cl, Cm, angles)
-    n = stats['n']
-
-    # Plot
-    plt.figure(figsize=(10, 6))
-    plt.scatter(Cl, Cm, color='blue', label='All data points', zorder=5, s=50)
-    if n > 0:
-        plt.scatter(Cl[mask], Cm[mask], color='red', label='Linear region points (α ≤ 16°)', zorder=6, s=60)
-    if not np.isnan(stats['slope']):
-        Cl_line = np.linspace(Cl.min(), Cl.max(), 100)
-        Cm_line = stats['slope'] * Cl_line + stats['intercept']
-        plt.plot(Cl_line, Cm_line, color='red', linestyle='--', linewidth=2,
-                 label=f'Regression line (slope = {stats["slope"]:.4f})')
-
-    plt.xlabel('Lift Coefficient (C$_l$)', fontsize=12)
-    plt.ylabel('Pitching Moment Coefficient (C$_m$)', fontsize=12)
-    plt.title(f'Linear Regression of C$_m$ vs C$_l$\n{exp_name.replace("_", " ")}', fontsize=14)
-
-    annotation_text = (
-        f"Slope (dC$_m$/dC$_l$) = {stats['slope']:.4f}\n"
-        f"Aerodynamic Center (h$_{{ac}}$/c) = {stats['h_ac']:.3f}\n"
-        f"Points used: {n} (α ≤ 16°)"
-    )
-    plt.annotate(annotation_text, xy=(0.05, 0.95), xycoords='axes fraction',
-                 bbox=dict(boxstyle="round,pad=0.3", facecolor="lightyellow", alpha=0.8),
-                 fontsize=10, verticalalignment='top')
-
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(f"regression_plots/{exp_name}_regression.png", dpi=300, bbox_inches='tight')
-    plt.close()
-
-    # collect rows for tables
-    summary_rows.append({
-        'Experiment': exp_name.replace('_', ' '),
-        'Slope (dCm/dCl)': stats['slope'],
-        'Intercept': stats['intercept'],
-        'Aerodynamic Center (h_ac/c)': stats['h_ac'],
-        'Points Used': n,
-        'AoA Range': '−4° to 16°'
-    })
-
-    computation_rows.append({
-        'Experiment': exp_name.replace('_', ' '),
-        'n (Points)': n,
-        '∑Cl': stats.get('sum_Cl', np.nan),
-        '∑Cm': stats.get('sum_Cm', np.nan),
-        '∑(Cl·Cm)': stats.get('sum_Cl_Cm', np.nan),
-        '∑(Cl²)': stats.get('sum_Cl_sq', np.nan)
-    })
-
-    # detailed included/excluded points
-    for idx in np.where(mask)[0]:
-        detail_rows.append({'Experiment': exp_name.replace('_', ' '),
-                            'Angle of Attack (°)': angles[idx],
-                            'Cl (Included)': Cl[idx],
-                            'Cm (Included)': Cm[idx]})
-    for idx in np.where(~mask)[0]:
-        detail_rows.append({'Experiment': exp_name.replace('_', ' '),
-                            'Angle of Attack (°)': angles[idx],
-                            'Cl (Excluded)': Cl[idx],
-                            'Cm (Excluded)': Cm[idx]})
-
-    if not np.isnan(stats['slope']):
-        h_ac = stats['h_ac']
-        final_rows.append({
+def main():
+    # Imported here so that other scripts can import the datasets without a plotting backend
+    import matplotlib.pyplot as plt
+
+    os.makedirs('regression_plots', exist_ok=True)
+
+    summary_rows = []
+    computation_rows = []
+    detail_rows = []
+    final_rows = []
+
+    for exp_name, data in datasets.items():
+        Cl = data['Cl']
+        Cm = data['Cm']
+        angles = data['angles']
+
+        stats, mask = regression_stats(Cl, Cm, angles)
+        n = stats['n']
+
+        # Plot
+        plt.figure(figsize=(10, 6))
+        plt.scatter(Cl, Cm, color='blue', label='All data points', zorder=5, s=50)
+        if n > 0:
+            plt.scatter(Cl[mask], Cm[mask], color='red', label='Linear region points (α ≤ 16°)', zorder=6, s=60)
+        if not np.isnan(stats['slope']):
+            Cl_line = np.linspace(Cl.min(), Cl.max(), 100)
+            Cm_line = stats['slope'] * Cl_line + stats['intercept']
+            plt.plot(Cl_line, Cm_line, color='red', linestyle='--', linewidth=2,
+                     label=f'Regression line (slope = {stats["slope"]:.4f})')
+
+        plt.xlabel('Lift Coefficient (C$_l$)', fontsize=12)
+        plt.ylabel('Pitching Moment Coefficient (C$_m$)', fontsize=12)
+        plt.title(f'Linear Regression of C$_m$ vs C$_l$\n{exp_name.replace("_", " ")}', fontsize=14)
+
+        annotation_text = (
+            f"Slope (dC$_m$/dC$_l$) = {stats['slope']:.4f}\n"
+            f"Aerodynamic Center (h$_{{ac}}$/c) = {stats['h_ac']:.3f}\n"
+            f"Points used: {n} (α ≤ 16°)"
+        )
+        plt.annotate(annotation_text, xy=(0.05, 0.95), xycoords='axes fraction',
+                     bbox=dict(boxstyle="round,pad=0.3", facecolor="lightyellow", alpha=0.8),
+                     fontsize=10, verticalalignment='top')
+
+        plt.legend()
+        plt.grid(True, alpha=0.3)
+        plt.tight_layout()
+        plt.savefig(f"regression_plots/{exp_name}_regression.png", dpi=300, bbox_inches='tight')
+        plt.close()
+
+        # collect rows for tables
+        summary_rows.append({
             'Experiment': exp_name.replace('_', ' '),
-            'dCm/dCl (Slope)': stats['slope'],
-            'Cm0 (Intercept)': stats['intercept'],
-            'h_ac/c': h_ac,
-            'Distance from 0.25c': abs(h_ac - 0.25)
+            'Slope (dCm/dCl)': stats['slope'],
+            'Intercept': stats['intercept'],
+            'Aerodynamic Center (h_ac/c)': stats['h_ac'],
+            'Points Used': n,
+            'AoA Range': '−4° to 16°'
         })
 
+        computation_rows.append({
+            'Experiment': exp_name.replace('_', ' '),
+            'n (Points)': n,
+            '∑Cl': stats.get('sum_Cl', np.nan),
+            '∑Cm': stats.get('sum_Cm', np.nan),
+            '∑(Cl·Cm)': stats.get('sum_Cl_Cm', np.nan),
+            '∑(Cl²)': stats.get('sum_Cl_sq', np.nan)
+        })
 
-print('\nAll plots have been saved to the "regression_plots" folder.\n')
-
-print('\n' + '='*100)
-print('REGRESSION RESULTS SUMMARY')
-print('='*100)
-print(pd.DataFrame(summary_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
-
-print('\n' + '='*100)
-print('DETAILED DATA POINTS (Included then Excluded)')
-print('='*100)
-if detail_rows:
-    print(pd.DataFrame(detail_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
-else:
-    print('No detail rows to show.')
-
-print('\n' + '='*100)
-print('COMPUTATION TABLE: Sums for Linear Regression Calculations')
-print('='*100)
-print(pd.DataFrame(computation_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
-
-print('\n' + '='*100)
-print('KEY AERODYNAMIC PARAMETERS')
-print('='*100)
-print(pd.DataFrame(final_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
+        # detailed included/excluded points
+        for idx in np.where(mask)[0]:
+            detail_rows.append({'Experiment': exp_name.replace('_', ' '),
+                                'Angle of Attack (°)': angles[idx],
+                                'Cl (Included)': Cl[idx],
+                                'Cm (Included)': Cm[idx]})
+        for idx in np.where(~mask)[0]:
+            detail_rows.append({'Experiment': exp_name.replace('_', ' '),
+                                'Angle of Attack (°)': angles[idx],
+                                'Cl (Excluded)': Cl[idx],
+                                'Cm (Excluded)': Cm[idx]})
+
+        if not np.isnan(stats['slope']):
+            h_ac = stats['h_ac']
+            final_rows.append({
+                'Experiment': exp_name.replace('_', ' '),
+                'dCm/dCl (Slope)': stats['slope'],
+                'Cm0 (Intercept)': stats['intercept'],
+                'h_ac/c': h_ac,
+                'Distance from 0.25c': abs(h_ac - 0.25)
+            })
+
+
+    print('\nAll plots have been saved to the "regression_plots" folder.\n')
+
+    print('\n' + '='*100)
+    print('REGRESSION RESULTS SUMMARY')
+    print('='*100)
+    print(pd.DataFrame(summary_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
+
+    print('\n' + '='*100)
+    print('DETAILED DATA POINTS (Included then Excluded)')
+    print('='*100)
+    if detail_rows:
+        print(pd.DataFrame(detail_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
+    else:
+        print('No detail rows to show.')
+
+    print('\n' + '='*100)
+    print('COMPUTATION TABLE: Sums for Linear Regression Calculations')
+    print('='*100)
+    print(pd.DataFrame(computation_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
+
+    print('\n' + '='*100)
+    print('KEY AERODYNAMIC PARAMETERS')
+    print('='*100)
+    print(pd.DataFrame(final_rows).to_string(index=False, float_format=lambda x: f'{x:.6f}'))
+
+
+if __name__ == "__main__":
+    main()
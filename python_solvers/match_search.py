@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Branch-and-bound top-k airfoil matching
+Finds the k candidates with the lowest weighted RMSE score without evaluating every candidate
+at every experimental angle
+
+The score of a candidate is sum(weights[c] * RMSE of coefficient c) over the experimental
+angles. Summing the squared errors of only some of the angles gives a lower bound on it,
+so angles are visited one at a time - those where candidates are typically furthest from
+the experiment first - and a candidate is dropped as soon as its bound exceeds the k-th best
+exact score known so far. That bound starts from a random probe of candidates and tightens
+after every angle by scoring the most promising survivors in full. Results are exact.
+"""
+
+import numpy as np
+
+from polar_interp import interpolate, interpolate_linear_at
+
+PROBE_SIZE = 1024  # random candidates scored in full for the visiting order and the first bound
+BOUND_SLACK = 1e-9  # relative; keeps candidates whose bound only ties the k-th score within rounding
+
+
+def _combine(mean_sq, weights):
+    """Weighted sum of per-coefficient RMSEs from mean squared errors (rows x coefficients)."""
+    score = 0.0
+    for c, weight in enumerate(weights):
+        score = score + weight * np.sqrt(mean_sq[:, c])
+    return score
+
+
+def _kth(scores, k):
+    finite = np.sort(scores[np.isfinite(scores)])
+    return finite[k - 1] if len(finite) >= k else np.inf
+
+
+def bounded_top_k(alpha_grid, values, alphas, target, k=10, weights=(0.6, 0.4), method="linear",
+                  extrapolate="linear", seed=0, survivors=None):
+    """Return (indices, scores) of the k candidates with the lowest score, best first (ties by index).
+
+    values is (n_candidates, n_grid, n_coefficients) on alpha_grid, target (n_alphas,
+    n_coefficients) at alphas; candidate values at alphas are interpolated as
+    polar_interp.interpolate(method, extrapolate). A zero weight leaves that coefficient out
+    entirely. Candidates that cannot be evaluated at every angle are never returned. Scores
+    are bitwise those of scoring every candidate in full. If survivors is a list, the number
+    of candidates still in play after each visited angle is appended to it.
+    """
+    alpha_grid = np.asarray(alpha_grid, dtype=float)
+    alphas = np.asarray(alphas, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    coefs = np.flatnonzero(weights)
+    if not len(coefs):
+        raise ValueError("at least one weight must be positive")
+    weights, target = weights[coefs], np.asarray(target, dtype=float)[:, coefs]
+    n, n_points = len(values), len(alphas)
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    def full_scores(rows):
+        aligned = interpolate(alpha_grid, values[rows][:, :, coefs], alphas, method, extrapolate, axis=1)
+        return _combine(np.mean((aligned - target) ** 2, axis=1), weights)
+
+    # Probe: a random sample scored in full, for the first bound and the visiting order
+    rng = np.random.default_rng(seed)
+    probe = np.sort(rng.choice(n, min(n, PROBE_SIZE), replace=False))
+    probe_sq = (interpolate(alpha_grid, values[probe][:, :, coefs], alphas, method, extrapolate, axis=1) - target) ** 2
+    known_rows, known_scores = probe, _combine(probe_sq.mean(axis=1), weights)
+    order = np.argsort(-np.nan_to_num(probe_sq @ weights, nan=0.0).mean(axis=0), kind='stable')
+    threshold = _kth(known_scores, k)
+
+    active = np.arange(n)
+    partial = np.zeros((n, len(coefs)))
+    for step, j in enumerate(order):
+        if method == "linear":
+            point = interpolate_linear_at(alpha_grid, values, alphas[j], active, extrapolate)[:, coefs]
+        else:
+            point = interpolate(alpha_grid, values[active][:, :, coefs], alphas[j:j + 1], method, extrapolate,
+                                axis=1)[:, 0]
+        partial += (point - target[j]) ** 2
+        bound = _combine(partial / n_points, weights)
+        if step < n_points - 1:
+            # Tighten the bound with the exact scores of the most promising candidates
+            best = np.setdiff1d(active[np.argpartition(np.nan_to_num(bound, nan=np.inf), min(k, len(bound)) - 1)[:k]],
+                                known_rows)
+            if len(best):
+                known_rows = np.concatenate([known_rows, best])
+                known_scores = np.concatenate([known_scores, full_scores(best)])
+                threshold = _kth(known_scores, k)
+        keep = bound <= threshold * (1 + BOUND_SLACK)  # NaN (not evaluable) drops out too
+        active, partial = active[keep], partial[keep]
+        if survivors is not None:
+            survivors.append(len(active))
+        if len(active) <= k:
+            break
+
+    rows = np.union1d(active, known_rows)
+    scores = full_scores(rows)
+    finite = np.isfinite(scores)
+    rows, scores = rows[finite], scores[finite]
+    best = np.lexsort((rows, scores))[:k]
+    return rows[best], scores[best]
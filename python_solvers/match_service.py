@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Resident airfoil matching service
+Loads the polar database once and answers match queries over local HTTP (TCP or a Unix
+socket) with JSON, reloading in the background whenever the database is rewritten
+
+Usage:
+    python match_service.py [--host 127.0.0.1] [--port 8642] [--socket PATH] [--db DIR]
+
+Endpoints:
+    POST /match    {"alpha": [...], "cl": [...], "cm": [...],
+                    "weights": [0.6, 0.4], "re": 121000, "mach": null, "top": 10}
+                   -> {"condition": {...}, "matches": [{"airfoil", "score", "rmse_cl", "rmse_cm"}, ...],
+                       "elapsed_ms": ...}
+    GET  /health   -> database size and load time
+    GET  /metrics  -> request counts and latency percentiles
+weights, re, mach and top are optional (defaults: NACA_matching's weights and Re, top 10).
+The stored condition with the closest Re is used; mach only chooses between conditions
+stored at that Re (PolarDatabase.condition_index).
+"""
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from polar_database import PolarDatabase, database_stamp
+from polar_index import SignatureIndex
+from polar_interp import interpolate
+from match_search import bounded_top_k
+from NACA_matching import (EXPERIMENTAL_DATA, EXPERIMENTAL_RE, COMBINED_WEIGHTS, INTERP_METHOD,
+                           INTERP_EXTRAPOLATE, POLAR_DB_DIR)
+
+DEFAULT_PORT = 8642
+RELOAD_INTERVAL = 2.0   # seconds between checks for a rewritten database
+LATENCY_WINDOW = 1000   # recent requests the latency percentiles are taken over
+MAX_TOP = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class _Snapshot:
+    """One loaded version of the database; replaced as a whole on reload, so requests never see a mix."""
+
+    def __init__(self, db_dir, use_index):
+        self.stamp = database_stamp(db_dir)
+        self.db = PolarDatabase(db_dir)
+        self.loaded_at = time.time()
+        # Queries at the matcher's angles go through the signature index; others search the whole
+        # condition by branch and bound
+        self.index = SignatureIndex.open(db_dir, EXPERIMENTAL_DATA['Alpha'], ('CL', 'CM'), INTERP_METHOD,
+                                         INTERP_EXTRAPOLATE) if use_index else None
+        self.slices = {}
+        self.lock = threading.Lock()
+
+    def condition_values(self, condition):
+        """CL/CM of every foil at one condition as float64, read from disk once per snapshot."""
+        with self.lock:
+            if condition not in self.slices:
+                self.slices[condition] = np.asarray(self.db.condition_slice(condition, ('CL', 'CM')), dtype=np.float64)
+            return self.slices[condition]
+
+
+class MatchEngine:
+    """Answers match queries against the current snapshot of the polar database."""
+
+    def __init__(self, db_dir=POLAR_DB_DIR, use_index=True):
+        self.db_dir = Path(db_dir)
+        self.use_index = use_index
+        self.snapshot = _Snapshot(self.db_dir, use_index)
+        self.reloads = 0
+        self.stop = threading.Event()
+
+    def watch(self):
+        """Reload in a background thread whenever the database files change."""
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        while not self.stop.wait(RELOAD_INTERVAL):
+            try:
+                if database_stamp(self.db_dir) == self.snapshot.stamp:
+                    continue
+                self.snapshot = _Snapshot(self.db_dir, self.use_index)
+                self.reloads += 1
+                print(f"Reloaded {self.db_dir} ({len(self.snapshot.db.foils)} foils)", flush=True)
+            except (OSError, ValueError) as e:
+                # The database is swapped in with a rename; retry on the next check
+                print(f"Reload of {self.db_dir} deferred: {e}", flush=True)
+
+    def match(self, query):
+        """Top matches for one parsed query (see the module docstring)."""
+        alphas, target, weights, re_num, mach, top = _parse_query(query)
+        snap = self.snapshot
+        db = snap.db
+        condition = db.condition_index(re_num, mach)
+        if snap.index is not None and np.array_equal(snap.index.alphas, alphas):
+            rows, _, _ = snap.index.query(target, top, weights, condition)
+            rows = np.sort(rows)  # database order, so ties rank as in a full scan
+            values = np.asarray(db.condition_slice(condition, ('CL', 'CM'), foils=rows), dtype=np.float64)
+        else:
+            values = snap.condition_values(condition)
+            rows, _ = bounded_top_k(db.alphas, values, alphas, target, top, weights, INTERP_METHOD, INTERP_EXTRAPOLATE)
+            rows = np.sort(rows)
+            values = values[rows]
+        aligned = interpolate(db.alphas, values, alphas, INTERP_METHOD, INTERP_EXTRAPOLATE, axis=1)
+        rmse = np.sqrt(np.mean((aligned - target) ** 2, axis=1))
+        scores = rmse @ weights
+        order = np.argsort(scores, kind='stable')
+        order = order[~np.isnan(scores[order])][:top]
+        return {
+            'condition': {'re': db.conditions[condition][0], 'mach': db.conditions[condition][1]},
+            'matches': [{'airfoil': db.foils[rows[i]], 'score': float(scores[i]),
+                         'rmse_cl': float(rmse[i, 0]), 'rmse_cm': float(rmse[i, 1])} for i in order],
+        }
+
+    def health(self):
+        snap = self.snapshot
+        return {'database': str(self.db_dir), 'foils': len(snap.db.foils),
+                'conditions': [list(c) for c in snap.db.conditions], 'loaded_at': snap.loaded_at,
+                'reloads': self.reloads, 'indexed': snap.index is not None}
+
+
+def _parse_query(query):
+    """Validate a /match body; returns (alphas, target[n, 2], weights, re, mach, top)."""
+    if not isinstance(query, dict):
+        raise BadRequest("body must be a JSON object")
+    try:
+        alphas = np.asarray(query['alpha'], dtype=float)
+        target = np.stack([np.asarray(query['cl'], dtype=float), np.asarray(query['cm'], dtype=float)], axis=-1)
+        weights = np.asarray(query.get('weights', COMBINED_WEIGHTS), dtype=float)
+        re_num = float(query.get('re', EXPERIMENTAL_RE))
+        mach = None if query.get('mach') is None else float(query['mach'])
+        top = int(query.get('top', 10))
+    except KeyError as e:
+        raise BadRequest(f"missing field {e}")
+    except (TypeError, ValueError) as e:
+        raise BadRequest(f"bad field: {e}")
+    if alphas.ndim != 1 or target.shape != (len(alphas), 2) or not len(alphas):
+        raise BadRequest("alpha, cl and cm must be equally long, non-empty lists")
+    if weights.shape != (2,) or np.any(weights < 0) or not weights.any():
+        raise BadRequest("weights must be two non-negative numbers (CL, CM), not both zero")
+    if re_num <= 0 or not 1 <= top <= MAX_TOP:
+        raise BadRequest(f"re must be positive and top between 1 and {MAX_TOP}")
+    return alphas, target, weights, re_num, mach, top
+
+
+class Metrics:
+    """Request counts and a window of recent latencies, shared by all handler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, elapsed_ms, ok):
+        with self.lock:
+            self.requests += 1
+            self.errors += not ok
+            if ok:
+                self.latencies.append(elapsed_ms)
+
+    def summary(self):
+        with self.lock:
+            latencies = np.array(self.latencies)
+            out = {'requests': self.requests, 'errors': self.errors}
+        if len(latencies):
+            out['latency_ms'] = {f"p{q}": float(np.percentile(latencies, q)) for q in (50, 95, 99)}
+            out['latency_ms']['max'] = float(latencies.max())
+        return out
+
+
+class MatchHandler(BaseHTTPRequestHandler):
+    engine = None
+    metrics = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.engine.health())
+        elif self.path == "/metrics":
+            self._reply(200, self.metrics.summary())
+        else:
+            self._reply(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/match":
+            self._reply(404, {'error': f"unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            result = self.engine.match(json.loads(self.rfile.read(length) or b"null"))
+        except (BadRequest, json.JSONDecodeError) as e:
+            self.metrics.record(0.0, False)
+            self._reply(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self.metrics.record(0.0, False)
+            self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1e3
+        self.metrics.record(result['elapsed_ms'], True)
+        self._reply(200, result)
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        pass  # latency is reported by /metrics rather than logged per request
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def serve(engine, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    """Serve engine until interrupted; on a Unix socket if socket_path is given, else on host:port."""
+    handler = type("Handler", (MatchHandler,), {'engine': engine, 'metrics': Metrics()})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        where = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        where = f"http://{host}:{server.server_address[1]}"
+    engine.watch()
+    print(f"Matching service on {where} ({len(engine.snapshot.db.foils)} foils from {engine.db_dir})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop.set()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def stop_handler(signum, frame):
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve airfoil match queries from the polar database.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--db", type=Path, default=POLAR_DB_DIR, help="polar database directory")
+    parser.add_argument("--no-index", action="store_true", help="always scan every polar instead of the signature index")
+    args = parser.parse_args()
+    if not PolarDatabase.exists(args.db):
+        raise SystemExit(f"No polar database at {args.db}; run the data gathering script first.")
+    # SIGTERM (service managers) shuts down as cleanly as Ctrl-C, removing the socket file
+    signal.signal(signal.SIGINT, stop_handler)
+    signal.signal(signal.SIGTERM, stop_handler)
+    serve(MatchEngine(args.db, not args.no_index), args.host, args.port, args.socket)
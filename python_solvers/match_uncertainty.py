@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Bootstrap and jackknife uncertainty of airfoil match rankings
+Resamples the experimental points (optionally adding measurement noise), re-scores every
+candidate for each resample and reports how stable the ranking of the best matches is
+
+Each resample is a weight per experimental point (bootstrap multiplicities, or leave-one-out
+for the jackknife), so a whole batch of resamples is scored against every candidate with a few
+matrix products; batches are spread over a process pool.
+"""
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+SCORE_BLOCK = 8_000_000  # candidate x resample scores held per batch (bounds worker memory)
+
+# Set in each worker by _init_worker (inherited without copying where processes fork)
+_ALIGNED = None
+_TRACKED = None
+_WEIGHTS = None
+
+
+def resample_weights(n_points, n_resamples, rng, method="bootstrap"):
+    """(n_resamples, n_points) point weights: bootstrap multiplicities, or one leave-one-out row per point."""
+    if method == "jackknife":
+        return 1.0 - np.eye(n_points)
+    if method != "bootstrap":
+        raise ValueError(f"method must be 'bootstrap' or 'jackknife', not {method!r}")
+    return rng.multinomial(n_points, np.full(n_points, 1.0 / n_points), size=n_resamples).astype(float)
+
+
+def batch_scores(aligned, targets, point_weights, weights):
+    """Combined scores[n_resamples, n_candidates] of every candidate under every resample.
+
+    aligned is (n_candidates, n_points, n_coefficients) at the experimental angles, targets
+    (n_resamples, n_points, n_coefficients) the (perturbed) experiment of each resample and
+    point_weights (n_resamples, n_points). The weighted squared error is expanded as
+    sum(w a^2) - 2 sum(w a e) + sum(w e^2), so each coefficient takes one matrix product.
+    """
+    total = point_weights.sum(axis=1, keepdims=True)
+    scores = np.zeros((len(point_weights), aligned.shape[0]))
+    for c, weight in enumerate(weights):
+        if weight == 0:
+            continue
+        a, e = aligned[:, :, c], targets[:, :, c]
+        sse = np.hstack([point_weights, -2 * point_weights * e]) @ np.hstack([a * a, a]).T
+        sse += (point_weights * e * e).sum(axis=1, keepdims=True)
+        np.maximum(sse, 0.0, out=sse)
+        sse /= total
+        np.sqrt(sse, out=sse)
+        sse *= weight
+        scores += sse
+    return scores
+
+
+def _init_worker(aligned, tracked, weights):
+    global _ALIGNED, _TRACKED, _WEIGHTS
+    _ALIGNED, _TRACKED, _WEIGHTS = aligned, tracked, weights
+
+
+def _score_batch(batch):
+    """Winner, tracked scores and tracked ranks for one batch of resamples."""
+    point_weights, targets = batch
+    scores = batch_scores(_ALIGNED, targets, point_weights, _WEIGHTS)
+    scores[np.isnan(scores)] = np.inf
+    tracked = scores[:, _TRACKED]                                     # (n_batch, n_tracked)
+    # Rank = 1 + number of candidates strictly better; ties share a rank. Only candidates
+    # beating the worst tracked score of some resample can count
+    rivals = scores[:, (scores < tracked.max(axis=1, keepdims=True)).any(axis=0)]
+    ranks = 1 + (rivals[:, :, None] < tracked[:, None, :]).sum(axis=1)
+    return scores.argmin(axis=1), tracked, ranks
+
+
+def ranking_uncertainty(aligned, target, airfoils, weights=(0.6, 0.4), n_resamples=1000, method="bootstrap",
+                        noise=(0.0, 0.0), track=10, workers=None, seed=0):
+    """Rank stability of the best `track` candidates under resampling of the experimental points.
+
+    aligned is (n_candidates, n_points, n_coefficients) candidate values at the experimental
+    angles and target (n_points, n_coefficients) the experiment; a candidate's score is
+    sum(weights[c] * RMSE of coefficient c). noise adds Gaussian measurement noise with that
+    standard deviation per coefficient to every resample. The jackknife always runs one
+    resample per point. Returns a DataFrame, best point estimate first, with the score and
+    its 95 % interval, the share of resamples the candidate ranks first and in the top
+    `track`, and its median rank and 95 % rank interval.
+    """
+    aligned = np.asarray(aligned, dtype=float)
+    target = np.asarray(target, dtype=float)
+    rng = np.random.default_rng(seed)
+    n_points = target.shape[0]
+    point_weights = resample_weights(n_points, n_resamples, rng, method)
+    n_resamples = len(point_weights)
+    targets = np.broadcast_to(target, (n_resamples,) + target.shape) \
+        + rng.normal(size=(n_resamples,) + target.shape) * np.asarray(noise, dtype=float)
+
+    estimate = batch_scores(aligned, target[None], np.ones((1, n_points)), weights)[0]
+    estimate = np.where(np.isnan(estimate), np.inf, estimate)
+    tracked = np.argsort(estimate, kind='stable')[:track]
+    tracked = tracked[np.isfinite(estimate[tracked])]
+
+    size = max(1, min(n_resamples, SCORE_BLOCK // max(1, len(aligned))))
+    batches = [(point_weights[i:i + size], targets[i:i + size]) for i in range(0, n_resamples, size)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(batches) > 1:
+        with Pool(min(workers, len(batches)), initializer=_init_worker, initargs=(aligned, tracked, weights)) as pool:
+            results = pool.map(_score_batch, batches)
+    else:
+        _init_worker(aligned, tracked, weights)
+        results = [_score_batch(batch) for batch in batches]
+    winners = np.concatenate([r[0] for r in results])
+    scores = np.concatenate([r[1] for r in results]).T
+    ranks = np.concatenate([r[2] for r in results]).T
+
+    names = np.asarray(airfoils, dtype=object)
+    return pd.DataFrame({
+        'Airfoil': names[tracked],
+        'score': estimate[tracked],
+        'score_lo': np.percentile(scores, 2.5, axis=1),
+        'score_hi': np.percentile(scores, 97.5, axis=1),
+        'p_best': (winners[None, :] == tracked[:, None]).mean(axis=1),
+        'p_top': (ranks <= track).mean(axis=1),
+        'rank_median': np.median(ranks, axis=1),
+        'rank_lo': np.percentile(ranks, 2.5, axis=1, method='lower'),
+        'rank_hi': np.percentile(ranks, 97.5, axis=1, method='higher'),
+    })
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Surrogate-model inverse identification of continuous NACA 4-digit parameters
+Fits a thin-plate spline surrogate (scipy's RBFInterpolator, local to the nearest training
+polars) of (camber, camber position, thickness, Re) -> CL/CM at the experimental angles on the
+polars already in the database, searches continuous parameters for the lowest combined RMSE on
+it by differential evolution, and runs XFOIL only to verify the best few
+
+Experimental data, weights and interpolation settings are those of NACA_matching.py;
+verification runs use NACA_data_extractor.py's settings and cache.
+
+Usage:
+    python naca_inverse.py
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import differential_evolution
+
+from design_space import naca4_code, naca4_params
+from polar_database import PolarDatabase, merge_into_database
+from polar_index import compute_signatures
+from NACA_matching import (EXPERIMENTAL_DATA, EXPERIMENTAL_RE, COMBINED_WEIGHTS, INTERP_METHOD,
+                           INTERP_EXTRAPOLATE, POLAR_DB_DIR, calculate_rmse)
+
+SEARCH_SEEDS = 3             # best grid matches a search is started around
+SURROGATE_NEIGHBOURS = 200   # training polars nearest each evaluated point the surrogate is fitted on
+SURROGATE_SMOOTHING = 1e-6   # smoothing of the RBF fit; > 0 tolerates duplicate or noisy points
+SEARCH_POPULATION = 30       # differential evolution population, per parameter
+SEARCH_MAXITER = 100         # differential evolution generations per seed
+CODE_STEP = 0.1              # parameter resolution of candidate foils (coordinates are generated for them)
+VERIFY_TOP = 3               # candidates run through XFOIL
+ADD_VERIFIED_TO_DATABASE = True  # store verified polars, so later surrogates and matches use them
+
+
+class RbfSurrogate:
+    """Thin-plate spline interpolant with a linear tail (scipy's RBFInterpolator), for vector-valued outputs.
+
+    Inputs are scaled to the unit box of the training points, so parameters with
+    different units (%, tenths, log Re) weigh alike. Each evaluation uses only the
+    SURROGATE_NEIGHBOURS training points nearest it.
+    """
+
+    def __init__(self, x, y, smoothing=SURROGATE_SMOOTHING, neighbours=SURROGATE_NEIGHBOURS):
+        x = np.asarray(x, dtype=float)
+        self.lo = x.min(axis=0)
+        span = x.max(axis=0) - self.lo
+        self.span = np.where(span > 0, span, 1.0)
+        self.interpolator = RBFInterpolator(self._scale(x), np.asarray(y, dtype=float), kernel='thin_plate_spline',
+                                            smoothing=smoothing, neighbors=min(neighbours, len(x)))
+
+    def _scale(self, x):
+        return (np.asarray(x, dtype=float) - self.lo) / self.span
+
+    def __call__(self, x):
+        return self.interpolator(self._scale(x))
+
+
+def combined_score(signatures, target, weights=COMBINED_WEIGHTS):
+    """Weighted sum of per-coefficient RMSEs of signatures[n, n_alphas, n_coefficients] against target."""
+    rmse = np.sqrt(np.mean((signatures - target) ** 2, axis=1))
+    return rmse @ np.asarray(weights, dtype=float)
+
+
+def training_set(db, alphas):
+    """Return (params[n, 4] = camber, position, thickness, log10 Re; signatures; foil indices; condition indices).
+
+    Every 4-digit polar in the database that can be evaluated at all alphas is used.
+    """
+    signatures, foils, conditions = compute_signatures(db, alphas, ('CL', 'CM'), INTERP_METHOD, INTERP_EXTRAPOLATE)
+    section = [naca4_params(db.foils[f]) for f in foils]
+    keep = np.array([p is not None for p in section], dtype=bool)
+    log_re = np.log10([db.conditions[c][0] for c in conditions[keep]])
+    params = np.column_stack([np.array([p for p in section if p is not None]).reshape(-1, 3), log_re])
+    return params, signatures[keep], foils[keep], conditions[keep]
+
+
+def surrogate_search(surrogate, target, lo, hi, log_re, seed=0):
+    """Differential evolution of (camber, position, thickness) within [lo, hi] at log_re on the surrogate.
+
+    Whole populations are scored in one surrogate call, and the best member is polished
+    with scipy.optimize.minimize (L-BFGS-B). Returns every evaluated point and its
+    predicted score, best first.
+    """
+    points, scores = [], []
+
+    def objective(x):
+        x = np.asarray(x, dtype=float).reshape(3, -1).T
+        s = combined_score(surrogate(np.column_stack([x, np.full(len(x), log_re)])), target)
+        points.append(x)
+        scores.append(s)
+        return s
+
+    bounds = list(zip(lo, np.maximum(hi, lo + 1e-9)))
+    differential_evolution(objective, bounds, popsize=SEARCH_POPULATION, maxiter=SEARCH_MAXITER, seed=seed,
+                           vectorized=True, updating='deferred', polish=True)
+    points, scores = np.concatenate(points), np.concatenate(scores)
+    order = np.argsort(scores, kind='stable')
+    return points[order], scores[order]
+
+
+def candidate_codes(points, n):
+    """The first n distinct foil codes of points rounded to CODE_STEP, with their rounded parameters."""
+    codes, params = [], []
+    for m, p, t in np.round(points / CODE_STEP) * CODE_STEP:
+        m, p, t = round(m, 6), round(p, 6), round(t, 6)
+        if m == 0 or p == 0:
+            m, p = 0.0, 0.0  # symmetric section; the position is meaningless
+        code = naca4_code(m, p, t)
+        if code not in codes:
+            codes.append(code)
+            params.append((m, p, t))
+            if len(codes) == n:
+                break
+    return codes, np.array(params)
+
+
+def verify(codes, re_num, mach):
+    """Run XFOIL on codes at one condition through the extractor; returns {code: polar dict} of successes."""
+    import NACA_data_extractor as extractor
+    from polar_cache import PolarCache
+
+    if extractor.XF_PATH is None:
+        print("XFOIL executable not found (set XFOIL_EXECUTABLE); skipping verification")
+        return {}
+    cache = PolarCache(extractor.CACHE_DIR, extractor.CACHE_MAX_BYTES) if extractor.USE_CACHE else None
+    tasks = [(code, re_num, mach) for code in codes]
+    polars = {}
+    for foil, _, _, data, report in extractor.iter_results(tasks, num_workers=min(len(tasks), extractor.NUM_WORKERS),
+                                                           cache=cache):
+        if data is None:
+            print(f"  {foil}: XFOIL failed ({report.get('reason')})")
+        else:
+            polars[foil] = data
+    return polars
+
+
+def main():
+    if not PolarDatabase.exists(POLAR_DB_DIR):
+        print(f"Error: no polar database at {POLAR_DB_DIR}; run the data gathering script first!")
+        sys.exit(1)
+    db = PolarDatabase(POLAR_DB_DIR)
+    alphas = np.asarray(EXPERIMENTAL_DATA['Alpha'], dtype=float)
+    target = np.stack([EXPERIMENTAL_DATA['CL'], EXPERIMENTAL_DATA['CM']], axis=-1)
+    params, signatures, foils, conditions = training_set(db, alphas)
+    if len(params) < 10:
+        print("Error: too few 4-digit polars in the database to fit a surrogate")
+        sys.exit(1)
+
+    condition = db.condition_index(EXPERIMENTAL_RE)
+    re_num, mach = db.conditions[condition]
+    # Search at the stored condition the candidates are verified at
+    log_re = np.log10(re_num)
+    print(f"Surrogate identification at Re {re_num:g} (experiment Re ~{EXPERIMENTAL_RE}) "
+          f"from {len(params)} 4-digit polars in {POLAR_DB_DIR}")
+
+    # Seeds: the best distinct grid foils at the condition nearest the experiment
+    at_condition = np.flatnonzero(conditions == condition)
+    grid_scores = combined_score(signatures[at_condition], target)
+    ranked = at_condition[np.argsort(grid_scores, kind='stable')]
+    print(f"Best grid match: {db.foils[foils[ranked[0]]]} (combined RMSE {grid_scores.min():.6f})")
+
+    # One search per seed, over the box of the training polars nearest it
+    surrogate = RbfSurrogate(params, signatures)
+    span = np.ptp(params, axis=0)
+    scale = np.where(span > 0, span, 1.0)
+    seeds = ranked[:SEARCH_SEEDS]
+    points, predicted = [], []
+    for i, seed in enumerate(seeds):
+        near = np.argsort((((params - params[seed]) / scale) ** 2).sum(axis=1))[:SURROGATE_NEIGHBOURS]
+        lo, hi = params[near, :3].min(axis=0), params[near, :3].max(axis=0)
+        x, s = surrogate_search(surrogate, target, lo, hi, log_re, seed=i)
+        points.append(x)
+        predicted.append(s)
+    evaluations = sum(len(x) for x in points)
+    points = np.concatenate(points)[np.argsort(np.concatenate(predicted), kind='stable')]
+    codes, code_params = candidate_codes(points, VERIFY_TOP)
+
+    # Predict at the rounded parameters actually run
+    prediction = combined_score(surrogate(np.column_stack([code_params, np.full(len(code_params), log_re)])), target)
+    print(f"Surrogate search: {len(seeds)} seeds, {evaluations} evaluations; "
+          f"verifying {', '.join(codes)} with XFOIL at Re {re_num:g}")
+
+    polars = verify(codes, re_num, mach)
+    rows = []
+    for code, predicted_rmse in zip(codes, prediction):
+        data = polars.get(code)
+        scores = {'combined_rmse': [np.nan], 'rmse_cl': [np.nan], 'rmse_cm': [np.nan]}
+        if data is not None:
+            polar_alphas = np.array(sorted(data))
+            values = np.array([[[data[a]['CL'], data[a]['CM']] for a in polar_alphas]])
+            scores = calculate_rmse(EXPERIMENTAL_DATA, polar_alphas, values)
+        rows.append({'Airfoil': code, 'predicted_rmse': predicted_rmse, 'combined_rmse': scores['combined_rmse'][0],
+                     'rmse_cl': scores['rmse_cl'][0], 'rmse_cm': scores['rmse_cm'][0]})
+    print("\n")
+    print("SURROGATE CANDIDATES - PREDICTED vs XFOIL COMBINED RMSE")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+    if polars and ADD_VERIFIED_TO_DATABASE:
+        merge_into_database(POLAR_DB_DIR, [(code, re_num, mach, data) for code, data in polars.items()])
+        print(f"\nAdded {len(polars)} verified polars to {POLAR_DB_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for XFOIL polar files
+Entries are keyed on the full XFOIL input so re-runs only pay for new foils
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def cache_key(foil_code, re, mach, ncrit, iters, alpha_sweep, xfoil_version, geometry=""):
+    """Return a stable hex key describing one complete XFOIL run.
+
+    geometry identifies coordinate-file contents for foils XFOIL does not generate itself.
+    """
+    payload = {
+        'foil': str(foil_code),
+        're': float(re),
+        'mach': float(mach),
+        'ncrit': float(ncrit),
+        'iter': int(iters),
+        'alphas': [round(float(a), 6) for a in alpha_sweep],
+        'xfoil': str(xfoil_version),
+    }
+    if geometry:
+        payload['geometry'] = str(geometry)
+    blob = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class PolarCache:
+    """On-disk polar cache with hit/miss accounting and size-based LRU eviction.
+
+    Each entry is a single file named after its key, written atomically so pool
+    workers can store results concurrently. Recency is tracked through the file
+    modification time, so no shared index has to be locked.
+    """
+
+    SUFFIX = '.polar'
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}{self.SUFFIX}"
+
+    def get(self, key):
+        """Return the cached polar text for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding='utf-8', errors='ignore')
+        except OSError:
+            self.misses += 1
+            return None
+        if not text.strip():
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # refresh recency for LRU eviction
+        except OSError:
+            pass
+        self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """Store polar text under key (atomic replace)."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, path)
+
+    def entries(self):
+        """Return a list of (mtime, size, path) for every cache entry."""
+        found = []
+        for path in self.root.glob(f"*/*{self.SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def record_stats(self):
+        """Accumulate this session's hit/miss counts into stats.json and return the totals."""
+        stats_file = self.root / 'stats.json'
+        totals = {'hits': 0, 'misses': 0}
+        if stats_file.exists():
+            try:
+                totals.update(json.loads(stats_file.read_text()))
+            except (OSError, ValueError):
+                pass
+        totals['hits'] += self.hits
+        totals['misses'] += self.misses
+        stats_file.write_text(json.dumps(totals, indent=2))
+        self.hits = self.misses = 0
+        return totals
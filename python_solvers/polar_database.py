@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Columnar, memory-mapped polar database
+Stores every polar as a foil x condition x alpha x coefficient float32 array
+
+Each write builds a complete new generation in its own subdirectory and then points the
+CURRENT file at it with os.replace, so a reader (or a crash) always finds a whole database.
+
+Usage:
+    python polar_database.py build [results.csv] [db_dir]   # CSV -> database
+    python polar_database.py export [db_dir] [results.csv]  # database -> CSV
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from polar_io import COEFFICIENTS
+
+DB_VERSION = 1
+
+DEFAULT_CSV = Path("xfoil_comprehensive_outputs/airfoil_data.csv")
+DEFAULT_DB_DIR = Path("xfoil_comprehensive_outputs/polar_db")
+CSV_CHUNK_ROWS = 100_000  # rows parsed per block when streaming a results CSV
+CURRENT_FILE = "CURRENT"  # names the generation subdirectory readers open
+DATA_FILES = ("index.json", "coeffs.npy")
+PRESENCE_FILE = "present.npy"  # foil x condition mask of stored polars
+MERGE_BLOCK_FOILS = 4096  # foils carried over per block copy when merging into a database
+
+
+def database_dir(db_dir):
+    """Directory holding the current generation's files: the one CURRENT names, else db_dir itself (older layout)."""
+    pointer = Path(db_dir) / CURRENT_FILE
+    if pointer.exists():
+        return Path(db_dir) / pointer.read_text().strip()
+    return Path(db_dir)
+
+
+def database_stamp(db_dir):
+    """Generation, modification time and size of the database files; changes whenever the database is rewritten."""
+    files = database_dir(db_dir)
+    stamp = {name: [(files / name).stat().st_mtime_ns, (files / name).stat().st_size] for name in DATA_FILES}
+    stamp['generation'] = files.name
+    return stamp
+
+
+def _new_generation(db_dir):
+    """Return (name, temporary directory) for the next generation of the database at db_dir."""
+    db_dir = Path(db_dir)
+    db_dir.mkdir(parents=True, exist_ok=True)
+    numbers = [int(m.group(1)) for m in (re.fullmatch(r"gen-(\d+)(\.tmp)?", p.name) for p in db_dir.iterdir()) if m]
+    generation = f"gen-{max(numbers, default=0) + 1:06d}"
+    tmp_dir = db_dir / (generation + ".tmp")
+    tmp_dir.mkdir()
+    return generation, tmp_dir
+
+
+def _publish(db_dir, tmp_dir, generation):
+    """Make a fully written generation current, then remove the ones it replaces.
+
+    The generation is renamed into place and the CURRENT pointer swapped with os.replace:
+    before the swap readers open the previous generation, after it the new one. Old
+    generations still mapped by a reader (on Windows) are left for the next write to remove.
+    """
+    db_dir = Path(db_dir)
+    tmp_dir.rename(db_dir / generation)
+    pointer_tmp = db_dir / (CURRENT_FILE + ".tmp")
+    pointer_tmp.write_text(generation)
+    os.replace(pointer_tmp, db_dir / CURRENT_FILE)
+    for path in db_dir.iterdir():
+        if path.is_dir() and path.name.startswith("gen-") and path.name != generation:
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.name in DATA_FILES:
+            try:
+                path.unlink()  # files of the older single-directory layout
+            except OSError:
+                pass
+
+
+def _polar_arrays(polar):
+    """Return (alphas, values[n, 6]) for a polar given as a dict or as an (alphas, values) pair."""
+    if isinstance(polar, dict):
+        alphas = np.array(list(polar), dtype=float)
+        values = np.array([[polar[a][c] for c in COEFFICIENTS] for a in polar], dtype=float)
+        return alphas, values.reshape(-1, len(COEFFICIENTS))
+    alphas, values = polar
+    return np.asarray(alphas, dtype=float), np.asarray(values, dtype=float)
+
+
+def write_polar_database(db_dir, records):
+    """Write (foil, re, mach, polar) records as a new database.
+
+    polar is either {alpha: {coefficient: value}} or an (alphas, values[n, 6]) array pair.
+
+    records is iterated twice (once to size the array, once to fill it), so pass
+    a list or a re-iterable object. The database is built as a new generation
+    and swapped in at the end, so readers never see a half-written store.
+    """
+    foils, conditions, alphas = {}, {}, set()
+    for foil, re_num, mach, polar in records:
+        foils.setdefault(str(foil), len(foils))
+        conditions.setdefault((float(re_num), float(mach)), len(conditions))
+        alphas.update(np.round(_polar_arrays(polar)[0], 3).tolist())
+
+    foil_list = sorted(foils)
+    condition_list = sorted(conditions)
+    alpha_list = sorted(alphas)
+    foil_idx = {f: i for i, f in enumerate(foil_list)}
+    cond_idx = {c: i for i, c in enumerate(condition_list)}
+    alpha_grid = np.array(alpha_list)
+
+    generation, tmp_dir = _new_generation(db_dir)
+    shape = (len(foil_list), len(condition_list), len(alpha_list), len(COEFFICIENTS))
+    data = np.lib.format.open_memmap(tmp_dir / "coeffs.npy", mode="w+", dtype=np.float32, shape=shape)
+    data[:] = np.nan
+    _fill(data, records, foil_idx, cond_idx, alpha_grid)
+    data.flush()
+    np.save(tmp_dir / PRESENCE_FILE, _presence(data))
+    del data
+
+    _write_index(tmp_dir, foil_list, condition_list, alpha_list)
+    _publish(db_dir, tmp_dir, generation)
+    return shape
+
+
+def _fill(data, records, foil_idx, cond_idx, alpha_grid):
+    """Store (foil, re, mach, polar) records in data, replacing whatever the foil and condition held."""
+    for foil, re_num, mach, polar in records:
+        fi = foil_idx[str(foil)]
+        ci = cond_idx[(float(re_num), float(mach))]
+        alphas, values = _polar_arrays(polar)
+        data[fi, ci] = np.nan
+        data[fi, ci, np.searchsorted(alpha_grid, np.round(alphas, 3))] = values
+
+
+def _presence(data):
+    """(n_foils, n_conditions) mask of the polars data holds, read a block of foils at a time."""
+    present = np.zeros(data.shape[:2], dtype=bool)
+    for first in range(0, len(data), MERGE_BLOCK_FOILS):
+        present[first:first + MERGE_BLOCK_FOILS] = ~np.isnan(data[first:first + MERGE_BLOCK_FOILS]).all(axis=(2, 3))
+    return present
+
+
+def _write_index(out_dir, foil_list, condition_list, alpha_list):
+    index = {
+        'version': DB_VERSION,
+        'foils': foil_list,
+        'conditions': [list(c) for c in condition_list],
+        'alphas': alpha_list,
+        'coefficients': COEFFICIENTS,
+    }
+    (out_dir / "index.json").write_text(json.dumps(index))
+
+
+class _CsvRecords:
+    """Re-iterable view of a results CSV as (foil, re, mach, polar) records, one job at a time.
+
+    jobs, if given, is a set of sweep_checkpoint.task_key()s; other jobs are skipped.
+    """
+
+    def __init__(self, csv_path, jobs=None):
+        self.csv_path = Path(csv_path)
+        self.jobs = jobs
+
+    def __iter__(self):
+        with open(self.csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            key, polar = None, {}
+            for row in reader:
+                row_key = (row['Airfoil'], row.get('Re') or 0, row.get('Mach') or 0)
+                if row_key != key:
+                    if key is not None and polar:
+                        yield key + (polar,)
+                    key, polar = row_key, {}
+                    wanted = self.jobs is None or (key[0], float(key[1]), float(key[2])) in self.jobs
+                if wanted:
+                    polar[float(row['Alpha'])] = {c: float(row[c]) for c in COEFFICIENTS}
+            if key is not None and polar:
+                yield key + (polar,)
+
+
+def build_from_csv(csv_path=DEFAULT_CSV, db_dir=DEFAULT_DB_DIR):
+    """Convert a results CSV (as written by NACA_data_extractor) into a database."""
+    return write_polar_database(db_dir, _CsvRecords(csv_path))
+
+
+def merge_into_database(db_dir, records):
+    """Upsert records into the database at db_dir (creating it if needed).
+
+    Polars already stored for the same foil and condition are replaced, all
+    others are kept, so sweeps and bulk ingestion can feed the same store.
+    Only the new records go through Python: the stored array is carried onto
+    the grown axes of the next generation with block copies.
+    """
+    new = {}
+    for foil, re_num, mach, polar in records:
+        new[(str(foil), float(re_num), float(mach))] = _polar_arrays(polar)
+    if not PolarDatabase.exists(db_dir):
+        return write_polar_database(db_dir, [key + (polar,) for key, polar in new.items()])
+
+    old = PolarDatabase(db_dir)
+    foil_list = sorted(set(old.foils).union(key[0] for key in new))
+    condition_list = sorted(set(old.conditions).union(key[1:] for key in new))
+    alpha_list = sorted(set(np.round(old.alphas, 3).tolist()).union(
+        *(np.round(alphas, 3).tolist() for alphas, _ in new.values())))
+    foil_idx = {f: i for i, f in enumerate(foil_list)}
+    cond_idx = {c: i for i, c in enumerate(condition_list)}
+    alpha_grid = np.array(alpha_list)
+
+    generation, tmp_dir = _new_generation(db_dir)
+    shape = (len(foil_list), len(condition_list), len(alpha_list), len(COEFFICIENTS))
+    data = np.lib.format.open_memmap(tmp_dir / "coeffs.npy", mode="w+", dtype=np.float32, shape=shape)
+    data[:] = np.nan
+    # Stored foils, conditions and alphas keep their order on the grown axes
+    foil_pos = np.array([foil_idx[f] for f in old.foils], dtype=np.int64)
+    cond_pos = np.array([cond_idx[c] for c in old.conditions], dtype=np.int64)
+    alpha_pos = np.searchsorted(alpha_grid, np.round(old.alphas, 3))
+    for first in range(0, len(old.foils), MERGE_BLOCK_FOILS):
+        block = slice(first, first + MERGE_BLOCK_FOILS)
+        data[np.ix_(foil_pos[block], cond_pos, alpha_pos)] = old.data[block]
+    _fill(data, [key + (polar,) for key, polar in new.items()], foil_idx, cond_idx, alpha_grid)
+    data.flush()
+    np.save(tmp_dir / PRESENCE_FILE, _presence(data))
+    del data, old
+
+    _write_index(tmp_dir, foil_list, condition_list, alpha_list)
+    _publish(db_dir, tmp_dir, generation)
+    return shape
+
+
+def merge_from_csv(csv_path=DEFAULT_CSV, db_dir=DEFAULT_DB_DIR, jobs=None):
+    """Upsert the polars in a results CSV into the database: all of them, or only those of jobs.
+
+    jobs is a set of sweep_checkpoint.task_key()s, e.g. the ones a sweep wrote this run, so
+    rows left in the CSV by earlier runs cannot replace polars stored since.
+    """
+    return merge_into_database(db_dir, _CsvRecords(csv_path, jobs))
+
+
+def csv_reynolds_numbers(csv_path=DEFAULT_CSV, chunksize=CSV_CHUNK_ROWS):
+    """Sorted distinct Reynolds numbers of a results CSV (empty without an Re column); reads only that column."""
+    import pandas as pd
+
+    if 'Re' not in pd.read_csv(csv_path, nrows=0).columns:
+        return np.zeros(0)
+    values = set()
+    for chunk in pd.read_csv(csv_path, usecols=['Re'], dtype={'Re': np.float64}, chunksize=chunksize):
+        values.update(chunk['Re'].dropna().unique().tolist())
+    return np.array(sorted(values))
+
+
+def _global_ids(values, ids, key=None):
+    """Ids of values in the running {key: id} dict ids, numbering unseen ones in order of first appearance.
+
+    key maps a distinct value to its dict key (default: the value itself).
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values)
+    lookup = np.array([ids.setdefault(key(u) if key else u, len(ids)) for u in uniques], dtype=np.int64)
+    return lookup[codes]
+
+
+def _csv_rows(csv_path, columns, dtypes, re_range, alpha_range, chunksize):
+    """Yield (chunk, foil codes, alpha, flow[:, (Re, Mach)]) of the rows of each chunk within the ranges."""
+    import pandas as pd
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = ['Airfoil', 'Alpha'] + [c for c in ('Re', 'Mach') if c in header] + list(columns)
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype={c: dtypes[c] for c in usecols}, chunksize=chunksize):
+        codes = chunk['Airfoil'].cat.codes.to_numpy()
+        alpha = chunk['Alpha'].to_numpy()
+        flow = np.column_stack([chunk[c].to_numpy() if c in chunk else np.zeros(len(chunk)) for c in ('Re', 'Mach')])
+        keep = (codes >= 0) & ~np.isnan(alpha) & ~np.isnan(flow).any(axis=1)
+        if re_range is not None:
+            keep &= (flow[:, 0] >= re_range[0]) & (flow[:, 0] <= re_range[1])
+        if alpha_range is not None:
+            keep &= (alpha >= alpha_range[0]) & (alpha <= alpha_range[1])
+        if keep.any():
+            yield chunk[keep], codes[keep], alpha[keep], flow[keep]
+
+
+def _row_ids(chunk, codes, flow, foil_ids, condition_ids):
+    """Foil and condition ids of the rows of a chunk, numbering unseen ones in order of first appearance."""
+    import pandas as pd
+
+    categories = chunk['Airfoil'].cat.categories
+    fi = _global_ids(codes, foil_ids, lambda code: str(categories[code]))
+    re_codes, re_values = pd.factorize(flow[:, 0])
+    mach_codes, mach_values = pd.factorize(flow[:, 1])
+    n_mach = len(mach_values)
+    ci = _global_ids(re_codes * n_mach + mach_codes, condition_ids,
+                     lambda k: (float(re_values[k // n_mach]), float(mach_values[k % n_mach])))
+    return fi, ci
+
+
+def read_csv_polars(csv_path=DEFAULT_CSV, coefficients=('CL', 'CM'), re_range=None, alpha_range=None,
+                    chunksize=CSV_CHUNK_ROWS):
+    """Stream a results CSV into per-foil arrays without holding the file or the result in memory.
+
+    Returns (foils, conditions, alphas, values[n_foils, n_conditions, n_alphas, n_coefficients]),
+    the layout of PolarDatabase.data, with float32 values and NaN where a point is missing.
+    values is a memmap on an anonymous temporary file: a first pass over the key columns
+    sizes it, and a second pass writes each chunk's coefficients straight into it.
+    Foils and conditions are in order of first appearance; a repeated (foil, condition, alpha)
+    row keeps its first occurrence. Only the needed columns are parsed, with explicit dtypes
+    (foil codes as categories, so "0012" stays a string), and rows outside the inclusive
+    re_range / alpha_range (lo, hi) pairs are dropped chunk by chunk as they are read.
+    """
+    import tempfile
+
+    dtypes = {'Airfoil': 'category', 'Alpha': np.float64, 'Re': np.float64, 'Mach': np.float64}
+    dtypes.update({c: np.float32 for c in coefficients})
+
+    foil_ids, condition_ids, alpha_values = {}, {}, set()
+    for chunk, codes, alpha, flow in _csv_rows(csv_path, (), dtypes, re_range, alpha_range, chunksize):
+        _row_ids(chunk, codes, flow, foil_ids, condition_ids)
+        alpha_values.update(np.unique(alpha).tolist())
+    alphas = np.array(sorted(alpha_values), dtype=np.float64)
+
+    shape = (len(foil_ids), len(condition_ids), len(alphas))
+    if not all(shape):
+        return list(foil_ids), list(condition_ids), alphas, np.full(shape + (len(coefficients),), np.nan, np.float32)
+    out = np.memmap(tempfile.TemporaryFile(), dtype=np.float32, mode='w+', shape=shape + (len(coefficients),))
+    out[:] = np.nan
+    seen = np.memmap(tempfile.TemporaryFile(), dtype=bool, mode='w+', shape=shape)
+    for chunk, codes, alpha, flow in _csv_rows(csv_path, coefficients, dtypes, re_range, alpha_range, chunksize):
+        fi, ci = _row_ids(chunk, codes, flow, foil_ids, condition_ids)
+        ai = np.searchsorted(alphas, alpha)
+        values = chunk[list(coefficients)].to_numpy(dtype=np.float32)
+        # First occurrence wins: rows seen in earlier chunks are kept, and within the chunk
+        # the reverse assignment leaves the earliest row
+        fresh = ~seen[fi, ci, ai]
+        out[fi[fresh][::-1], ci[fresh][::-1], ai[fresh][::-1]] = values[fresh][::-1]
+        seen[fi, ci, ai] = True
+    return list(foil_ids), list(condition_ids), alphas, out
+
+
+class PolarDatabase:
+    """Read-only view of a polar database; the coefficient array is memory mapped."""
+
+    def __init__(self, db_dir=DEFAULT_DB_DIR):
+        self.db_dir = Path(db_dir)
+        while True:
+            files = database_dir(self.db_dir)
+            try:
+                index = json.loads((files / "index.json").read_text())
+                self.data = np.load(files / "coeffs.npy", mmap_mode='r')
+                presence = files / PRESENCE_FILE
+                self._present = np.load(presence) if presence.exists() else None
+                break
+            except FileNotFoundError:
+                # Replaced by a writer between reading CURRENT and opening its files
+                if database_dir(self.db_dir) == files:
+                    raise
+        if index.get('version') != DB_VERSION:
+            raise ValueError(f"Unsupported polar database version in {self.db_dir}")
+        self.foils = index['foils']
+        self.conditions = [tuple(c) for c in index['conditions']]
+        self.alphas = np.array(index['alphas'], dtype=np.float64)
+        self.coefficients = index['coefficients']
+        self.foil_index = {f: i for i, f in enumerate(self.foils)}
+
+    @staticmethod
+    def exists(db_dir=DEFAULT_DB_DIR):
+        files = database_dir(db_dir)
+        return all((files / name).exists() for name in DATA_FILES)
+
+    @property
+    def present(self):
+        """(n_foils, n_conditions) mask of the stored polars, without reading the coefficient array.
+
+        Databases written before the mask was stored get it computed once, a condition at a time.
+        """
+        if self._present is None:
+            present = np.zeros((len(self.foils), len(self.conditions)), dtype=bool)
+            for ci in range(len(self.conditions)):
+                present[:, ci] = ~np.isnan(self.data[:, ci]).all(axis=(1, 2))
+            self._present = present
+        return self._present
+
+    def coefficient_index(self, name):
+        return self.coefficients.index(name)
+
+    def condition_index(self, re_num, mach=None):
+        """Index of the stored condition closest to re_num, and of those at that Re the one closest to mach.
+
+        Re is matched first, by |ln(Re / re_num)|: it dominates the polar at tunnel speeds,
+        and ln Re and Mach differences have no common scale to be summed on. mach (if given)
+        only chooses between conditions stored at the same Re; without it the first is used.
+        """
+        res = np.array([c[0] for c in self.conditions])
+        dist = np.abs(np.log(res / re_num))
+        nearest = res == res[dist.argmin()]
+        if mach is None:
+            return int(np.flatnonzero(nearest)[0])
+        mach_dist = np.abs(np.array([c[1] for c in self.conditions]) - mach)
+        return int(np.where(nearest, mach_dist, np.inf).argmin())
+
+    def condition_slice(self, condition, coefficients=('CL', 'CM'), foils=None):
+        """(n_foils, n_alphas, n_coefficients) array for one condition index; NaN where missing.
+
+        foils (indices) reads just those rows instead of every foil.
+        """
+        cols = [self.coefficient_index(c) for c in coefficients]
+        block = self.data[:, condition] if foils is None else self.data[foils, condition]
+        return block[:, :, cols]
+
+    def polar(self, foil, condition):
+        """Return (alphas, values) for one foil/condition, dropping alphas it does not have."""
+        values = np.asarray(self.data[self.foil_index[foil], condition])
+        mask = ~np.isnan(values).all(axis=1)
+        return self.alphas[mask], values[mask]
+
+    def records(self):
+        """Yield (foil, re, mach, (alphas, values)) for every stored polar."""
+        for fi, foil in enumerate(self.foils):
+            for ci, (re_num, mach) in enumerate(self.conditions):
+                alphas, values = self.polar(foil, ci)
+                if len(alphas):
+                    yield foil, re_num, mach, (alphas, values.astype(float))
+
+    def to_dataframe(self, condition=None, coefficients=COEFFICIENTS):
+        """Long-format DataFrame like airfoil_data.csv, optionally for one condition only."""
+        import pandas as pd
+
+        conditions = range(len(self.conditions)) if condition is None else [condition]
+        cols = [self.coefficient_index(c) for c in coefficients]
+        frames = []
+        for ci in conditions:
+            block = np.asarray(self.data[:, ci][:, :, cols])
+            fi, ai = np.nonzero(~np.isnan(block).all(axis=2))
+            frame = pd.DataFrame(block[fi, ai], columns=list(coefficients))
+            frame.insert(0, 'Airfoil', np.array(self.foils, dtype=object)[fi])
+            frame.insert(1, 'Re', self.conditions[ci][0])
+            frame.insert(2, 'Mach', self.conditions[ci][1])
+            frame.insert(3, 'Alpha', self.alphas[ai])
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def export_csv(self, csv_path):
+        """Write the whole database back out in the airfoil_data.csv layout."""
+        rows = 0
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Airfoil', 'Re', 'Mach', 'Alpha'] + self.coefficients)
+            for fi, foil in enumerate(self.foils):
+                for ci, (re_num, mach) in enumerate(self.conditions):
+                    alphas, values = self.polar(foil, ci)
+                    for alpha, row in zip(alphas, values):
+                        writer.writerow([foil, f"{re_num:g}", f"{mach:g}", f"{alpha:g}"]
+                                        + [f"{v:.6g}" for v in row])
+                        rows += 1
+        return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'export'):
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == 'build':
+        csv_path = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CSV
+        db_dir = Path(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_DB_DIR
+        shape = build_from_csv(csv_path, db_dir)
+        print(f"Built {db_dir}: {shape[0]} foils x {shape[1]} conditions x {shape[2]} alphas")
+    else:
+        db_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DB_DIR
+        csv_path = Path(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CSV
+        rows = PolarDatabase(db_dir).export_csv(csv_path)
+        print(f"Exported {rows} rows to {csv_path}")
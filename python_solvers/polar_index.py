@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Nearest-neighbour index over polar signatures for fast top-k airfoil identification
+A signature is a candidate's coefficients (CL, CM) resampled at a fixed set of angles of attack;
+one per foil and condition, clustered into lists by a coarse quantizer (k-means), each
+condition on its own so a query at one condition only bounds and scans that condition's lists
+
+The score of a candidate against an experiment is a weighted sum of per-coefficient RMSEs,
+e.g. 0.6 * RMSE(CL) + 0.4 * RMSE(CM). Every list stores its centroid and, per coefficient,
+the largest distance of a member from it, so the triangle inequality gives a lower bound
+on the score of everything in the list; lists are scanned best bound first and the scan
+stops once no unscanned list can beat the k-th best score found. Results are exact.
+
+The index lives in <polar_db>/signature_index/ and is rebuilt whenever the database is rewritten.
+
+Usage:
+    python polar_index.py build [db_dir]
+"""
+
+import json
+import shutil
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+from scipy.cluster.vq import kmeans2, vq
+
+from polar_database import DEFAULT_DB_DIR, PolarDatabase, database_stamp
+from polar_interp import interpolate
+
+INDEX_VERSION = 2
+INDEX_DIR_NAME = "signature_index"
+DEFAULT_ALPHAS = (-4.0, 0.0, 4.0, 8.0, 12.0, 16.0)  # the lab's standard test angles
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 40  # training points per list
+SCAN_BATCH = 8  # lists scored together per step of a query
+
+
+def _cluster(points, n_lists, seed=0):
+    """List label of every point: k-means (scipy's kmeans2) trained on a sample, then every point assigned."""
+    rng = np.random.default_rng(seed)
+    sample = points[rng.choice(len(points), min(len(points), n_lists * KMEANS_SAMPLE_PER_LIST), replace=False)]
+    with warnings.catch_warnings():
+        # Clusters left empty (e.g. by duplicate signatures) are dropped by build_index
+        warnings.filterwarnings("ignore", "One of the clusters is empty")
+        centroids, _ = kmeans2(sample, n_lists, iter=KMEANS_ITERATIONS, minit='++', seed=rng)
+    return vq(points, centroids, check_finite=False)[0].astype(np.int64)
+
+
+def compute_signatures(db, alphas=DEFAULT_ALPHAS, coefficients=('CL', 'CM'), method="linear", extrapolate="linear"):
+    """Return (signatures[n, n_alphas, n_coefficients], foil indices, condition indices).
+
+    Polars that cannot be evaluated at every alpha (too few converged points) are left out.
+    """
+    signatures, foils, conditions = [], [], []
+    for ci in range(len(db.conditions)):
+        values = np.asarray(db.condition_slice(ci, coefficients), dtype=np.float64)
+        sig = interpolate(db.alphas, values, alphas, method, extrapolate, axis=1)
+        keep = np.flatnonzero(~np.isnan(sig).any(axis=(1, 2)))
+        signatures.append(sig[keep])
+        foils.append(keep)
+        conditions.append(np.full(len(keep), ci))
+    return np.concatenate(signatures), np.concatenate(foils), np.concatenate(conditions)
+
+
+def build_index(db_dir=DEFAULT_DB_DIR, alphas=DEFAULT_ALPHAS, coefficients=('CL', 'CM'),
+                method="linear", extrapolate="linear", n_lists=None):
+    """Build and save the signature index of the database at db_dir; returns the number of signatures.
+
+    Every condition is clustered separately, into n_lists lists (default about sqrt(n_c)
+    lists of about sqrt(n_c) signatures for n_c signatures at the condition).
+    Signatures are interpolated with polar_interp.interpolate(method, extrapolate).
+    """
+    db_dir = Path(db_dir)
+    db = PolarDatabase(db_dir)
+    signatures, foils, conditions = compute_signatures(db, alphas, coefficients, method, extrapolate)
+    n = len(signatures)
+    flat = signatures.reshape(n, len(alphas) * len(coefficients))
+    labels = np.zeros(n, dtype=np.int64)
+    first_list = 0
+    for ci in np.unique(conditions):
+        members = np.flatnonzero(conditions == ci)
+        count = max(1, min(len(members), n_lists or int(round(np.sqrt(len(members))))))
+        labels[members] = first_list + _cluster(flat[members], count)
+        first_list += count
+
+    # Store members list by list (so each list holds one condition); drop lists nothing was assigned to
+    order = np.argsort(labels, kind='stable')
+    labels, signatures, foils, conditions = labels[order], signatures[order], foils[order], conditions[order]
+    used, starts = np.unique(labels, return_index=True)
+    offsets = np.append(starts, n)
+    centroids = np.stack([signatures[a:b].mean(axis=0) for a, b in zip(offsets[:-1], offsets[1:])]) \
+        if n else np.zeros((0,) + signatures.shape[1:])
+    member_dist = np.sqrt(((signatures - centroids[np.repeat(np.arange(len(used)), np.diff(offsets))]) ** 2).sum(axis=1))
+    radii = np.maximum.reduceat(member_dist, starts, axis=0) if n else np.zeros((0, len(coefficients)))
+    list_conditions = conditions[starts]
+
+    out_dir = db_dir / INDEX_DIR_NAME
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    np.save(tmp_dir / "signatures.npy", signatures)
+    np.save(tmp_dir / "foils.npy", foils.astype(np.int64))
+    np.save(tmp_dir / "conditions.npy", conditions.astype(np.int64))
+    np.save(tmp_dir / "centroids.npy", centroids)
+    np.save(tmp_dir / "radii.npy", radii)
+    np.save(tmp_dir / "offsets.npy", offsets.astype(np.int64))
+    np.save(tmp_dir / "list_conditions.npy", list_conditions.astype(np.int64))
+    meta = {
+        'version': INDEX_VERSION,
+        'alphas': [float(a) for a in alphas],
+        'coefficients': list(coefficients),
+        'method': method,
+        'extrapolate': extrapolate,
+        'database': database_stamp(db_dir),
+    }
+    (tmp_dir / "index.json").write_text(json.dumps(meta))
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    tmp_dir.rename(out_dir)
+    return n
+
+
+class SignatureIndex:
+    """Read-only signature index; signatures are memory mapped and only scanned lists are read."""
+
+    def __init__(self, db_dir=DEFAULT_DB_DIR):
+        self.db_dir = Path(db_dir)
+        index_dir = self.db_dir / INDEX_DIR_NAME
+        meta = json.loads((index_dir / "index.json").read_text())
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported signature index version in {index_dir}")
+        self.alphas = np.array(meta['alphas'])
+        self.coefficients = meta['coefficients']
+        self.method = meta['method']
+        self.extrapolate = meta['extrapolate']
+        self.database = meta['database']
+        self.signatures = np.load(index_dir / "signatures.npy", mmap_mode='r')
+        self.foils = np.load(index_dir / "foils.npy", mmap_mode='r')
+        self.conditions = np.load(index_dir / "conditions.npy", mmap_mode='r')
+        self.centroids = np.load(index_dir / "centroids.npy")
+        self.radii = np.load(index_dir / "radii.npy")
+        self.offsets = np.load(index_dir / "offsets.npy")
+        self.list_conditions = np.load(index_dir / "list_conditions.npy")
+
+    @staticmethod
+    def exists(db_dir=DEFAULT_DB_DIR):
+        return (Path(db_dir) / INDEX_DIR_NAME / "index.json").exists()
+
+    def matches(self, alphas, coefficients=('CL', 'CM'), method="linear", extrapolate="linear"):
+        """True if the index was built from the current database with these settings."""
+        return (np.array_equal(self.alphas, np.asarray(alphas, dtype=float))
+                and self.coefficients == list(coefficients)
+                and (self.method, self.extrapolate) == (method, extrapolate)
+                and self.database == database_stamp(self.db_dir))
+
+    @classmethod
+    def open(cls, db_dir=DEFAULT_DB_DIR, alphas=DEFAULT_ALPHAS, coefficients=('CL', 'CM'),
+             method="linear", extrapolate="linear"):
+        """Open the index of db_dir, (re)building it first if it is missing, of an older version or out of date."""
+        if cls.exists(db_dir):
+            try:
+                index = cls(db_dir)
+            except ValueError:
+                index = None
+            if index is not None and index.matches(alphas, coefficients, method, extrapolate):
+                return index
+        build_index(db_dir, alphas, coefficients, method, extrapolate)
+        return cls(db_dir)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def query(self, target, k=10, weights=(0.6, 0.4), condition=None):
+        """Return (foil indices, condition indices, scores) of the k best signatures, best first.
+
+        target is (n_alphas, n_coefficients) at self.alphas; the score is
+        sum(weights[c] * RMSE over alphas of coefficient c). A zero weight ignores that
+        coefficient (e.g. weights=(1, 0) ranks by CL alone). condition restricts the
+        search to the lists of one condition index. Equal scores are ordered by foil,
+        then condition.
+        """
+        target = np.asarray(target, dtype=np.float64)
+        w = np.asarray(weights, dtype=np.float64) / np.sqrt(len(self.alphas))
+        lists = np.arange(len(self.centroids)) if condition is None else np.flatnonzero(self.list_conditions == condition)
+        bound = np.full(len(self.centroids), np.inf)
+        bound[lists] = (w * np.maximum(np.sqrt(((self.centroids[lists] - target) ** 2).sum(axis=1))
+                                       - self.radii[lists], 0)).sum(axis=1)
+        lists = lists[np.argsort(bound[lists], kind='stable')]
+
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0)
+        threshold = np.inf
+        for start in range(0, len(lists), SCAN_BATCH):
+            batch = lists[start:start + SCAN_BATCH]
+            batch = batch[bound[batch] <= threshold]
+            if not len(batch):
+                break
+            rows = np.concatenate([np.arange(self.offsets[j], self.offsets[j + 1]) for j in batch])
+            scores = (w * np.sqrt(((self.signatures[rows] - target) ** 2).sum(axis=1))).sum(axis=1)
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            keep = np.lexsort((self.conditions[best_rows], self.foils[best_rows], best_scores))[:k]
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+            if len(best_rows) == k:
+                # Lists whose bound merely ties the k-th score may hold an earlier foil with that score
+                threshold = best_scores[-1] * (1 + 1e-9)
+        return np.asarray(self.foils[best_rows]), np.asarray(self.conditions[best_rows]), best_scores
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print(__doc__)
+        sys.exit(1)
+    db_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DB_DIR
+    n = build_index(db_dir)
+    print(f"Indexed {n} polar signatures in {db_dir / INDEX_DIR_NAME}")
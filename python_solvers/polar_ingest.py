@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of existing XFOIL polar files into the polar database
+Parses directories or .zip/.tar archives of *_polar.txt files in parallel; XFOIL is not needed
+
+Usage:
+    python polar_ingest.py sample_xfoil_outputs/ more_polars.zip --db xfoil_comprehensive_outputs/polar_db
+"""
+
+import argparse
+import sys
+import tarfile
+import zipfile
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+from polar_database import DEFAULT_DB_DIR, merge_into_database
+from polar_io import parse_polar_array, polar_metadata
+
+POLAR_GLOB = "*polar*.txt"
+CHUNKSIZE = 64
+DEFAULT_MACH = 0.03  # assumed when neither the header nor the filename gives a Mach number
+
+
+def _parse_member(item):
+    """Parse one (name, text) pair; return a database record or (name, None, reason)."""
+    name, text = item
+    foil, re_num, mach = polar_metadata(text, name)
+    if foil is None or re_num is None:
+        return (name, None, "no foil code / Reynolds number in header or filename")
+    alphas, values = parse_polar_array(text)
+    if len(alphas) == 0:
+        return (name, None, "no polar rows")
+    return (name, (foil, re_num, mach if mach is not None else DEFAULT_MACH, (alphas, values)), None)
+
+
+def _parse_path(path):
+    try:
+        text = Path(path).read_text(encoding="utf-8", errors="ignore")
+    except OSError as e:
+        return (str(path), None, str(e))
+    return _parse_member((str(path), text))
+
+
+def iter_archive(path):
+    """Yield (member name, text) for every polar file inside a zip or tar archive."""
+    path = Path(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and Path(info.filename).match(POLAR_GLOB):
+                    yield info.filename, zf.read(info).decode("utf-8", errors="ignore")
+    else:
+        with tarfile.open(path) as tf:
+            for member in tf:
+                if member.isfile() and Path(member.name).match(POLAR_GLOB):
+                    yield member.name, tf.extractfile(member).read().decode("utf-8", errors="ignore")
+
+
+def ingest(sources, db_dir=DEFAULT_DB_DIR, workers=None):
+    """Parse every polar under sources and upsert it into the database; return (records, failures)."""
+    files, archives = [], []
+    for src in map(Path, sources):
+        if src.is_dir():
+            files.extend(sorted(src.rglob(POLAR_GLOB)))
+        elif zipfile.is_zipfile(src) or tarfile.is_tarfile(src):
+            archives.append(src)
+        else:
+            files.append(src)
+
+    workers = workers or cpu_count()
+    records, failures = [], []
+
+    def collect(results):
+        for name, record, reason in results:
+            if record is None:
+                failures.append((name, reason))
+            else:
+                records.append(record)
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            collect(pool.imap_unordered(_parse_path, files, chunksize=CHUNKSIZE))
+            for archive in archives:
+                collect(pool.imap_unordered(_parse_member, iter_archive(archive), chunksize=CHUNKSIZE))
+    else:
+        collect(map(_parse_path, files))
+        for archive in archives:
+            collect(map(_parse_member, iter_archive(archive)))
+
+    if records:
+        merge_into_database(db_dir, records)
+    return records, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load existing XFOIL polar files into the polar database.")
+    parser.add_argument("sources", nargs="+", help="polar files, directories or .zip/.tar archives")
+    parser.add_argument("--db", default=str(DEFAULT_DB_DIR), help="polar database directory")
+    parser.add_argument("--workers", type=int, default=cpu_count(), help="parser processes")
+    args = parser.parse_args()
+
+    records, failures = ingest(args.sources, Path(args.db), args.workers)
+    for name, reason in failures:
+        print(f"Skipped {name}: {reason}", file=sys.stderr)
+    foils = {r[0] for r in records}
+    conditions = {(r[1], r[2]) for r in records}
+    print(f"Ingested {len(records)} polars ({len(foils)} foils, {len(conditions)} conditions) into {args.db}")
+    if not records:
+        sys.exit(1)
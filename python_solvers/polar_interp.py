@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Batched interpolation of XFOIL polars at arbitrary angles of attack
+Interpolates every target alpha for every candidate foil and coefficient at once from a
+shared sorted alpha grid; NaN marks points a foil does not have (unconverged alphas)
+
+    interpolate(alpha_grid, values, targets)                      # linear, NaN outside the data
+    interpolate(alpha_grid, values, targets, method="pchip", extrapolate="linear", axis=1)
+    interpolate_linear_at(alpha_grid, values, target, rows)       # one angle, selected foils only
+"""
+
+import numpy as np
+
+METHODS = ("linear", "pchip")
+EXTRAPOLATE = ("nan", "clamp", "linear")
+
+
+def _neighbours(present):
+    """Index of the nearest present point at or before / at or after each grid point (-1 / n if none)."""
+    n = present.shape[-1]
+    idx = np.arange(n)
+    prev = np.maximum.accumulate(np.where(present, idx, -1), axis=-1)
+    nxt = np.minimum.accumulate(np.where(present, idx, n)[..., ::-1], axis=-1)[..., ::-1]
+    return prev, nxt
+
+
+def _evaluate(x, y, t, prev, nxt, count, extrapolate):
+    """Linearly interpolate rows y (series x alphas) at t given each row's present-neighbour indices and point count."""
+    n = len(x)
+    # Grid slot of each target: the present points bracketing it are prev[slot] and nxt[slot + 1]
+    slot = np.searchsorted(x, t, side='right') - 1
+    exact = (slot >= 0) & (x[np.clip(slot, 0, n - 1)] == t)
+    lo = np.where(slot >= 0, np.take(prev, np.clip(slot, 0, n - 1), axis=-1), -1)
+    hi = np.where(slot + 1 < n, np.take(nxt, np.clip(slot + 1, 0, n - 1), axis=-1), n)
+    # An exact hit on a present point needs no neighbours
+    hit = exact & (lo == slot)
+    hi = np.where(hit, lo, hi)
+
+    first = np.where(count > 0, nxt[..., :1], 0)
+    last = np.where(count > 0, prev[..., -1:], 0)
+    below, above = lo < 0, hi >= n
+    if extrapolate == "linear":
+        # Extend the end interval: the first/last two present points
+        second = np.where(first + 1 < n, np.take_along_axis(nxt, np.minimum(first + 1, n - 1), axis=-1), n)
+        penult = np.where(last > 0, np.take_along_axis(prev, np.maximum(last - 1, 0), axis=-1), -1)
+        lo = np.where(below, first, np.where(above, penult, lo))
+        hi = np.where(below, second, np.where(above, last, hi))
+    elif extrapolate == "clamp":
+        lo = np.where(below, first, np.where(above, last, lo))
+        hi = np.where(below, first, np.where(above, last, hi))
+
+    valid = (lo >= 0) & (hi < n) & (lo <= hi) & (count > 0)
+    lo_c, hi_c = np.clip(lo, 0, n - 1), np.clip(hi, 0, n - 1)
+    x0, x1 = x[lo_c], x[hi_c]
+    y0 = np.take_along_axis(y, lo_c, axis=-1)
+    y1 = np.take_along_axis(y, hi_c, axis=-1)
+    h = x1 - x0
+    single = h == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(single, 0.0, (t - x0) / h)
+    out = y0 + s * (y1 - y0)
+    out = np.where(single, y0, out)
+    out = np.where(valid, out, np.nan)
+    return out
+
+
+def _pchip_inside(x, rows, t, out):
+    """Overwrite out with scipy's PCHIP wherever a target lies within a row's present points.
+
+    Rows are fitted together in groups sharing the same present alphas, so a batch costs
+    one fit per pattern of missing points rather than one per row.
+    """
+    from scipy.interpolate import PchipInterpolator
+
+    present = ~np.isnan(rows)
+    full = present.all(axis=1)
+    groups = [(np.flatnonzero(full), np.ones(len(x), dtype=bool))] if full.any() else []
+    if not full.all():
+        partial = np.flatnonzero(~full)
+        patterns, group = np.unique(present[partial], axis=0, return_inverse=True)
+        groups += [(partial[group.ravel() == g], mask) for g, mask in enumerate(patterns)]
+    for sel, mask in groups:
+        xs = x[mask]
+        if len(xs) < 2:
+            continue
+        inside = (t >= xs[0]) & (t <= xs[-1])
+        if inside.any():
+            out[np.ix_(sel, np.flatnonzero(inside))] = PchipInterpolator(xs, rows[np.ix_(sel, np.flatnonzero(mask))],
+                                                                         axis=1)(t[inside])
+
+
+def interpolate(alpha_grid, values, targets, method="linear", extrapolate="nan", axis=-1):
+    """Interpolate values (sampled on alpha_grid along axis) at every alpha in targets.
+
+    alpha_grid must be sorted ascending. values may hold any number of batch axes
+    (e.g. foils x alphas x coefficients) and NaN where a point is missing; each
+    series is interpolated over its own present points only. The alpha axis of the
+    result is replaced by one of len(targets).
+
+    method:       "linear", or "pchip" for scipy's monotone (shape-preserving) cubic,
+                  which cannot overshoot between points, e.g. around CL max.
+    extrapolate:  what a target outside a series' present points gets: "nan",
+                  "clamp" (the end value) or "linear" (the line through the two end points);
+                  pchip extrapolates the same way.
+    A series with no present points gives NaN; one with a single point gives it only
+    where the target is that alpha (or everywhere with "clamp").
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+    if extrapolate not in EXTRAPOLATE:
+        raise ValueError(f"extrapolate must be one of {EXTRAPOLATE}, not {extrapolate!r}")
+    x = np.asarray(alpha_grid, dtype=float)
+    t = np.asarray(targets, dtype=float)
+    y = np.moveaxis(np.asarray(values, dtype=float), axis, -1)
+    if y.shape[-1] != len(x):
+        raise ValueError(f"values have {y.shape[-1]} points along axis {axis}, alpha_grid has {len(x)}")
+    if len(x) > 1 and np.any(np.diff(x) <= 0):
+        raise ValueError("alpha_grid must be strictly increasing")
+
+    n = len(x)
+    rows = y.reshape(int(np.prod(y.shape[:-1])), n)
+    out = np.full((len(rows), len(t)), np.nan)
+    if n:
+        present = ~np.isnan(rows)
+        full = present.all(axis=1)
+        # Series with every grid point share their bracket indices; only the rest need per-series neighbours
+        grid = np.arange(n)[None, :]
+        out[full] = _evaluate(x, rows[full], t, grid, grid, np.array([[n]]), extrapolate)
+        if not full.all():
+            prev, nxt = _neighbours(present[~full])
+            out[~full] = _evaluate(x, rows[~full], t, prev, nxt, present[~full].sum(axis=1, keepdims=True),
+                                   extrapolate)
+        if method == "pchip":
+            _pchip_inside(x, rows, t, out)
+    return np.moveaxis(out.reshape(y.shape[:-1] + t.shape), -1, axis)
+
+
+def _nearest_present(values, rows, start, step):
+    """Walk from grid index start (per series) in direction step to the nearest present point.
+
+    values is (n_foils, n_alphas, n_coefficients) and start (len(rows), n_coefficients); returns
+    the index (-1 or n_alphas when there is none) and value of that point for every series.
+    Further points are only read for the series still searching.
+    """
+    n = values.shape[1]
+    idx = np.array(start, dtype=np.int64)
+    cols = np.arange(idx.shape[1])
+    val = np.full(idx.shape, np.nan)
+    if idx.size and ((idx >= 0) & (idx < n)).all():
+        # Usually every series starts on the grid and most find a present point there
+        first = idx.flat[0]
+        val[:] = values[rows, first] if (idx == first).all() else values[rows[:, None], idx, cols[None, :]]
+        todo = np.argwhere(np.isnan(val))
+        idx[todo[:, 0], todo[:, 1]] += step
+    else:
+        todo = np.argwhere((idx >= 0) & (idx < n))
+    while len(todo):
+        r, c = todo[:, 0], todo[:, 1]
+        on_grid = (idx[r, c] >= 0) & (idx[r, c] < n)
+        r, c = r[on_grid], c[on_grid]
+        point = values[rows[r], idx[r, c], cols[c]]
+        found = ~np.isnan(point)
+        val[r[found], c[found]] = point[found]
+        r, c = r[~found], c[~found]
+        idx[r, c] += step
+        todo = np.column_stack([r, c])
+    return idx, val
+
+
+def interpolate_linear_at(alpha_grid, values, target, rows=None, extrapolate="nan"):
+    """Linear interpolation of values[rows] (foils x alphas x coefficients) at the single angle target.
+
+    Equal to interpolate(alpha_grid, values[rows], [target], "linear", extrapolate, axis=1)[:, 0],
+    but reads only the grid points around target (walking outwards past missing ones where a
+    series needs it) instead of whole polars, so repeated calls on a shrinking set of rows,
+    as in a branch-and-bound search, cost in proportion to the rows still in play.
+    """
+    if extrapolate not in EXTRAPOLATE:
+        raise ValueError(f"extrapolate must be one of {EXTRAPOLATE}, not {extrapolate!r}")
+    x = np.asarray(alpha_grid, dtype=float)
+    n = len(x)
+    rows = np.arange(len(values)) if rows is None else np.asarray(rows)
+    shape = (len(rows), values.shape[2])
+    slot = int(np.searchsorted(x, target, side='right')) - 1
+    lo, y0 = _nearest_present(values, rows, np.full(shape, slot), -1)
+    if slot >= 0 and x[slot] == target:
+        # An exact hit on a present point needs no neighbours
+        hi, y1 = lo.copy(), y0.copy()
+        missing = lo != slot
+        if missing.any():
+            hi_m, y1_m = _nearest_present(values, rows, np.full(shape, slot + 1), 1)
+            hi, y1 = np.where(missing, hi_m, hi), np.where(missing, y1_m, y1)
+    else:
+        hi, y1 = _nearest_present(values, rows, np.full(shape, slot + 1), 1)
+
+    below, above = lo < 0, hi >= n
+    if extrapolate == "linear":
+        # Extend the end interval: below, hi is the first present point; above, lo is the last
+        second, y_second = _nearest_present(values, rows, np.where(below, hi + 1, n), 1)
+        penult, y_penult = _nearest_present(values, rows, np.where(above & ~below, lo - 1, -1), -1)
+        lo, y0, hi, y1 = (np.where(below, hi, np.where(above, penult, lo)),
+                          np.where(below, y1, np.where(above, y_penult, y0)),
+                          np.where(below, second, np.where(above, lo, hi)),
+                          np.where(below, y_second, np.where(above, y0, y1)))
+    elif extrapolate == "clamp":
+        end, y_end = np.where(below, hi, lo), np.where(below, y1, y0)
+        lo, y0 = np.where(below | above, end, lo), np.where(below | above, y_end, y0)
+        hi, y1 = np.where(below | above, end, hi), np.where(below | above, y_end, y1)
+
+    valid = (lo >= 0) & (hi < n) & (lo <= hi)
+    x0, x1 = x[np.clip(lo, 0, n - 1)], x[np.clip(hi, 0, n - 1)]
+    h = x1 - x0
+    single = h == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(single, 0.0, (target - x0) / h)
+    out = y0 + s * (y1 - y0)
+    out = np.where(single, y0, out)
+    return np.where(valid, out, np.nan)
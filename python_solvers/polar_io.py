@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+XFOIL polar file parsing and formatting
+Shared by the extractor, the ingestion tool and the polar database; needs no XFOIL install
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+
+COEFFICIENTS = ['CL', 'CD', 'CDp', 'CM', 'Top_Xtr', 'Bot_Xtr']
+
+_FOIL_RE = re.compile(r"Calculated polar for:\s*(.+)")
+_RE_RE = re.compile(r"Re\s*=\s*([\d.]+)\s*e\s*([+-]?\d+)")
+_MACH_RE = re.compile(r"Mach\s*=\s*([\d.]+)")
+_FILENAME_RE = re.compile(r"^(?P<foil>.+?)_Re(?P<re>[\d.]+)(?:_M(?P<mach>[\d.]+))?_polar", re.IGNORECASE)
+
+# Console lines XFOIL prints for every viscous iteration of an OPER point
+_NUM = r"(-?\d*\.?\d+(?:[eE][+-]?\d+)?)"
+_CONSOLE_CL_RE = re.compile(r"\ba\s*=\s*" + _NUM + r"\s+CL\s*=\s*" + _NUM)
+_CONSOLE_CD_RE = re.compile(r"Cm\s*=\s*" + _NUM + r"\s+CD\s*=\s*" + _NUM + r"(?:.*?CDp\s*=\s*" + _NUM + ")?")
+_CONSOLE_XTR_RE = re.compile(r"Side\s+([12])\s+.*?transition at x/c\s*=\s*" + _NUM)
+
+
+def parse_polar_text(text):
+    """Parse an XFOIL polar dump and return {alpha: {coefficient: value}} for every row."""
+    polar = {}
+    lines = text.splitlines()
+
+    # Find the start of data table (after header)
+    start_idx = 0
+    for i, line in enumerate(lines):
+        if line.strip().startswith("---"):
+            start_idx = i + 1
+            break
+
+    # Parse data lines
+    for line in lines[start_idx:]:
+        parts = line.split()
+        if len(parts) >= 7:
+            try:
+                polar[float(parts[0])] = {
+                    'CL': float(parts[1]),
+                    'CD': float(parts[2]),
+                    'CDp': float(parts[3]),
+                    'CM': float(parts[4]),
+                    'Top_Xtr': float(parts[5]),
+                    'Bot_Xtr': float(parts[6])
+                }
+            except (ValueError, IndexError):
+                continue
+    return polar
+
+
+def parse_console_polar(output):
+    """Rebuild {alpha: {coefficient: value}} from XFOIL's console output with PACC on.
+
+    XFOIL prints alpha/CL, Cm/CD/CDp and both transition points after every
+    viscous iteration and "Point added to stored polar" once a point converges,
+    so the last values seen before each "Point added" line are that polar row.
+    Lines that are missing from the output (e.g. CDp from older builds) read as NaN.
+    """
+    polar = {}
+    current = {}
+    for line in output.splitlines():
+        match = _CONSOLE_CL_RE.search(line)
+        if match:
+            current['alpha'], current['CL'] = float(match.group(1)), float(match.group(2))
+            continue
+        match = _CONSOLE_CD_RE.search(line)
+        if match:
+            current['CM'], current['CD'] = float(match.group(1)), float(match.group(2))
+            current['CDp'] = float(match.group(3)) if match.group(3) else float('nan')
+            continue
+        match = _CONSOLE_XTR_RE.search(line)
+        if match:
+            current['Top_Xtr' if match.group(1) == '1' else 'Bot_Xtr'] = float(match.group(2))
+            continue
+        if "Point added to stored polar" in line and 'alpha' in current:
+            polar[round(current['alpha'], 3)] = {c: current.get(c, float('nan')) for c in COEFFICIENTS}
+            current = {}
+    return polar
+
+
+def parse_polar_array(text):
+    """Vectorized parse of a polar table into (alphas, values[n, 6]) float arrays.
+
+    The numeric block after the dashed header rule is converted in one
+    np.fromstring call; tables with stray non-numeric lines fall back to the
+    line-by-line parser.
+    """
+    start = text.find("---")
+    if start < 0:
+        return np.empty(0), np.empty((0, len(COEFFICIENTS)))
+    header_start = text.rfind("\n", 0, start) + 1
+    header_line = text.rfind("\n", 0, header_start - 1) + 1
+    ncols = len(text[header_line:header_start].split()) or 7
+    block = text[text.find("\n", start) + 1:]
+
+    values = np.fromstring(block, sep=" ") if block.strip() else np.empty(0)
+    if ncols >= 7 and values.size % ncols == 0 and values.size:
+        table = values.reshape(-1, ncols)
+        return table[:, 0], table[:, 1:7]
+
+    polar = parse_polar_text(text)
+    alphas = np.array(sorted(polar), dtype=float)
+    table = np.array([[polar[a][c] for c in COEFFICIENTS] for a in alphas], dtype=float)
+    return alphas, table.reshape(-1, len(COEFFICIENTS))
+
+
+def polar_metadata(text, filename=None):
+    """Return (foil, re, mach) from the polar header, preferring exact values in the filename.
+
+    The header prints Re with three significant figures, so a name such as
+    4412_Re121000_polar.txt wins when both are available. Missing fields are None.
+    """
+    foil = re_num = mach = None
+    head = text[:2000]
+    match = _FOIL_RE.search(head)
+    if match:
+        foil = match.group(1).strip()
+        if foil.upper().startswith("NACA"):
+            foil = foil[4:].strip()
+    match = _RE_RE.search(head)
+    if match:
+        re_num = round(float(match.group(1)) * 10 ** int(match.group(2)))
+    match = _MACH_RE.search(head)
+    if match:
+        mach = float(match.group(1))
+
+    if filename is not None:
+        match = _FILENAME_RE.match(Path(filename).name)
+        if match:
+            foil = foil or match.group('foil')
+            re_num = round(float(match.group('re')))
+            if match.group('mach'):
+                mach = float(match.group('mach'))
+    return foil, re_num, mach
+
+
+def format_polar_text(polar, foil_code=None, re_num=None, mach=None):
+    """Write {alpha: coefficients} back out as an XFOIL-style polar table."""
+    lines = []
+    if foil_code is not None:
+        lines += ["", f" Calculated polar for: NACA {foil_code}", ""]
+    if re_num is not None and mach is not None:
+        lines += [f" Mach = {mach:7.3f}     Re = {re_num / 1e6:9.6f} e 6", ""]
+    lines += [
+        "   alpha    CL        CD       CDp       CM     Top_Xtr  Bot_Xtr",
+        "  ------ -------- --------- --------- -------- -------- --------",
+    ]
+    for alpha in sorted(polar):
+        c = polar[alpha]
+        lines.append(f"{alpha:8.3f} {c['CL']:8.4f} {c['CD']:9.5f} {c['CDp']:9.5f} "
+                     f"{c['CM']:8.4f} {c['Top_Xtr']:8.4f} {c['Bot_Xtr']:8.4f}")
+    return "\n".join(lines) + "\n"
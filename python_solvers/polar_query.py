@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Polars at any Reynolds number, interpolated in log Re between stored conditions
+Every wind tunnel run sits at its own Re, but the extractor only produces polars at the exact
+(Re, Mach) CONDITIONS it is given. A foil's polar at any Re is taken from the two stored
+conditions bracketing it, linear in log Re alpha by alpha on the database grid. XFOIL runs
+only for foils with no bracket, or one wider than MAX_RE_RATIO, and then at Re on a fixed log
+grid (RE_GRID_PER_DECADE), so a run serves every later query nearby instead of each unique
+test condition getting its own.
+
+Conditions are told apart by Re alone: at tunnel speeds Mach follows Re and matters little,
+so runs added here use the tunnel's Mach for their Re.
+
+Usage:
+    python polar_query.py FOIL RE [RE ...] [--db DIR] [--no-run]
+"""
+
+import argparse
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from polar_database import DEFAULT_DB_DIR, PolarDatabase, merge_into_database
+from polar_interp import interpolate
+
+RE_GRID_PER_DECADE = 10  # XFOIL fills missing brackets at Re = 10^(k / RE_GRID_PER_DECADE), 3 significant figures
+MAX_RE_RATIO = 1.6       # widest bracket (upper / lower Re) interpolated across
+RE_TOLERANCE = 0.005     # relative; a stored condition this close to the query is used as it is
+
+
+def re_grid_bracket(re_num):
+    """(lower, upper) Re of the XFOIL grid around re_num; equal when re_num is on the grid."""
+    k = math.floor(math.log10(re_num) * RE_GRID_PER_DECADE)
+    grid = [float(f"{10 ** ((k + i) / RE_GRID_PER_DECADE):.3g}") for i in range(-1, 3)]
+    for g in grid:
+        if abs(g / re_num - 1) <= RE_TOLERANCE:
+            return g, g
+    return max(g for g in grid if g <= re_num), min(g for g in grid if g >= re_num)
+
+
+def tunnel_mach(re_num):
+    """Mach of a tunnel run at re_num: Re / M = rho a c / mu is fixed for one tunnel, chord and air."""
+    from NACA_data_extractor import CONDITIONS
+
+    ref_re, ref_mach = min(CONDITIONS, key=lambda c: abs(math.log(c[0] / re_num)))
+    return round(ref_mach * re_num / ref_re, 4)
+
+
+def re_brackets(db, re_num, foils=None):
+    """Return (lower, upper, weight) per foil: the stored conditions bracketing re_num and the upper's share.
+
+    foils (indices) defaults to every foil. A side a foil has no polar on is -1. A condition
+    within RE_TOLERANCE of re_num is used on both sides with weight 0.
+    """
+    rows = np.arange(len(db.foils)) if foils is None else np.asarray(foils, dtype=np.int64)
+    res = np.array([c[0] for c in db.conditions], dtype=float)
+    present = db.present[rows]
+    distance = np.abs(np.log(res / re_num))
+    exact = present & (distance <= math.log1p(RE_TOLERANCE))
+    below, above = present & (res <= re_num), present & (res >= re_num)
+    lower = np.where(below.any(axis=1), np.argmax(np.where(below, res, -np.inf), axis=1), -1)
+    upper = np.where(above.any(axis=1), np.argmin(np.where(above, res, np.inf), axis=1), -1)
+    nearest = np.argmin(np.where(exact, distance, np.inf), axis=1)
+    has_exact = exact.any(axis=1)
+    lower, upper = np.where(has_exact, nearest, lower), np.where(has_exact, nearest, upper)
+    both = (lower >= 0) & (upper >= 0) & (lower != upper)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(both, np.log(re_num / res[lower]) / np.log(res[upper] / res[lower]), 0.0)
+    return lower, upper, weight
+
+
+def usable(db, lower, upper):
+    """Mask of brackets narrow enough to interpolate across."""
+    res = np.array([c[0] for c in db.conditions], dtype=float)
+    ok = (lower >= 0) & (upper >= 0)
+    ok[ok] = res[upper[ok]] / res[lower[ok]] <= MAX_RE_RATIO
+    return ok
+
+
+def interpolate_re(db, re_num, coefficients=('CL', 'CM'), foils=None):
+    """Return (values[n_foils, n_alphas, n_coefficients] at re_num on db.alphas, mask of foils with a bracket).
+
+    Values are linear in log Re between each foil's bracketing conditions. Alphas one of the
+    two polars skipped (not converged) are first filled linearly from its neighbours; NaN
+    outside either polar's alpha range, and for foils with no bracket within MAX_RE_RATIO.
+    """
+    rows = np.arange(len(db.foils)) if foils is None else np.asarray(foils, dtype=np.int64)
+    lower, upper, weight = re_brackets(db, re_num, rows)
+    ok = usable(db, lower, upper)
+    cols = [db.coefficient_index(c) for c in coefficients]
+    values = np.full((len(rows), len(db.alphas), len(cols)), np.nan)
+    sel = np.flatnonzero(ok)
+    if len(sel):
+        lo = np.asarray(db.data[rows[sel], lower[sel]], dtype=np.float64)[:, :, cols]
+        hi = np.asarray(db.data[rows[sel], upper[sel]], dtype=np.float64)[:, :, cols]
+        lo = interpolate(db.alphas, lo, db.alphas, "linear", "nan", axis=1)
+        hi = interpolate(db.alphas, hi, db.alphas, "linear", "nan", axis=1)
+        w = weight[sel, None, None]
+        # A stored condition used as is (weight 0) must not pick up NaNs from its upper side
+        values[sel] = np.where(w == 0, lo, lo + w * (hi - lo))
+    return values, ok
+
+
+def grid_runs(lower_re, upper_re, re_num):
+    """Grid Re to run XFOIL at so re_num gets a bracket within MAX_RE_RATIO, given the stored sides (None if missing)."""
+    g_lo, g_hi = re_grid_bracket(re_num)
+    if lower_re is not None and g_hi / lower_re <= MAX_RE_RATIO:
+        return [g_hi]
+    if upper_re is not None and upper_re / g_lo <= MAX_RE_RATIO:
+        return [g_lo]
+    return sorted({g_lo, g_hi})
+
+
+def fill_brackets(db_dir, foils, re_nums):
+    """Run XFOIL wherever foils lack a usable bracket at any of re_nums and merge the polars into db_dir.
+
+    Runs go through the extractor (its settings and cache). Returns the number of polars added.
+    """
+    import NACA_data_extractor as extractor
+    from polar_cache import PolarCache
+
+    db = PolarDatabase(db_dir) if PolarDatabase.exists(db_dir) else None
+    tasks = set()
+    for re_num in re_nums:
+        sides = {}
+        if db is not None:
+            known = [f for f in foils if f in db.foil_index]
+            lower, upper, _ = re_brackets(db, re_num, [db.foil_index[f] for f in known])
+            ok = usable(db, lower, upper)
+            for foil, lo, hi, good in zip(known, lower, upper, ok):
+                sides[foil] = None if good else (db.conditions[lo][0] if lo >= 0 else None,
+                                                 db.conditions[hi][0] if hi >= 0 else None)
+        for foil in foils:
+            side = sides.get(foil, (None, None))
+            if side is not None:
+                tasks.update((foil, g, tunnel_mach(g)) for g in grid_runs(side[0], side[1], re_num))
+    if not tasks:
+        return 0
+    if extractor.XF_PATH is None:
+        print(f"XFOIL executable not found (set XFOIL_EXECUTABLE); {len(tasks)} bracketing polars not run")
+        return 0
+
+    cache = PolarCache(extractor.CACHE_DIR, extractor.CACHE_MAX_BYTES) if extractor.USE_CACHE else None
+    print(f"Running XFOIL for {len(tasks)} missing bracketing polars...")
+    records = []
+    for foil, re_num, mach, data, report in extractor.iter_results(sorted(tasks), cache=cache):
+        if data is None:
+            print(f"  {foil} @ Re {re_num:g}: XFOIL failed ({report.get('reason')})")
+        else:
+            records.append((foil, re_num, mach, data))
+    if records:
+        merge_into_database(db_dir, records)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Polar of one foil at any Re, interpolated between stored conditions.")
+    parser.add_argument("foil")
+    parser.add_argument("re", type=float, nargs="+", help="Reynolds numbers to query")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_DIR, help="polar database directory")
+    parser.add_argument("--no-run", action="store_true", help="never run XFOIL; report missing brackets instead")
+    args = parser.parse_args()
+    if not args.no_run:
+        added = fill_brackets(args.db, [args.foil], args.re)
+        if added:
+            print(f"Added {added} polars to {args.db}")
+    if not PolarDatabase.exists(args.db) or args.foil not in PolarDatabase(args.db).foil_index:
+        print(f"Error: no polars of {args.foil} in {args.db}")
+        sys.exit(1)
+
+    db = PolarDatabase(args.db)
+    row = db.foil_index[args.foil]
+    for re_num in args.re:
+        values, ok = interpolate_re(db, re_num, db.coefficients, [row])
+        lower, upper, weight = re_brackets(db, re_num, [row])
+        print(f"\n{args.foil} at Re {re_num:g}")
+        if not ok[0]:
+            sides = [f"{db.conditions[i][0]:g}" if i >= 0 else "none" for i in (lower[0], upper[0])]
+            print(f"  no bracket within {MAX_RE_RATIO:g}x (stored below / above: {sides[0]} / {sides[1]})")
+            continue
+        if lower[0] == upper[0]:
+            print(f"  stored condition Re {db.conditions[lower[0]][0]:g}")
+        else:
+            print(f"  between Re {db.conditions[lower[0]][0]:g} and {db.conditions[upper[0]][0]:g} "
+                  f"(weight {weight[0]:.3f} on the upper)")
+        print("  " + "".join(f"{name:>10}" for name in ['Alpha'] + db.coefficients))
+        for alpha, point in zip(db.alphas, values[0]):
+            if not np.isnan(point).all():
+                print("  " + f"{alpha:10g}" + "".join(f"{v:10.5f}" for v in point))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Coarse-to-fine progressive XFOIL identification
+Screens the whole design space with one cheap XFOIL pass (a few angles, few viscous
+iterations, no retries or refinement), ranks every foil against the experiment on it, and
+spends full sweeps only on the best ranked, a batch at a time, until the top matches stop
+changing
+
+Experimental data, weights and interpolation settings are those of NACA_matching.py; the
+design space (after its panel-method pre-filter, if on), conditions, solver settings and cache
+are NACA_data_extractor.py's. Only the condition closest to EXPERIMENTAL_RE is run. Fully
+swept polars are added to the polar database; screening polars are not.
+
+Usage:
+    python progressive_search.py [--screen-alpha 0 8 16] [--screen-iter 30]
+                                 [--batch-fraction 0.05] [--max-fraction 0.5] [--stable-rounds 1]
+"""
+
+import argparse
+import math
+import sys
+from functools import partial
+
+import numpy as np
+
+import NACA_data_extractor as extractor
+from polar_cache import PolarCache
+from polar_database import merge_into_database
+from NACA_matching import (EXPERIMENTAL_DATA, EXPERIMENTAL_RE, POLAR_DB_DIR, TOP_N, align_to_experiment,
+                           calculate_rmse, top_matches)
+
+SCREEN_ALPHAS = (0.0, 8.0, 16.0)  # screening pass angles; the experimental angles between are interpolated
+SCREEN_ITER = 30        # viscous iterations per screening point (the full sweep uses extractor.ITER)
+BATCH_FRACTION = 0.05   # share of the design space given full sweeps per round, best screened first
+MAX_FRACTION = 0.5      # never fully sweep more than this share of the design space
+STABLE_ROUNDS = 1       # rounds in a row that must leave the top TOP_N unchanged
+ADD_TO_DATABASE = True  # store fully swept polars, so later matches use them
+
+
+def polar_arrays(polar):
+    """(alphas, values[1, n_alphas, 2] of CL/CM) of one polar dict."""
+    alphas = np.array(sorted(polar))
+    return alphas, np.array([[[polar[a]['CL'], polar[a]['CM']] for a in alphas]])
+
+
+def experimental_scores(polars):
+    """calculate_rmse of a list of polar dicts against EXPERIMENTAL_DATA (NaN where one cannot be evaluated)."""
+    alphas = np.asarray(EXPERIMENTAL_DATA['Alpha'], dtype=float)
+    aligned = [align_to_experiment(EXPERIMENTAL_DATA, *polar_arrays(polar))[0] if polar
+               else np.full((len(alphas), 2), np.nan) for polar in polars]
+    return calculate_rmse(EXPERIMENTAL_DATA, alphas, np.array(aligned).reshape(len(aligned), len(alphas), 2))
+
+
+def screen(space, re_num, mach, alphas, iters, cache):
+    """Screen every foil of space; returns (foils, screening polars, {foil: full polar}).
+
+    Foils whose full polar is already cached come back with it and need no full sweep;
+    foils with no converged screening point get an empty polar and rank last.
+    """
+    job = partial(extractor.run_screening, alphas=list(alphas), iters=iters)
+    tasks = ((foil, re_num, mach) for foil in space)
+    foils, polars, full = [], [], {}
+    for foil, _, _, data, report in extractor.iter_results(tasks, cache=cache, job=job):
+        foils.append(foil)
+        polars.append(data or {})
+        if report.get('cached'):
+            full[foil] = data
+    return foils, polars, full
+
+
+def full_sweeps(codes, re_num, mach, cache, cache_batch):
+    """Run the extractor's full job on codes; returns {code: polar} of successes."""
+    polars = {}
+    for foil, _, _, data, report in extractor.iter_results([(code, re_num, mach) for code in codes], cache=cache):
+        if data is None:
+            print(f"  {foil}: XFOIL failed ({report.get('reason')})")
+            continue
+        polars[foil] = data
+        if cache_batch is not None and not report.get('cached'):
+            cache_batch.add(foil, re_num, mach, data)
+    return polars
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Identify the experiment's airfoil with a coarse-to-fine XFOIL search.")
+    parser.add_argument("--screen-alpha", type=float, nargs="+", default=SCREEN_ALPHAS, metavar="A",
+                        help="angles of the screening pass")
+    parser.add_argument("--screen-iter", type=int, default=SCREEN_ITER, help="viscous iterations per screening point")
+    parser.add_argument("--batch-fraction", type=float, default=BATCH_FRACTION,
+                        help="share of the design space fully swept per round")
+    parser.add_argument("--max-fraction", type=float, default=MAX_FRACTION,
+                        help="largest share of the design space fully swept")
+    parser.add_argument("--stable-rounds", type=int, default=STABLE_ROUNDS,
+                        help="rounds in a row the top matches must stay unchanged")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if extractor.XF_PATH is None:
+        print("Error: xfoil executable not found in PATH (or set XFOIL_EXECUTABLE)")
+        sys.exit(1)
+    re_num, mach = min(extractor.CONDITIONS, key=lambda c: abs(c[0] - EXPERIMENTAL_RE))
+    cache = PolarCache(extractor.CACHE_DIR, extractor.CACHE_MAX_BYTES) if extractor.USE_CACHE else None
+    # Polars computed in memory are cached here rather than by the workers
+    cache_batch = extractor.CacheBatch(cache) if cache is not None and extractor.POLAR_TRANSPORT != "file" else None
+    alphas = sorted(args.screen_alpha)
+    space = extractor.candidate_space()
+    print(f"Progressive identification at Re {re_num} / Mach {mach} (experiment Re ~{EXPERIMENTAL_RE})")
+    print(f"Screening {len(space)} foils at {', '.join(f'{a:g}' for a in alphas)} deg "
+          f"with {args.screen_iter} iterations...")
+
+    try:
+        foils, screened, swept = screen(space, re_num, mach, alphas, args.screen_iter, cache)
+        screen_scores = experimental_scores(screened)['combined_rmse']
+        order = np.argsort(np.where(np.isnan(screen_scores), np.inf, screen_scores), kind='stable')
+        print(f"Screened {len(foils)} foils ({int(np.isfinite(screen_scores).sum())} ranked, "
+              f"{len(swept)} already fully cached)")
+
+        batch = max(2 * TOP_N, math.ceil(args.batch_fraction * len(foils)))
+        limit = max(batch, math.ceil(args.max_fraction * len(foils)))
+        previous, stable, start, rounds = None, 0, 0, 0
+        while start < min(limit, len(foils)):
+            codes = [foils[i] for i in order[start:start + batch] if foils[i] not in swept]
+            start += batch
+            rounds += 1
+            swept.update(full_sweeps(codes, re_num, mach, cache, cache_batch))
+            names = list(swept)
+            scores = experimental_scores([swept[name] for name in names])
+            top = list(top_matches(names, scores, 'combined_rmse', ['combined_rmse'])['Airfoil'])
+            print(f"Round {rounds}: {len(codes)} full sweeps ({len(swept)} in total), best {top[0] if top else None}")
+            stable = stable + 1 if top == previous else 0
+            if stable >= args.stable_rounds:
+                break
+            previous = top
+    except KeyboardInterrupt:
+        print("\nInterrupted by user.", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if cache_batch is not None:
+            cache_batch.flush()
+
+    names = list(swept)
+    scores = experimental_scores([swept[name] for name in names])
+    table = top_matches(names, scores, 'combined_rmse', ['combined_rmse', 'rmse_cl', 'rmse_cm'])
+    screen_rank = {foils[i]: rank + 1 for rank, i in enumerate(order)}
+    table['screen_rank'] = [screen_rank.get(name) for name in table['Airfoil']]
+    print("\n")
+    print("PROGRESSIVE SEARCH - TOP MATCHES BY COMBINED RMSE")
+    print(table.to_string(index=False) if not table.empty else "No results available.")
+    converged = "stable" if stable >= args.stable_rounds else "not yet stable (sweep limit reached)"
+    print(f"\nFull sweeps: {len(swept)}/{len(foils)} foils ({len(swept) / max(len(foils), 1):.0%}) "
+          f"in {rounds} rounds; top {TOP_N} {converged}")
+
+    if swept and ADD_TO_DATABASE:
+        merge_into_database(POLAR_DB_DIR, [(name, re_num, mach, polar) for name, polar in swept.items()])
+        print(f"Added {len(swept)} fully swept polars to {POLAR_DB_DIR}")
+
+
+if __name__ == "__main__":
+    main()
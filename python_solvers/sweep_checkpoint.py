@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Streaming results writer and checkpoint manifest for XFOIL sweeps
+Lets an interrupted extractor run resume where it stopped
+"""
+
+import csv
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+RESULT_FIELDS = ['Airfoil', 'Re', 'Mach', 'Alpha', 'CL', 'CD', 'CDp', 'CM', 'Top_Xtr', 'Bot_Xtr']
+
+
+def task_key(foil, re_num, mach):
+    """Normalised identity of one foil/condition job."""
+    return (str(foil), float(re_num), float(mach))
+
+
+class SweepCheckpoint:
+    """Append-only JSON-lines manifest of finished jobs.
+
+    Each line records one job outcome ('done' or 'failed'). Failed jobs are
+    retried on resume until they have failed max_attempts times, after which
+    they count as permanently failed and are skipped.
+    """
+
+    def __init__(self, path, max_attempts=2):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.done = set()
+        self.failures = {}
+        self._load()
+        self._fh = None
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from an interrupted write
+                key = task_key(rec['foil'], rec['re'], rec['mach'])
+                if rec['status'] == 'done':
+                    self.done.add(key)
+                    self.failures.pop(key, None)
+                else:
+                    self.failures[key] = self.failures.get(key, 0) + 1
+
+    def reset(self):
+        self.done.clear()
+        self.failures.clear()
+        if self.path.exists():
+            self.path.unlink()
+
+    def should_skip(self, foil, re_num, mach):
+        key = task_key(foil, re_num, mach)
+        return key in self.done or self.failures.get(key, 0) >= self.max_attempts
+
+    def mark(self, foil, re_num, mach, status):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            torn = self.path.exists() and self.path.stat().st_size > 0 \
+                and not self.path.read_bytes().endswith(b"\n")
+            self._fh = open(self.path, 'a', encoding='utf-8')
+            if torn:
+                self._fh.write("\n")
+        self._fh.write(json.dumps({'foil': foil, 're': re_num, 'mach': mach, 'status': status}) + "\n")
+        self._fh.flush()
+        key = task_key(foil, re_num, mach)
+        if status == 'done':
+            self.done.add(key)
+        else:
+            self.failures[key] = self.failures.get(key, 0) + 1
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class ResultsWriter:
+    """Appends each finished foil to the results CSV and failure report as it arrives."""
+
+    def __init__(self, results_csv, failed_file):
+        self.results_csv = Path(results_csv)
+        self.failed_file = Path(failed_file)
+        self.results_csv.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not self.results_csv.exists() or self.results_csv.stat().st_size == 0
+        self._csv_fh = open(self.results_csv, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._csv_fh, fieldnames=RESULT_FIELDS)
+        if new_file:
+            self._writer.writeheader()
+        self._failed_fh = open(self.failed_file, 'a', encoding='utf-8')
+        self.rows_written = 0
+        self.written = set()  # task_key()s of the jobs whose rows this writer added
+        self.failure_counts = Counter()
+
+    def write_result(self, foil_code, re_num, mach, data):
+        for alpha in sorted(data):
+            row_data = data[alpha].copy()
+            row_data['Airfoil'] = foil_code
+            row_data['Re'] = re_num
+            row_data['Mach'] = mach
+            row_data['Alpha'] = alpha
+            self._writer.writerow(row_data)
+            self.rows_written += 1
+        if data:
+            self.written.add(task_key(foil_code, re_num, mach))
+        # Rows must reach disk before the checkpoint claims the job is done
+        self._csv_fh.flush()
+        os.fsync(self._csv_fh.fileno())
+
+    def write_failure(self, foil_code, re_num, mach, report):
+        """Append one structured failure record (JSON line) and count it by class."""
+        record = {'foil': foil_code, 're': re_num, 'mach': mach}
+        record.update(report)
+        self._failed_fh.write(json.dumps(record) + "\n")
+        self._failed_fh.flush()
+        self.failure_counts[report.get('reason', 'unknown')] += 1
+
+    def close(self):
+        self._csv_fh.close()
+        self._failed_fh.close()
+
+
+def drop_unfinished_rows(results_csv, checkpoint):
+    """Remove CSV rows whose job never reached the manifest (crash between the two writes)."""
+    results_csv = Path(results_csv)
+    if not results_csv.exists():
+        return 0
+    tmp = results_csv.with_name(results_csv.name + '.tmp')
+    dropped = 0
+    with open(results_csv, 'r', newline='', encoding='utf-8') as src, \
+            open(tmp, 'w', newline='', encoding='utf-8') as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for row in reader:
+            if task_key(row['Airfoil'], row.get('Re') or 'nan', row.get('Mach') or 'nan') in checkpoint.done:
+                writer.writerow(row)
+            else:
+                dropped += 1
+    os.replace(tmp, results_csv)
+    return dropped
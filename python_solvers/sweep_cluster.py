@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Coordinator/worker job distribution for XFOIL sweeps across several machines
+The coordinator leases jobs over TCP; workers anywhere pull them, run XFOIL and push results back
+
+Protocol: one JSON object per line in each direction. A connection opens with
+    {"op": "hello", "fingerprint": ..., "token": ...}
+and then sends any number of
+    {"op": "lease"}                        -> {"lease": id, "task": [foil, re, mach]} | {"wait": s} | {"done": true}
+    {"op": "renew", "lease": id}           -> {"ok": true|false}
+    {"op": "result", "lease": id, "result": {...}}  -> {"ok": true|false}
+Leases not renewed within lease_timeout are reissued to the next worker that asks;
+the first result for a job wins and later duplicates are dropped. A result is only
+accepted on the lease its job was handed out under (ok false once that lease has
+expired), and a coordinator reachable from other hosts requires a token.
+"""
+
+import ipaddress
+import itertools
+import json
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from sweep_checkpoint import task_key
+
+WAIT_SECONDS = 1.0  # how long idle workers back off when every open job is leased
+
+
+def encode_result(res):
+    """JSON-safe form of a run_single result tuple."""
+    foil, re_num, mach, data, report = res
+    polar = None if data is None else [[alpha, coeffs] for alpha, coeffs in sorted(data.items())]
+    return {'task': [foil, re_num, mach], 'polar': polar, 'report': report}
+
+
+def decode_result(msg):
+    foil, re_num, mach = msg['task']
+    data = None if msg['polar'] is None else {float(alpha): coeffs for alpha, coeffs in msg['polar']}
+    return (foil, re_num, mach, data, msg['report'])
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class JobCoordinator:
+    """Hands out leased jobs to remote workers and collects their results.
+
+    Jobs are added with add() from the sweep loop; results arrive on next_result().
+    Request handling runs on server threads, so all bookkeeping is under one lock.
+    Binding anything but a loopback address without a token raises ValueError.
+    """
+
+    def __init__(self, address, fingerprint, lease_timeout=120, token=None):
+        self.fingerprint = fingerprint
+        self.lease_timeout = lease_timeout
+        self.token = token
+        self.lock = threading.Lock()
+        self.waiting = deque()   # jobs not currently leased, reissued ones first
+        self.leases = {}         # lease id -> (task, expiry)
+        self.open = set()        # keys of jobs added but without a result yet
+        self.closed = False      # no more jobs will be added
+        self.results = queue.Queue()
+        self.reissued = 0
+        self._ids = itertools.count(1)
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                greeted = False
+                for line in self.rfile:
+                    try:
+                        msg = json.loads(line)
+                        reply = coordinator.handle(msg, greeted)
+                        greeted = greeted or (msg['op'] == 'hello' and reply.get('ok') is True)
+                    except (ValueError, KeyError, TypeError) as e:
+                        reply = {'error': f"bad request: {e}"}
+                    self.wfile.write((json.dumps(reply) + "\n").encode())
+                    if 'error' in reply:
+                        return
+
+        self.server = _Server(address, Handler, bind_and_activate=False)
+        try:
+            self.server.server_bind()
+            host = self.server.server_address[0]
+            if token is None and not ipaddress.ip_address(host).is_loopback:
+                raise ValueError(f"refusing to serve jobs on {host} without a token")
+            self.server.server_activate()
+        except BaseException:
+            self.server.server_close()
+            raise
+        self.address = self.server.server_address
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add(self, task):
+        with self.lock:
+            self.open.add(task_key(*task))
+            self.waiting.append(tuple(task))
+
+    def close(self):
+        """Mark the job list complete, so idle workers are told to exit once it drains."""
+        with self.lock:
+            self.closed = True
+
+    def pending(self):
+        """Jobs added that have no result yet."""
+        with self.lock:
+            return len(self.open)
+
+    def next_result(self, timeout=None):
+        """Block for the next result tuple; raises queue.Empty after timeout seconds."""
+        return self.results.get(timeout=timeout)
+
+    def _reap(self, now):
+        for lease_id, (task, expiry) in list(self.leases.items()):
+            if expiry < now:
+                del self.leases[lease_id]
+                if task_key(*task) in self.open:
+                    self.waiting.appendleft(task)
+                    self.reissued += 1
+                    print(f"Lease {lease_id} on {task[0]} @ Re {task[1]} expired; reissuing")
+
+    def handle(self, msg, greeted):
+        op = msg['op']
+        if op == 'hello':
+            if self.token is not None and msg.get('token') != self.token:
+                return {'error': "bad token"}
+            if msg.get('fingerprint') != self.fingerprint:
+                return {'error': "worker settings differ from the coordinator's (XFOIL version or sweep)"}
+            return {'ok': True, 'renew_every': self.lease_timeout / 4}
+        if not greeted:
+            return {'error': "hello first"}
+        now = time.monotonic()
+        with self.lock:
+            if op == 'lease':
+                self._reap(now)
+                if self.waiting:
+                    task = self.waiting.popleft()
+                    lease_id = next(self._ids)
+                    self.leases[lease_id] = (task, now + self.lease_timeout)
+                    return {'lease': lease_id, 'task': list(task)}
+                if self.closed and not self.open:
+                    return {'done': True}
+                return {'wait': WAIT_SECONDS}
+            if op == 'renew':
+                lease = self.leases.get(msg['lease'])
+                if lease is None:
+                    return {'ok': False}
+                self.leases[msg['lease']] = (lease[0], now + self.lease_timeout)
+                return {'ok': True}
+            if op == 'result':
+                res = decode_result(msg['result'])
+                key = task_key(*res[:3])
+                lease = self.leases.get(msg['lease'])
+                if lease is None:
+                    return {'ok': False}  # expired and reissued; the new holder's result counts
+                if task_key(*lease[0]) != key:
+                    return {'error': f"lease {msg['lease']} is not for {res[0]} @ Re {res[1]}"}
+                del self.leases[msg['lease']]
+                if key in self.open:
+                    self.open.discard(key)
+                    self.results.put(res)
+                return {'ok': True}
+        return {'error': f"unknown op {op!r}"}
+
+
+class CoordinatorClient:
+    """One worker connection to a JobCoordinator."""
+
+    def __init__(self, address, fingerprint, token=None, timeout=60):
+        self.sock = socket.create_connection(address, timeout=timeout)
+        self.rfile = self.sock.makefile('r', encoding='utf-8')
+        hello = self.request({'op': 'hello', 'fingerprint': fingerprint, 'token': token})
+        self.renew_every = hello['renew_every']
+
+    def request(self, msg):
+        self.sock.sendall((json.dumps(msg) + "\n").encode())
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("coordinator closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise ConnectionError(f"coordinator refused: {reply['error']}")
+        return reply
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+class _Heartbeat:
+    """Renews one lease on its own connection until the job finishes."""
+
+    def __init__(self, client, lease_id):
+        self.client = client
+        self.lease_id = lease_id
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop.wait(self.client.renew_every):
+            try:
+                self.client.request({'op': 'renew', 'lease': self.lease_id})
+            except (OSError, ConnectionError):
+                return  # the result push will report a lost coordinator
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+
+def work(address, run_job, fingerprint, token=None, connect_timeout=60):
+    """Worker loop: lease jobs from the coordinator at address until it reports done.
+
+    run_job(task) must return a run_single result tuple. Waits up to connect_timeout
+    seconds for the coordinator to come up; returns the number of jobs run. Losing
+    the coordinator while pushing a result raises ConnectionError.
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            client = CoordinatorClient(address, fingerprint, token)
+            heartbeat = CoordinatorClient(address, fingerprint, token)
+            break
+        except (ConnectionRefusedError, socket.timeout):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(WAIT_SECONDS)
+    ran = 0
+    try:
+        while True:
+            try:
+                reply = client.request({'op': 'lease'})
+            except (ConnectionError, OSError):
+                return ran  # the coordinator exits as soon as its last result is in
+            if reply.get('done'):
+                return ran
+            if 'wait' in reply:
+                time.sleep(reply['wait'])
+                continue
+            with _Heartbeat(heartbeat, reply['lease']):
+                res = run_job(tuple(reply['task']))
+            client.request({'op': 'result', 'lease': reply['lease'], 'result': encode_result(res)})
+            ran += 1
+    finally:
+        client.close()
+        heartbeat.close()
@@ -0,0 +1,33 @@
+import numpy as np
+
+import batch_matching
+from polar_database import PolarDatabase, write_polar_database
+
+
+def _polar(alphas):
+    alphas = np.asarray(alphas, dtype=float)
+    values = np.zeros((len(alphas), 6))
+    values[:, 0] = 0.1 * alphas  # CL
+    values[:, 3] = -0.05         # CM
+    return alphas, values
+
+
+def test_experiments_with_different_angle_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_matching, "INTERP_EXTRAPOLATE", "nan")
+    write_polar_database(tmp_path / "db", [
+        ("0012", 100000, 0.1, _polar([0, 4, 8, 12, 16])),
+        ("2412", 100000, 0.1, _polar([0, 4, 8])),  # no polar past 8 degrees
+    ])
+    db = PolarDatabase(tmp_path / "db")
+    short = {'Alpha': np.array([0.0, 4.0, 8.0]), 'CL': np.array([0.0, 0.4, 0.8]), 'CM': np.full(3, -0.05),
+             'Re': 100000}
+    long = {'Alpha': np.array([0.0, 8.0, 16.0]), 'CL': np.array([0.0, 0.8, 1.6]), 'CM': np.full(3, -0.05),
+            'Re': 100000}
+
+    combined, rmse, _ = batch_matching.batch_match(db, [short, long])
+
+    # 2412 cannot be scored at 16 degrees, but that only affects the experiment using it
+    np.testing.assert_allclose(combined[0], [0.0, 0.0], atol=1e-6)
+    assert combined[1, 0] < 1e-6
+    assert np.isnan(combined[1, 1])
+    assert list(batch_matching.ranked(db.foils, combined[0], rmse[0])['Airfoil']) == ["0012", "2412"]
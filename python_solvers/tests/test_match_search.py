@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from match_search import bounded_top_k
+from polar_interp import interpolate
+
+ALPHA_GRID = np.arange(-6.0, 19.0, 1.0)
+ALPHAS = np.array([-4.0, 0.0, 4.0, 8.0, 12.0, 16.0])
+
+
+def _full_scan(values, target, k, weights, method, extrapolate):
+    """Every candidate scored at every angle, sorted by score then index."""
+    aligned = interpolate(ALPHA_GRID, values, ALPHAS, method, extrapolate, axis=1)
+    rmse = np.sqrt(np.mean((aligned - target) ** 2, axis=1))
+    scores = sum(w * rmse[:, c] for c, w in enumerate(weights) if w)
+    order = np.lexsort((np.arange(len(scores)), scores))
+    order = order[~np.isnan(scores[order])][:k]
+    return order, scores[order]
+
+
+@pytest.mark.parametrize("weights", [(0.6, 0.4), (1.0, 0.0)])
+@pytest.mark.parametrize("method, extrapolate", [("linear", "linear"), ("linear", "nan"), ("pchip", "clamp")])
+def test_bounded_top_k_matches_a_full_scan(weights, method, extrapolate):
+    rng = np.random.default_rng(8)
+    values = rng.normal(size=(3000, len(ALPHA_GRID), 2))
+    values[rng.random(values.shape) < 0.05] = np.nan  # unconverged points
+    values[:40, -3:] = np.nan  # polars stopping short of 16 degrees
+    values[::7] = values[::7].round(1)  # near ties
+    target = rng.normal(size=(len(ALPHAS), 2)) * 0.3
+
+    rows, scores = bounded_top_k(ALPHA_GRID, values, ALPHAS, target, 10, weights, method, extrapolate)
+
+    expected_rows, expected_scores = _full_scan(values, target, 10, weights, method, extrapolate)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(scores, expected_scores)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+import NACA_matching
+from NACA_matching import calculate_rmse, top_matches
+
+
+def _looped_rmse(exp, alpha_grid, polar):
+    """One foil scored as the per-airfoil loop did: the grid value, or the line through the two nearest points."""
+    sim = []
+    for alpha in exp['Alpha']:
+        hit = np.flatnonzero(alpha_grid == alpha)
+        if len(hit):
+            sim.append(polar[hit[0]])
+        else:
+            (i1, i2) = np.argsort(np.abs(alpha_grid - alpha), kind='stable')[:2]
+            sim.append(polar[i1] + (polar[i2] - polar[i1]) * (alpha - alpha_grid[i1]) / (alpha_grid[i2] - alpha_grid[i1]))
+    sim = np.array(sim)
+    rmse_cl = np.sqrt(np.mean((np.array(exp['CL']) - sim[:, 0]) ** 2))
+    rmse_cm = np.sqrt(np.mean((np.array(exp['CM']) - sim[:, 1]) ** 2))
+    return rmse_cl, rmse_cm, 0.6 * rmse_cl + 0.4 * rmse_cm
+
+
+def test_vectorized_rmse_matches_the_per_foil_loop():
+    rng = np.random.default_rng(3)
+    alpha_grid = np.arange(-6.0, 19.0, 1.0)
+    values = rng.normal(size=(40, len(alpha_grid), 2))
+    exp = {'Alpha': [-4.0, 0.0, 4.5, 8.0, 12.5, 16.0], 'CL': rng.normal(size=6), 'CM': rng.normal(size=6)}
+
+    scores = calculate_rmse(exp, alpha_grid, values)
+
+    expected = np.array([_looped_rmse(exp, alpha_grid, polar) for polar in values])
+    np.testing.assert_allclose(scores['rmse_cl'], expected[:, 0], rtol=1e-12)
+    np.testing.assert_allclose(scores['rmse_cm'], expected[:, 1], rtol=1e-12)
+    np.testing.assert_allclose(scores['combined_rmse'], expected[:, 2], rtol=1e-12)
+
+
+def test_top_matches_ranks_like_nsmallest():
+    airfoils = [f"{i:04d}" for i in range(30)]
+    combined = np.round(np.random.default_rng(4).random(30), 1)  # plenty of ties
+    combined[[3, 17]] = np.nan
+    scores = {'combined_rmse': combined, 'rmse_cl': combined * 2}
+
+    table = top_matches(airfoils, scores, 'combined_rmse', ['combined_rmse', 'rmse_cl'])
+
+    frame = pd.DataFrame({'Airfoil': airfoils, 'combined_rmse': combined, 'rmse_cl': combined * 2})
+    expected = frame.nsmallest(NACA_matching.TOP_N, 'combined_rmse')
+    assert list(table['Airfoil']) == list(expected['Airfoil'])
@@ -0,0 +1,32 @@
+import os
+
+from polar_cache import PolarCache, cache_key
+
+RUN = dict(foil_code="0012", re=100000, mach=0.0, ncrit=9, iters=100, alpha_sweep=[-4, 0, 4.0], xfoil_version="6.99")
+
+
+def test_cache_key_covers_every_run_input():
+    key = cache_key(**RUN)
+
+    # Equal inputs in other spellings give the same key
+    assert cache_key(**dict(RUN, re=100000.0, alpha_sweep=(-4.0, 0.0, 4.0000000001))) == key
+    changed = [dict(RUN, foil_code="0015"), dict(RUN, re=200000), dict(RUN, mach=0.1), dict(RUN, ncrit=5),
+               dict(RUN, iters=200), dict(RUN, alpha_sweep=[-4, 0, 4, 8]), dict(RUN, xfoil_version="6.97"),
+               dict(RUN, geometry="sha256:abc")]
+    keys = {cache_key(**run) for run in changed}
+    assert len(keys) == len(changed) and key not in keys
+
+
+def test_evict_removes_least_recently_used_first(tmp_path):
+    cache = PolarCache(tmp_path, max_bytes=250)
+    keys = [cache_key(**dict(RUN, foil_code=code)) for code in ("0012", "2412", "4412")]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 100)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    assert cache.get(keys[0]) == "x" * 100  # a hit makes the oldest entry the most recent
+
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert cache.size_bytes() == 200
@@ -0,0 +1,107 @@
+import numpy as np
+
+from polar_database import (PolarDatabase, database_dir, merge_from_csv, merge_into_database, read_csv_polars,
+                            write_polar_database)
+from sweep_checkpoint import ResultsWriter, task_key
+
+
+def _polar(cl):
+    alphas = np.array([0.0, 4.0])
+    values = np.zeros((2, 6))
+    values[:, 0] = cl
+    return alphas, values
+
+
+def test_condition_index_picks_mach_at_the_same_re(tmp_path):
+    conditions = [(100000.0, 0.1), (100000.0, 0.3), (110000.0, 0.2)]
+    write_polar_database(tmp_path / "db", [("0012", re_num, mach, _polar(0.1)) for re_num, mach in conditions])
+    db = PolarDatabase(tmp_path / "db")
+
+    assert db.conditions[db.condition_index(100000, 0.28)] == (100000.0, 0.3)
+    assert db.conditions[db.condition_index(100000, 0.12)] == (100000.0, 0.1)
+    # Re is matched first: a closer Mach at another Re does not win
+    assert db.conditions[db.condition_index(100000, 0.2)] in [(100000.0, 0.1), (100000.0, 0.3)]
+    assert db.conditions[db.condition_index(108000, 0.1)] == (110000.0, 0.2)
+    assert db.conditions[db.condition_index(100000)] == (100000.0, 0.1)
+
+
+def test_records_round_trip(tmp_path):
+    alphas = np.array([-2.0, 0.0, 2.5])
+    values = np.arange(18, dtype=float).reshape(3, 6) / 10
+    records = [("0012", 100000.0, 0.0, (alphas, values)), ("2412", 200000.0, 0.1, (alphas[1:], values[1:]))]
+    write_polar_database(tmp_path / "db", records)
+    stored = sorted(PolarDatabase(tmp_path / "db").records(), key=lambda r: r[0])
+
+    assert [r[:3] for r in stored] == [r[:3] for r in records]
+    for (_, _, _, (a, v)), (_, _, _, (a0, v0)) in zip(stored, records):
+        np.testing.assert_array_equal(a, a0)
+        np.testing.assert_allclose(v, v0, rtol=1e-6)
+
+
+def test_merge_replaces_a_stored_polar(tmp_path):
+    write_polar_database(tmp_path / "db", [("0012", 100000, 0.0, _polar(0.1)),
+                                           ("2412", 100000, 0.0, _polar(0.2))])
+    replacement = (np.array([0.0, 8.0]), np.full((2, 6), 0.5))
+    merge_into_database(tmp_path / "db", [("0012", 100000, 0.0, replacement)])
+    db = PolarDatabase(tmp_path / "db")
+
+    alphas, values = db.polar("0012", 0)
+    np.testing.assert_array_equal(alphas, [0.0, 8.0])  # the old 4 degree point does not survive
+    np.testing.assert_allclose(values, 0.5)
+    np.testing.assert_allclose(db.polar("2412", 0)[1][:, 0], 0.2)
+    assert db.present.tolist() == [[True], [True]]
+
+
+def test_open_database_survives_a_generation_swap(tmp_path):
+    write_polar_database(tmp_path / "db", [("0012", 100000, 0.0, _polar(0.1))])
+    before = PolarDatabase(tmp_path / "db")
+    merge_into_database(tmp_path / "db", [("4412", 100000, 0.0, _polar(0.4))])
+    after = PolarDatabase(tmp_path / "db")
+
+    assert database_dir(tmp_path / "db") != database_dir(before.db_dir) or before.foils != after.foils
+    assert not (tmp_path / "db" / "gen-000001").exists()
+    # The old mapping still reads its own generation; a reopen sees the new one
+    assert before.foils == ["0012"]
+    np.testing.assert_allclose(before.data[0, 0, :, 0], 0.1)
+    assert after.foils == ["0012", "4412"]
+    np.testing.assert_allclose(after.polar("4412", 0)[1][:, 0], 0.4)
+
+
+def test_merge_from_csv_takes_only_the_given_jobs(tmp_path):
+    writer = ResultsWriter(tmp_path / "results.csv", tmp_path / "failed.jsonl")
+    coeffs = {'CL': 0.3, 'CD': 0.01, 'CDp': 0.005, 'CM': -0.05, 'Top_Xtr': 0.5, 'Bot_Xtr': 0.6}
+    writer.write_result("0012", 100000, 0.0, {0.0: dict(coeffs)})
+    writer.close()
+    write_polar_database(tmp_path / "db", [("0012", 100000, 0.0, _polar(0.9))])  # stored after that run
+
+    writer = ResultsWriter(tmp_path / "results.csv", tmp_path / "failed.jsonl")
+    writer.write_result("2412", 100000, 0.0, {0.0: dict(coeffs)})
+    writer.close()
+    assert writer.written == {task_key("2412", 100000, 0.0)}
+    merge_from_csv(tmp_path / "results.csv", tmp_path / "db", writer.written)
+    db = PolarDatabase(tmp_path / "db")
+
+    np.testing.assert_allclose(db.polar("0012", 0)[1][:, 0], 0.9)
+    np.testing.assert_allclose(db.polar("2412", 0)[1][:, 0], 0.3)
+
+
+def test_read_csv_polars_streams_chunks_to_disk(tmp_path):
+    rows = ["Airfoil,Re,Mach,Alpha,CL,CD,CDp,CM,Top_Xtr,Bot_Xtr",
+            "0012,100000,0.0,4.0,0.4,0,0,-0.01,0,0",
+            "0012,100000,0.0,0.0,0.0,0,0,-0.01,0,0",
+            "2412,100000,0.0,0.0,0.2,0,0,-0.05,0,0",
+            "0012,100000,0.0,4.0,9.9,0,0,9.9,0,0",  # repeated row: the first one is kept
+            "0012,200000,0.0,0.0,0.1,0,0,-0.01,0,0",
+            "2412,100000,0.0,20.0,1.1,0,0,-0.05,0,0"]
+    (tmp_path / "results.csv").write_text("\n".join(rows) + "\n")
+
+    foils, conditions, alphas, values = read_csv_polars(tmp_path / "results.csv", ('CL', 'CM'),
+                                                        alpha_range=(0.0, 16.0), chunksize=2)
+
+    assert isinstance(values, np.memmap)
+    assert foils == ["0012", "2412"]
+    assert conditions == [(100000.0, 0.0), (200000.0, 0.0)]
+    np.testing.assert_array_equal(alphas, [0.0, 4.0])
+    np.testing.assert_allclose(values[0, 0], [[0.0, -0.01], [0.4, -0.01]])
+    np.testing.assert_allclose(values[1, 0, 0], [0.2, -0.05])
+    assert np.isnan(values[1, 0, 1]).all() and np.isnan(values[1, 1]).all()
@@ -0,0 +1,58 @@
+import numpy as np
+
+from polar_database import PolarDatabase, write_polar_database
+from polar_index import SignatureIndex, build_index
+from polar_interp import interpolate
+
+ALPHA_GRID = np.arange(-6.0, 19.0, 2.0)
+ALPHAS = (-4.0, 0.0, 4.0, 8.0, 12.0, 16.0)
+CONDITIONS = [(100000.0, 0.0), (200000.0, 0.0), (200000.0, 0.1)]
+
+
+def _full_scan(db, target, k, weights, condition=None):
+    """(foil, condition, score) of every stored polar scored in full, best first, ties by foil then condition."""
+    found = []
+    for ci in range(len(db.conditions)) if condition is None else [condition]:
+        values = np.asarray(db.condition_slice(ci, ('CL', 'CM')), dtype=np.float64)
+        aligned = interpolate(db.alphas, values, ALPHAS, "linear", "linear", axis=1)
+        rmse = np.sqrt(np.mean((aligned - target) ** 2, axis=1))
+        scores = weights[0] * rmse[:, 0] + weights[1] * rmse[:, 1]
+        found += [(fi, ci, s) for fi, s in enumerate(scores) if not np.isnan(s)]
+    return sorted(found, key=lambda f: (f[2], f[0], f[1]))[:k]
+
+
+def test_index_top_k_matches_a_full_scan(tmp_path):
+    rng = np.random.default_rng(11)
+    records = []
+    for f in range(400):
+        for re_num, mach in CONDITIONS:
+            if rng.random() < 0.1:
+                continue  # not every foil is stored at every condition
+            values = np.zeros((len(ALPHA_GRID), 6))
+            values[:, [0, 3]] = np.cumsum(rng.normal(size=(len(ALPHA_GRID), 2)) * 0.1, axis=0)
+            keep = rng.random(len(ALPHA_GRID)) > 0.05
+            records.append((f"{f:04d}", re_num, mach, (ALPHA_GRID[keep], values[keep])))
+    write_polar_database(tmp_path / "db", records)
+    build_index(tmp_path / "db", ALPHAS)
+    db, index = PolarDatabase(tmp_path / "db"), SignatureIndex(tmp_path / "db")
+
+    for trial in range(20):
+        target = np.cumsum(rng.normal(size=(len(ALPHAS), 2)) * 0.15, axis=0)
+        weights = (0.6, 0.4) if trial % 2 else (1.0, 0.0)
+        condition = None if trial % 3 == 0 else trial % len(CONDITIONS)
+
+        foils, conditions, scores = index.query(target, 10, weights, condition)
+
+        expected = _full_scan(db, target, 10, weights, condition)
+        assert list(zip(foils, conditions)) == [(f, c) for f, c, _ in expected]
+        np.testing.assert_allclose(scores, [s for _, _, s in expected], rtol=1e-9)
+
+
+def test_index_is_rebuilt_when_the_database_changes(tmp_path):
+    polar = (ALPHA_GRID, np.zeros((len(ALPHA_GRID), 6)))
+    write_polar_database(tmp_path / "db", [("0012", 100000, 0.0, polar)])
+    assert len(SignatureIndex.open(tmp_path / "db", ALPHAS)) == 1
+
+    write_polar_database(tmp_path / "db", [("0012", 100000, 0.0, polar), ("2412", 100000, 0.0, polar)])
+    assert not SignatureIndex(tmp_path / "db").matches(ALPHAS)
+    assert len(SignatureIndex.open(tmp_path / "db", ALPHAS)) == 2
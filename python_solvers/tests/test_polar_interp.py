@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy.interpolate import PchipInterpolator
+
+from polar_interp import interpolate, interpolate_linear_at
+
+ALPHA_GRID = np.arange(-4.0, 17.0, 2.0)
+TARGETS = np.array([-7.0, -4.0, -3.0, 0.5, 5.0, 9.9, 16.0, 18.5])
+
+
+def _series(seed=5, n=12):
+    """Random series on ALPHA_GRID with gaps: interior, at either end, all but one point, and none."""
+    values = np.cumsum(np.random.default_rng(seed).normal(size=(n, len(ALPHA_GRID))), axis=1)
+    values[1, 3:5] = np.nan
+    values[2, :2] = np.nan
+    values[3, -3:] = np.nan
+    values[4, 1:] = np.nan
+    values[5] = np.nan
+    values[6, ::2] = np.nan
+    return values
+
+
+def _expected(x, y, t, extrapolate):
+    """Per-series reference: np.interp inside the present points, the policy outside them."""
+    out = np.interp(t, x, y)
+    below, above = t < x[0], t > x[-1]
+    if extrapolate == "nan":
+        out[below | above] = np.nan
+    elif extrapolate == "linear" and len(x) > 1:
+        out[below] = y[0] + (t[below] - x[0]) * (y[1] - y[0]) / (x[1] - x[0])
+        out[above] = y[-1] + (t[above] - x[-1]) * (y[-1] - y[-2]) / (x[-1] - x[-2])
+    elif len(x) == 1 and extrapolate != "clamp":
+        out[t != x[0]] = np.nan
+    return out
+
+
+@pytest.mark.parametrize("extrapolate", ["nan", "clamp", "linear"])
+def test_linear_matches_per_series_interp(extrapolate):
+    values = _series()
+
+    out = interpolate(ALPHA_GRID, values, TARGETS, "linear", extrapolate)
+
+    for y, got in zip(values, out):
+        present = ~np.isnan(y)
+        if not present.any():
+            assert np.isnan(got).all()
+            continue
+        np.testing.assert_allclose(got, _expected(ALPHA_GRID[present], y[present], TARGETS, extrapolate),
+                                   rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("extrapolate", ["nan", "clamp", "linear"])
+def test_pchip_matches_scipy_inside_and_linear_outside(extrapolate):
+    values = _series()
+
+    out = interpolate(ALPHA_GRID, values, TARGETS, "pchip", extrapolate)
+    linear = interpolate(ALPHA_GRID, values, TARGETS, "linear", extrapolate)
+
+    for y, got, lin in zip(values, out, linear):
+        present = ~np.isnan(y)
+        x = ALPHA_GRID[present]
+        if len(x) < 2:
+            np.testing.assert_array_equal(got, lin)
+            continue
+        inside = (TARGETS >= x[0]) & (TARGETS <= x[-1])
+        np.testing.assert_allclose(got[inside], PchipInterpolator(x, y[present])(TARGETS[inside]), rtol=1e-12)
+        np.testing.assert_array_equal(got[~inside], lin[~inside])
+
+
+def test_batch_axes_and_single_angle_path_agree():
+    values = np.stack([_series(6), _series(7)], axis=-1)  # foils x alphas x coefficients
+
+    out = interpolate(ALPHA_GRID, values, TARGETS, "linear", "linear", axis=1)
+
+    for c in range(2):
+        np.testing.assert_array_equal(out[:, :, c], interpolate(ALPHA_GRID, values[:, :, c], TARGETS, "linear", "linear"))
+    rows = np.array([0, 2, 3, 6, 9])
+    for j, target in enumerate(TARGETS):
+        np.testing.assert_allclose(interpolate_linear_at(ALPHA_GRID, values, target, rows, "linear"),
+                                   out[rows, j], rtol=1e-12, atol=1e-12)
@@ -0,0 +1,49 @@
+import csv
+
+from sweep_checkpoint import ResultsWriter, SweepCheckpoint, drop_unfinished_rows, task_key
+
+COEFFS = {'CL': 0.3, 'CD': 0.01, 'CDp': 0.005, 'CM': -0.05, 'Top_Xtr': 0.5, 'Bot_Xtr': 0.6}
+
+
+def test_resume_skips_finished_and_permanently_failed_jobs(tmp_path):
+    checkpoint = SweepCheckpoint(tmp_path / "checkpoint.jsonl", max_attempts=2)
+    checkpoint.mark("0012", 100000, 0.0, 'done')
+    checkpoint.mark("2412", 100000, 0.0, 'failed')
+    checkpoint.mark("4412", 100000, 0.0, 'failed')
+    checkpoint.mark("4412", 100000, 0.0, 'failed')
+    checkpoint.mark("6412", 100000, 0.0, 'failed')
+    checkpoint.mark("6412", 100000, 0.0, 'done')
+    checkpoint.close()
+    with open(tmp_path / "checkpoint.jsonl", 'a', encoding='utf-8') as f:
+        f.write('{"foil": "8412", "re": 1')  # torn by a crash mid-write
+
+    resumed = SweepCheckpoint(tmp_path / "checkpoint.jsonl", max_attempts=2)
+
+    assert resumed.done == {task_key("0012", 100000, 0.0), task_key("6412", 100000, 0.0)}
+    assert resumed.should_skip("0012", 100000.0, 0)
+    assert not resumed.should_skip("2412", 100000, 0.0)  # one failure: retried
+    assert resumed.should_skip("4412", 100000, 0.0)  # failed max_attempts times
+    assert not resumed.should_skip("8412", 100000, 0.0)
+    resumed.mark("8412", 100000, 0.0, 'done')
+    resumed.close()
+    assert task_key("8412", 100000, 0.0) in SweepCheckpoint(tmp_path / "checkpoint.jsonl").done
+
+
+def test_drop_unfinished_rows_keeps_only_checkpointed_jobs(tmp_path):
+    writer = ResultsWriter(tmp_path / "results.csv", tmp_path / "failed.jsonl")
+    writer.write_result("0012", 100000, 0.0, {0.0: dict(COEFFS), 4.0: dict(COEFFS)})
+    writer.write_result("2412", 100000, 0.0, {0.0: dict(COEFFS)})  # crashed before the checkpoint
+    writer.write_result("0012", 200000, 0.0, {0.0: dict(COEFFS)})
+    writer.close()
+    checkpoint = SweepCheckpoint(tmp_path / "checkpoint.jsonl")
+    checkpoint.mark("0012", 100000, 0.0, 'done')
+    checkpoint.mark("0012", 200000, 0.0, 'done')
+    checkpoint.close()
+
+    assert drop_unfinished_rows(tmp_path / "results.csv", checkpoint) == 1
+
+    with open(tmp_path / "results.csv", newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(r['Airfoil'], r['Re'], r['Alpha']) for r in rows] == [("0012", "100000", "0.0"), ("0012", "100000", "4.0"),
+                                                                   ("0012", "200000", "0.0")]
+    assert drop_unfinished_rows(tmp_path / "missing.csv", checkpoint) == 0
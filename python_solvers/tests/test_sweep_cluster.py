@@ -0,0 +1,75 @@
+import time
+from multiprocessing import Process
+
+import pytest
+
+from sweep_cluster import JobCoordinator, encode_result, work
+
+FINGERPRINT = "test"
+TASKS = [("0012", 100000.0, 0.0), ("2412", 100000.0, 0.0)]
+
+
+def _result(task):
+    return tuple(task) + ({0.0: [0.1, 0.01, 0.0, -0.05]}, None)
+
+
+def _hang(task):
+    time.sleep(60)  # killed while holding the lease
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_job_of_a_killed_worker_is_reissued():
+    coordinator = JobCoordinator(("127.0.0.1", 0), FINGERPRINT, lease_timeout=1.0).start()
+    for task in TASKS:
+        coordinator.add(task)
+    coordinator.close()
+    stuck = Process(target=work, args=(coordinator.address, _hang, FINGERPRINT))
+    healthy = Process(target=work, args=(coordinator.address, _result, FINGERPRINT))
+    try:
+        stuck.start()
+        _wait_for(lambda: len(coordinator.leases) == 1)
+        healthy.start()
+        first = coordinator.next_result(timeout=10)
+        stuck.kill()
+        second = coordinator.next_result(timeout=10)
+        healthy.join(timeout=10)
+
+        assert {first[0], second[0]} == {"0012", "2412"}
+        assert coordinator.reissued == 1
+        assert coordinator.pending() == 0
+        assert healthy.exitcode == 0
+    finally:
+        for proc in (stuck, healthy):
+            if proc.is_alive():
+                proc.kill()
+        coordinator.shutdown()
+
+
+def test_result_is_only_accepted_on_its_own_lease():
+    coordinator = JobCoordinator(("127.0.0.1", 0), FINGERPRINT).start()
+    try:
+        for task in TASKS:
+            coordinator.add(task)
+        lease = coordinator.handle({'op': 'lease'}, True)['lease']
+        other = encode_result(_result(TASKS[1]))
+
+        assert 'error' in coordinator.handle({'op': 'result', 'lease': lease, 'result': other}, True)
+        assert coordinator.handle({'op': 'result', 'lease': lease + 1, 'result': other}, True) == {'ok': False}
+        assert coordinator.pending() == 2
+        own = encode_result(_result(TASKS[0]))
+        assert coordinator.handle({'op': 'result', 'lease': lease, 'result': own}, True) == {'ok': True}
+        assert coordinator.pending() == 1
+    finally:
+        coordinator.shutdown()
+
+
+def test_non_loopback_address_needs_a_token():
+    with pytest.raises(ValueError):
+        JobCoordinator(("0.0.0.0", 0), FINGERPRINT)
+    JobCoordinator(("0.0.0.0", 0), FINGERPRINT, token="secret").start().shutdown()
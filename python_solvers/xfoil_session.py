@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Long-lived XFOIL session
+Keeps one XFOIL process open and feeds it successive command blocks,
+either from a blocking caller (XfoilSession) or inside an event loop (AsyncXfoilSession)
+"""
+
+import asyncio
+import os
+import queue
+import subprocess
+import threading
+import time
+
+# XFOIL echoes the first four characters of an unknown top-level command, so an
+# unknown command appended to each block marks the point where the block finished.
+SENTINEL_CMD = "ZZZZ"
+SENTINEL_TEXT = "ZZZZ COMMAND NOT RECOGNIZED"
+
+
+def _session_env():
+    env = dict(os.environ)
+    # gfortran buffers stdout on pipes, which would hide the sentinel reply
+    env.setdefault("GFORTRAN_UNBUFFERED_PRECONNECTED", "y")
+    return env
+
+
+def _payload(commands):
+    """Command block followed by the sentinel that marks where its output ends."""
+    return "\n".join(list(commands) + ["", "", SENTINEL_CMD]) + "\n"
+
+
+class XfoilSessionError(RuntimeError):
+    """Raised when a session crashes or stops responding; the session restarts itself.
+
+    reason is one of 'timeout', 'stalled', 'crashed' or whatever a watch callback returned;
+    output holds the console output received before the block was abandoned.
+    """
+
+    def __init__(self, reason, message, output=""):
+        super().__init__(message)
+        self.reason = reason
+        self.output = output
+
+
+class XfoilSession:
+    """One XFOIL process reused across many foils.
+
+    Output is read on a background thread so a hung solver can be detected with
+    a timeout; on a hang, crash or broken pipe the process is killed and a fresh
+    one is started for the next block.
+    """
+
+    def __init__(self, xfoil_path):
+        self.xfoil_path = xfoil_path
+        self.proc = None
+        self.lines = None
+        self.runs = 0      # blocks completed by the current process
+        self.restarts = 0
+
+    def start(self):
+        self.proc = subprocess.Popen([self.xfoil_path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT, text=True, bufsize=1, env=_session_env())
+        self.lines = queue.Queue()
+        reader = threading.Thread(target=self._pump, args=(self.proc.stdout, self.lines), daemon=True)
+        reader.start()
+        self.runs = 0
+
+    @staticmethod
+    def _pump(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)  # end of stream: the process exited
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def restart(self):
+        self.close(graceful=False)
+        self.restarts += 1
+        self.start()
+
+    def run(self, commands, timeout, stall_timeout=None, watch=None):
+        """Send one command block and return its console output.
+
+        The block must leave XFOIL at the top-level menu. Raises XfoilSessionError
+        if the process dies, no sentinel arrives within timeout seconds, nothing is
+        printed for stall_timeout seconds, or watch(line) returns an abort reason.
+        """
+        if not self.alive():
+            self.start()
+        try:
+            self.proc.stdin.write(_payload(commands))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.restart()
+            raise XfoilSessionError("crashed", f"xfoil session closed its input: {e}")
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            wait = remaining if stall_timeout is None else min(remaining, stall_timeout)
+            try:
+                line = self.lines.get(timeout=max(wait, 0.0))
+            except queue.Empty:
+                self.restart()
+                if wait < remaining:
+                    raise XfoilSessionError("stalled", f"xfoil printed nothing for {stall_timeout}s",
+                                            "".join(output))
+                raise XfoilSessionError("timeout", f"xfoil session hung for {timeout}s", "".join(output))
+            if line is None:
+                self.restart()
+                raise XfoilSessionError("crashed", "xfoil session exited unexpectedly", "".join(output))
+            if SENTINEL_TEXT in line.upper():
+                self.runs += 1
+                return "".join(output)
+            output.append(line)
+            if watch is not None:
+                reason = watch(line)
+                if reason:
+                    self.restart()
+                    raise XfoilSessionError(reason, f"xfoil run aborted: {reason}", "".join(output))
+
+    def close(self, graceful=True):
+        if self.proc is None:
+            return
+        if graceful and self.alive():
+            try:
+                self.proc.stdin.write("\n\nquit\n")
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        if self.alive():
+            self.proc.kill()
+            self.proc.wait()
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc = None
+
+
+class AsyncXfoilSession:
+    """XfoilSession for use inside one asyncio event loop.
+
+    Reads the pipe with asyncio instead of a thread per process, so one Python
+    process can drive many solvers. Same block protocol, errors and restarts.
+    """
+
+    def __init__(self, xfoil_path):
+        self.xfoil_path = xfoil_path
+        self.proc = None
+        self.runs = 0
+        self.restarts = 0
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            self.xfoil_path, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT, env=_session_env())
+        self.runs = 0
+
+    def alive(self):
+        return self.proc is not None and self.proc.returncode is None
+
+    async def restart(self):
+        await self.close(graceful=False)
+        self.restarts += 1
+        await self.start()
+
+    async def run(self, commands, timeout, stall_timeout=None, watch=None):
+        """Send one command block and return its console output; see XfoilSession.run."""
+        if not self.alive():
+            await self.start()
+        try:
+            self.proc.stdin.write(_payload(commands).encode())
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            await self.restart()
+            raise XfoilSessionError("crashed", f"xfoil session closed its input: {e}")
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            wait = remaining if stall_timeout is None else min(remaining, stall_timeout)
+            try:
+                raw = await asyncio.wait_for(self.proc.stdout.readline(), max(wait, 0.0))
+            except asyncio.TimeoutError:
+                await self.restart()
+                if wait < remaining:
+                    raise XfoilSessionError("stalled", f"xfoil printed nothing for {stall_timeout}s",
+                                            "".join(output))
+                raise XfoilSessionError("timeout", f"xfoil session hung for {timeout}s", "".join(output))
+            if not raw:
+                await self.restart()
+                raise XfoilSessionError("crashed", "xfoil session exited unexpectedly", "".join(output))
+            line = raw.decode(errors="replace").replace("\r\n", "\n")
+            if SENTINEL_TEXT in line.upper():
+                self.runs += 1
+                return "".join(output)
+            output.append(line)
+            if watch is not None:
+                reason = watch(line)
+                if reason:
+                    await self.restart()
+                    raise XfoilSessionError(reason, f"xfoil run aborted: {reason}", "".join(output))
+
+    async def close(self, graceful=True):
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        if graceful and proc.returncode is None:
+            try:
+                proc.stdin.write(b"\n\nquit\n")
+                await proc.stdin.drain()
+                await asyncio.wait_for(proc.wait(), 5)
+            except (OSError, asyncio.TimeoutError):
+                pass
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()